@@ -0,0 +1,104 @@
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Literal, Optional
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from rag.pack_cache import PackCache
+from rag.pipeline import PACK_CACHE, QAPipeline
+
+class QueryRequest(BaseModel):
+    query: str
+    k: int = 5
+    route: Literal["auto", "structured", "unstructured", "both"] = "auto"
+    use_llm: bool = False
+    use_llm_router: bool = False
+    trace: bool = False  # include per-stage spans in the response
+
+def _backend_timeout() -> Optional[float]:
+    value = os.getenv("QA_BACKEND_TIMEOUT")
+    return float(value) if value else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load CSVs, the DB pool, embeddings/FAISS and the encoder once per worker process
+    app.state.pipeline = QAPipeline(backend_timeout=_backend_timeout(),
+                                    pack_cache=PackCache(capacity=1024, disk_path=PACK_CACHE)).warm()
+    yield
+
+app = FastAPI(title="Data Lake QA", lifespan=lifespan)
+
+@app.get("/health")
+def health() -> Dict[str, str]:
+    return {"status": "ok"}
+
+@app.post("/query")
+async def query(req: QueryRequest) -> Dict[str, Any]:
+    pipeline: QAPipeline = app.state.pipeline
+    # Retrieval and synthesis block, so run them on the threadpool to serve requests concurrently
+    result = await run_in_threadpool(pipeline.answer, req.query, k=req.k, route=req.route,
+                                     use_llm_router=req.use_llm_router, use_llm=req.use_llm, trace=req.trace)
+    answer = result["answer"]
+    response = {
+        "answer": answer.get("answer", ""),
+        "citations": answer.get("citations", []),
+        "used_modalities": answer.get("used_modalities", []),
+        "route": result["route"],
+        "route_confidence": result["route_confidence"],
+        "cache_hit": result["cache_hit"],
+        "evidence": result["evidence"],
+    }
+    if req.trace:
+        response["trace"] = result["trace"]
+    return response
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest) -> StreamingResponse:
+    """
+    Server-sent events: `meta` (route + evidence) once retrieval is done, then `delta`
+    ({"text": ...}) per token and `citation` per parsed [DB]/[CSV]/[DOC] tag, then `done`.
+    """
+    pipeline: QAPipeline = app.state.pipeline
+    result, stream = await run_in_threadpool(pipeline.answer_stream, req.query, k=req.k, route=req.route,
+                                             use_llm_router=req.use_llm_router, use_llm=req.use_llm, trace=req.trace)
+
+    def events() -> Iterator[str]:
+        # Sync generator: Starlette iterates it on the threadpool
+        meta = {"route": result["route"], "route_confidence": result["route_confidence"],
+                "cache_hit": result["cache_hit"], "evidence": result["evidence"]}
+        if req.trace:
+            meta["trace"] = result["trace"]
+        yield _sse("meta", meta)
+        for kind, data in stream.events():
+            yield _sse(kind, {"text": data} if kind == "delta" else data)
+        yield _sse("done", stream.result())
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def main():
+    import uvicorn
+    p = argparse.ArgumentParser(description="Serve the QA pipeline over HTTP with warm retrievers.")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=1, help="Worker processes; each loads the sources once.")
+    args = p.parse_args()
+    uvicorn.run("api.server:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
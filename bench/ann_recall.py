@@ -0,0 +1,86 @@
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from retrievers.ann import INDEX_TYPES, apply_search_params, build_index, index_spec
+
+def load_vectors(index_dir: Path, synthetic: int, dim: int, seed: int) -> np.ndarray:
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        X = rng.standard_normal((synthetic, dim)).astype("float32")
+    else:
+        X = np.load(index_dir / "embeddings.npy").astype("float32")
+    X /= (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+    return X
+
+def make_queries(X: np.ndarray, n: int, noise: float, seed: int) -> np.ndarray:
+    """Perturbed corpus vectors, so every query has true neighbours in the corpus."""
+    rng = np.random.default_rng(seed + 1)
+    Q = X[rng.integers(0, X.shape[0], size=n)] + noise * rng.standard_normal((n, X.shape[1])).astype("float32")
+    return Q / (np.linalg.norm(Q, axis=1, keepdims=True) + 1e-12)
+
+def recall_at_k(I: np.ndarray, gt: np.ndarray, k: int) -> float:
+    return float(np.mean([len(set(a[:k]) & set(b[:k])) / k for a, b in zip(I, gt)]))
+
+def run(X: np.ndarray, Q: np.ndarray, k: int, types: List[str], nprobes: List[int], efs: List[int]) -> List[Dict]:
+    rows: List[Dict] = []
+    flat, _ = build_index(X, index_spec("flat"))
+    t0 = time.perf_counter()
+    _, gt = flat.search(Q, k)
+    flat_qps = len(Q) / (time.perf_counter() - t0)
+    rows.append({"type": "flat", "knob": None, "recall": 1.0, "qps": flat_qps, "build_s": 0.0})
+    for kind in types:
+        if kind == "flat":
+            continue
+        t0 = time.perf_counter()
+        index, eff = build_index(X, index_spec(kind))
+        build_s = time.perf_counter() - t0
+        sweep = [("nprobe", v) for v in nprobes if v <= eff["params"].get("nlist", v)] if kind.startswith("ivf") \
+            else [("ef_search", v) for v in efs]
+        for knob, value in sweep:
+            apply_search_params(index, **{knob: value})
+            t0 = time.perf_counter()
+            _, I = index.search(Q, k)
+            qps = len(Q) / (time.perf_counter() - t0)
+            rows.append({"type": kind, "knob": f"{knob}={value}", "recall": recall_at_k(I, gt, k),
+                         "qps": qps, "build_s": build_s, "params": eff["params"]})
+    return rows
+
+def main():
+    p = argparse.ArgumentParser(description="Recall@k and QPS of ANN index types against the exact flat baseline.")
+    p.add_argument("--index-dir", type=Path, default=BASE / "indexes" / "docs")
+    p.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of embeddings.npy.")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=1000)
+    p.add_argument("--noise", type=float, default=0.05)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    p.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    p.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--json", type=Path, default=None, help="Also write the rows as JSON here.")
+    args = p.parse_args()
+
+    X = load_vectors(args.index_dir, args.synthetic, args.dim, args.seed)
+    Q = make_queries(X, args.queries, args.noise, args.seed)
+    rows = run(X, Q, args.k, args.types, args.nprobe, args.ef_search)
+
+    print(f"N={X.shape[0]} dim={X.shape[1]} queries={len(Q)} k={args.k}")
+    print(f"{'index':<10} {'knob':<14} {'recall@k':>9} {'QPS':>12} {'build s':>9}")
+    for r in rows:
+        print(f"{r['type']:<10} {r['knob'] or '-':<14} {r['recall']:>9.3f} {r['qps']:>12.0f} {r['build_s']:>9.2f}")
+    if args.json:
+        args.json.write_text(json.dumps({"n": int(X.shape[0]), "dim": int(X.shape[1]), "k": args.k, "rows": rows}, indent=2))
+
+if __name__ == "__main__":
+    main()
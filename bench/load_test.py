@@ -0,0 +1,67 @@
+
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+DEFAULT_QUERIES = [
+    "Which Nolan movie has the highest IMDb rating?",
+    "What themes do critics mention about Interstellar?",
+    "Compare Inception and Interstellar box office and themes",
+    "When was Tenet released?",
+    "Describe the tone of Inception",
+]
+
+def post(url: str, body: Dict, timeout: float) -> float:
+    data = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+    return time.perf_counter() - t0
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    p = argparse.ArgumentParser(description="Closed-loop load test against the QA server's POST /query.")
+    p.add_argument("--url", default="http://127.0.0.1:8000/query")
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--route", default="auto")
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--queries", type=str, default=None, help="Text file with one query per line.")
+    args = p.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    bodies = [{"query": queries[i % len(queries)], "route": args.route} for i in range(args.requests)]
+
+    errors = 0
+    latencies: List[float] = []
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+        futures = [ex.submit(post, args.url, b, args.timeout) for b in bodies]
+        for fut in futures:
+            try:
+                latencies.append(fut.result())
+            except Exception:
+                errors += 1
+    wall = time.perf_counter() - t0
+
+    print(f"requests={args.requests} concurrency={args.concurrency} errors={errors} wall={wall:.2f}s")
+    print(f"throughput={len(latencies) / wall:.1f} req/s")
+    if latencies:
+        ms = [x * 1000 for x in latencies]
+        print(f"latency ms: mean={statistics.mean(ms):.1f} p50={percentile(ms, 0.5):.1f} "
+              f"p95={percentile(ms, 0.95):.1f} p99={percentile(ms, 0.99):.1f} max={max(ms):.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+import numpy as np
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+TARGETS = ("csv", "csv:columnar", "db", "docs", "vectors", "route:structured", "route:unstructured", "route:both")
+QUERY_TEMPLATES = ("{title} box office", "When was {title} released?", "{title} imdb rating",
+                   "What themes does {title} explore?", "What do critics say about {title}?")
+
+class HashEncoder:
+    """
+    Feature-hashing stand-in for the sentence-transformer with the same encode() call,
+    so store/FAISS scaling can be measured without downloading or running the model.
+    """
+    model_name = "bench/hash-encoder"
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+
+    def encode(self, texts: Sequence[str], convert_to_numpy: bool = True, normalize_embeddings: bool = True,
+               **_: object) -> np.ndarray:
+        from loaders.text import tokenize
+        X = np.zeros((len(texts), self.dim), dtype="float32")
+        for r, text in enumerate(texts):
+            np.add.at(X[r], [zlib.crc32(t.encode("utf-8")) % self.dim for t in tokenize(text)], 1.0)
+        return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+
+def make_encoder(kind: str):
+    if kind == "hash":
+        return HashEncoder()
+    from sentence_transformers import SentenceTransformer  # type: ignore
+    from etl.build_vectors import MODEL_NAME
+    encoder = SentenceTransformer(MODEL_NAME)
+    encoder.model_name = MODEL_NAME
+    return encoder
+
+def make_queries(rows: int, n: int, seed: int) -> List[str]:
+    """Deterministic mix of structured- and doc-style questions about movies in the lake."""
+    from etl.synth_lake import title_for
+    rng = np.random.default_rng(seed + 2)
+    ids = rng.integers(0, max(rows, 1), n)
+    templates = rng.integers(0, len(QUERY_TEMPLATES), n)
+    return [QUERY_TEMPLATES[t].format(title=title_for(int(i))) for i, t in zip(ids, templates)]
+
+def ensure_lake(work_dir: Path, rows: int, docs: int, seed: int, encoder_kind: str, index_type: str) -> Tuple[Path, Dict]:
+    """Generate (or reuse) a lake plus its BM25 and vector indexes; lake.json records build timings."""
+    lake = work_dir / f"rows{rows}_docs{docs}_seed{seed}"
+    info_path = lake / "lake.json"
+    want = {"encoder": encoder_kind, "index_type": index_type}
+    if info_path.exists():
+        info = json.loads(info_path.read_text())
+        if info.get("indexes") == want:
+            ensure_columnar(lake)
+            ensure_entities(lake)
+            return lake, info
+
+    from etl.synth_lake import generate
+    from etl.build_vectors import encode, load_chunks, save_store, write_faiss
+    from loaders.bm25 import BM25Index
+    from loaders.docs_loader import iter_docs
+    from retrievers.ann import index_spec
+
+    print(f"Generating lake rows={rows} docs={docs} under {lake} ...", file=sys.stderr)
+    info = generate(lake, rows, docs, seed=seed)
+    index_dir = lake / "indexes" / "docs"
+    t0 = time.perf_counter()
+    BM25Index.build(iter_docs(lake / "docs")).save(index_dir / "bm25.json")
+    info["timings"]["bm25_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    encoder = make_encoder(encoder_kind)
+    chunks = load_chunks(lake / "docs")
+    X = encode(encoder, chunks)
+    save_store(X, [{k: c[k] for k in ("doc", "chunk", "source_id")} for c in chunks], chunks, index_dir,
+               model_name=encoder.model_name)
+    write_faiss(X, index_spec(index_type), index_dir=index_dir)
+    info["timings"]["vectors_s"] = time.perf_counter() - t0
+    info["indexes"] = want
+    t0 = time.perf_counter()
+    ensure_columnar(lake)
+    info["timings"]["columnar_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ensure_entities(lake)
+    info["timings"]["entities_s"] = time.perf_counter() - t0
+    info_path.write_text(json.dumps(info, indent=2))
+    return lake, info
+
+def ensure_columnar(lake: Path) -> None:
+    """Arrow copies of the lake's CSVs (what etl/build_columnar.py writes), if missing or stale."""
+    from loaders.columnar import convert, find_columnar
+    for src in sorted((lake / "csv").glob("*.csv")):
+        if find_columnar(src, lake / "indexes" / "columnar") is None:
+            convert(src, lake / "indexes" / "columnar")
+
+def ensure_entities(lake: Path) -> None:
+    """The lake's entity index (what etl/build_entity_index.py writes), if missing or stale."""
+    from fusion.entities import EntityIndex
+    path = lake / "indexes" / "entities.json"
+    if not path.exists() or not EntityIndex.load(path).is_current():
+        EntityIndex.build(sorted((lake / "csv").glob("*.csv")), lake / "db" / "movies.db", lake / "docs").save(path)
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+def _peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def _searcher(target: str, lake: Path, case: Dict) -> Callable[[str], object]:
+    """Build the retriever (or pipeline) under test; returns a one-query search call."""
+    k = case["k"]
+    index_dir = lake / "indexes" / "docs"
+    columnar_dir = lake / "indexes" / "columnar"
+    hash_encode = HashEncoder().encode if case["encoder"] == "hash" else None
+    if target.startswith("csv"):
+        from loaders.csv_loader import CSVSource
+        src = CSVSource(lake / "csv" / "movies.csv", columnar_dir=columnar_dir if target == "csv:columnar" else None)
+        return lambda q: src.search(q, k=k)
+    if target == "db":
+        from loaders.db_loader import DBSource
+        src = DBSource(lake / "db" / "movies.db")
+        return lambda q: src.search(q, k=k)
+    if target == "docs":
+        from loaders.docs_loader import DocSource
+        src = DocSource(lake / "docs", index_path=index_dir / "bm25.json")
+        return lambda q: src.search(q, k=k)
+    if target == "vectors":
+        from retrievers.unstructured import UnstructuredRetriever
+        retr = UnstructuredRetriever(index_dir, cache_size=0)
+        if hash_encode is not None:
+            retr._encode_uncached = hash_encode
+        return lambda q: retr.search(q, k=k)
+    route = target.split(":", 1)[1]
+    from rag.pipeline import QAPipeline
+    pipeline = QAPipeline(csv_paths=[lake / "csv" / "movies.csv", lake / "csv" / "ratings.csv"],
+                          db_path=lake / "db" / "movies.db", docs_index=index_dir, embed_cache_path=None,
+                          columnar_dir=columnar_dir, entity_index=lake / "indexes" / "entities.json")
+    if route != "structured":
+        pipeline.retriever.unstructured.cache = None
+        if hash_encode is not None:
+            pipeline.retriever.unstructured._encode_uncached = hash_encode
+    return lambda q: pipeline.answer(q, k=k, route=route)
+
+def _preload(target: str) -> None:
+    """Import what the target needs, so import cost is reported apart from the data-dependent load."""
+    import loaders.docs_loader  # noqa: F401
+    if target.startswith(("csv", "db", "route:")):
+        import loaders.csv_loader, loaders.db_loader  # noqa: F401
+    if target == "csv":
+        import pandas  # noqa: F401
+    if target == "csv:columnar" or target.startswith("route:"):
+        import loaders.columnar  # noqa: F401
+    if target == "vectors" or target.startswith("route:"):
+        import retrievers.unstructured  # noqa: F401
+        from retrievers.ann import load_faiss
+        load_faiss()
+    if target.startswith("route:"):
+        import rag.pipeline, rag.answer  # noqa: F401
+
+def _percentile(sorted_ms: List[float], p: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(p / 100 * (len(sorted_ms) - 1))))]
+
+def run_case(case: Dict) -> Dict:
+    """Measure one target on one lake; runs in a fresh interpreter (see --worker)."""
+    lake = Path(case["lake"])
+    queries = make_queries(case["rows"], case["queries"] + case["warmup"], case["seed"])
+    t0 = time.perf_counter()
+    _preload(case["target"])
+    import_s = time.perf_counter() - t0
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    search = _searcher(case["target"], lake, case)
+    search(queries[0])  # lazy loads (index reads, mmaps, encoder) count as load time
+    load_s = time.perf_counter() - t0
+    rss_load = _rss_mb() - rss0
+    for q in queries[1:case["warmup"]]:
+        search(q)
+    lat_ms = []
+    for q in queries[case["warmup"]:]:
+        t = time.perf_counter()
+        search(q)
+        lat_ms.append(1000 * (time.perf_counter() - t))
+    lat_ms.sort()
+    return {"target": case["target"], "rows": case["rows"], "docs": case["docs"], "import_s": import_s, "load_s": load_s,
+            "rss_mb": rss_load, "rss_after_queries_mb": _rss_mb() - rss0, "queries": len(lat_ms),
+            "p50_ms": _percentile(lat_ms, 50), "p95_ms": _percentile(lat_ms, 95), "p99_ms": _percentile(lat_ms, 99),
+            "mean_ms": statistics.fmean(lat_ms), "qps": 1000 * len(lat_ms) / sum(lat_ms)}
+
+def spawn(case: Dict, timeout: float) -> Dict:
+    try:
+        proc = subprocess.run([sys.executable, __file__, "--worker", json.dumps(case)], cwd=BASE,
+                              capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"target": case["target"], "rows": case["rows"], "docs": case["docs"], "error": f"timeout after {timeout}s"}
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        err = proc.stderr.strip().splitlines()
+        return {"target": case["target"], "rows": case["rows"], "docs": case["docs"],
+                "error": err[-1] if err else f"exit {proc.returncode}"}
+    return json.loads(lines[-1])
+
+def run_meta(args: argparse.Namespace) -> Dict:
+    def git(*cmd: str) -> str:
+        try:
+            return subprocess.run(["git", *cmd], cwd=BASE, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return ""
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()
+                     if k not in ("json", "compare", "worker")}}
+
+def compare(old: Dict, new: Dict) -> None:
+    before = {(r["target"], r["rows"], r["docs"]): r for r in old["results"] if "error" not in r}
+    print(f"\nvs {old['meta'].get('commit', '?')[:10]}:  {'target':<20} {'rows':>9} {'docs':>8} "
+          f"{'p50 ms':>16} {'p95 ms':>16} {'QPS':>16}")
+    for r in new["results"]:
+        b = before.get((r["target"], r["rows"], r["docs"]))
+        if b is None or "error" in r:
+            continue
+        cells = [f"{b[m]:>7.2f}→{r[m]:<7.2f}" for m in ("p50_ms", "p95_ms")]
+        change = 100 * (r["qps"] / b["qps"] - 1)
+        print(f"{'':<14}{r['target']:<20} {r['rows']:>9} {r['docs']:>8} {cells[0]:>16} {cells[1]:>16} {change:>+15.1f}%")
+
+def parse_size(text: str) -> Tuple[int, int]:
+    rows, _, docs = text.partition(":")
+    return int(float(rows)), int(float(docs or 0))
+
+def main():
+    p = argparse.ArgumentParser(description="Retriever and route scaling on synthetic lakes: build time, memory, "
+                                            "latency percentiles and QPS.")
+    p.add_argument("--sizes", nargs="+", default=["1e3:1e2", "1e4:1e3", "1e5:1e4"],
+                   help="ROWS:DOCS per lake (e.g. 1e6:1e5).")
+    p.add_argument("--targets", nargs="+", default=list(TARGETS), choices=TARGETS)
+    p.add_argument("--queries", type=int, default=200, help="Timed queries per target.")
+    p.add_argument("--warmup", type=int, default=10)
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--encoder", choices=["hash", "st"], default="hash",
+                   help="'hash': feature-hashing encoder (no model needed); 'st': the real sentence-transformer.")
+    p.add_argument("--index-type", default="flat", help="FAISS index type for the doc vectors.")
+    p.add_argument("--work-dir", type=Path, default=BASE / "indexes" / "bench_lakes", help="Where lakes are generated and reused.")
+    p.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per target measurement.")
+    p.add_argument("--json", type=Path, default=None, help="Write results (with commit/machine metadata) here.")
+    p.add_argument("--compare", type=Path, default=None, help="Earlier --json output to compare against.")
+    p.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(json.loads(args.worker))))
+        return
+
+    report: Dict = {"meta": run_meta(args), "lakes": [], "results": []}
+    for size in args.sizes:
+        rows, docs = parse_size(size)
+        lake, info = ensure_lake(args.work_dir, rows, docs, args.seed, args.encoder, args.index_type)
+        report["lakes"].append(info)
+        for target in args.targets:
+            case = {"target": target, "lake": str(lake), "rows": rows, "docs": docs, "queries": args.queries,
+                    "warmup": args.warmup, "k": args.k, "seed": args.seed, "encoder": args.encoder}
+            report["results"].append(spawn(case, args.timeout))
+
+    print(f"{'rows':>9} {'docs':>8}  build s: {'csv':>6} {'db':>6} {'docs':>6} {'bm25':>6} {'vectors':>8}")
+    for info in report["lakes"]:
+        t = info["timings"]
+        print(f"{info['rows']:>9} {info['docs']:>8}  {'':>9}{t['csv_s']:>6.2f} {t['db_s']:>6.2f} {t['docs_s']:>6.2f} "
+              f"{t['bm25_s']:>6.2f} {t['vectors_s']:>8.2f}")
+    print(f"\n{'target':<20} {'rows':>9} {'docs':>8} {'load s':>8} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'QPS':>9}")
+    for r in report["results"]:
+        if "error" in r:
+            print(f"{r['target']:<20} {r['rows']:>9} {r['docs']:>8}  error: {r['error']}")
+            continue
+        print(f"{r['target']:<20} {r['rows']:>9} {r['docs']:>8} {r['load_s']:>8.2f} {r['rss_mb']:>8.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['qps']:>9.1f}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BASE = Path(__file__).resolve().parent.parent
+
+HEAVY = ("pandas", "pyarrow", "rapidfuzz", "faiss", "torch", "sentence_transformers")
+
+# Runs in a fresh interpreter so every measurement is a cold start.
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from rag.pipeline import QAPipeline
+t_import = time.perf_counter() - t0
+out = {"import_s": t_import}
+try:
+    QAPipeline(embed_cache_path=None).answer(QUERY, route=ROUTE)
+    out["first_result_s"] = time.perf_counter() - t0
+except Exception as e:
+    out["error"] = f"{type(e).__name__}: {e}"
+out["heavy_modules"] = [m for m in HEAVY if m in sys.modules]
+print(json.dumps(out))
+"""
+
+def probe(route: str, query: str) -> Dict:
+    code = f"QUERY = {query!r}\nROUTE = {route!r}\nHEAVY = {HEAVY!r}\n" + PROBE
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BASE, capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    return json.loads(lines[-1])
+
+def main():
+    p = argparse.ArgumentParser(description="Cold-start cost per route: import time and time to first result.")
+    p.add_argument("--routes", nargs="+", default=["structured", "unstructured", "both"])
+    p.add_argument("--query", default="Which Nolan movie has the highest IMDb rating?")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--json", type=Path, default=None, help="Also write the results as JSON here.")
+    args = p.parse_args()
+
+    probe("structured", "")  # warm the OS file cache
+    rows: List[Dict] = []
+    for route in args.routes:
+        runs = [probe(route, args.query) for _ in range(args.repeat)]
+        ok = [r for r in runs if "error" not in r]
+        row = {"route": route, "runs": len(runs), "errors": len(runs) - len(ok)}
+        if ok:
+            row["import_ms"] = 1000 * statistics.median(r["import_s"] for r in ok)
+            row["first_result_ms"] = 1000 * statistics.median(r["first_result_s"] for r in ok)
+            row["heavy_modules"] = ok[-1]["heavy_modules"]
+        else:
+            row["error"] = runs[-1]["error"]
+        rows.append(row)
+
+    print(f"{'route':<13} {'import ms':>10} {'first result ms':>16}  heavy modules loaded")
+    for r in rows:
+        if "error" in r:
+            print(f"{r['route']:<13} {'-':>10} {'-':>16}  error: {r['error']}")
+        else:
+            print(f"{r['route']:<13} {r['import_ms']:>10.1f} {r['first_result_ms']:>16.1f}  {', '.join(r['heavy_modules']) or '(none)'}")
+    if args.json:
+        args.json.write_text(json.dumps(rows, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from loaders.columnar import FORMATS, SPREADSHEET_SUFFIXES, convert, find_columnar
+
+CSV_DIR = BASE / "data_lake" / "csv"
+COLUMNAR_DIR = BASE / "indexes" / "columnar"
+
+def lake_tables(src_dir: Path) -> List[Path]:
+    return sorted(p for p in Path(src_dir).iterdir() if p.suffix.lower() in (".csv", *SPREADSHEET_SUFFIXES))
+
+def build(src_dir: Path = CSV_DIR, out_dir: Path = COLUMNAR_DIR, fmt: str = "arrow", force: bool = False) -> List[Path]:
+    """Convert every CSV/Excel file in `src_dir`; files whose columnar copy is current are skipped."""
+    written = []
+    for src in lake_tables(src_dir):
+        current = find_columnar(src, out_dir)
+        if current is not None and current.suffix == FORMATS[fmt] and not force:
+            continue
+        t0 = time.perf_counter()
+        out = convert(src, out_dir, fmt=fmt)
+        for stale in (out_dir / (src.stem + s) for s in FORMATS.values()):
+            if stale != out and stale.exists():
+                stale.unlink()  # one copy per source, so readers never pick an outdated format
+        print(f"  {src.name} → {out.name} ({out.stat().st_size / 2**20:.1f} MB) in {time.perf_counter() - t0:.2f}s")
+        written.append(out)
+    return written
+
+def main():
+    p = argparse.ArgumentParser(description="Convert lake CSV/Excel files to typed Arrow IPC or Parquet for CSVSource.")
+    p.add_argument("--src", type=Path, default=CSV_DIR, help="Directory with the lake's .csv/.xlsx files.")
+    p.add_argument("--out", type=Path, default=COLUMNAR_DIR)
+    p.add_argument("--format", choices=list(FORMATS), default="arrow",
+                   help="arrow: memory-mapped, zero-copy reads (default); parquet: smaller, decoded on read.")
+    p.add_argument("--force", action="store_true", help="Rewrite files even if their columnar copy is current.")
+    args = p.parse_args()
+    written = build(args.src, args.out, fmt=args.format, force=args.force)
+    print(f"Wrote {len(written)} columnar file(s) to {args.out}")
+
+if __name__ == "__main__":
+    main()
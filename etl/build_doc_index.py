@@ -0,0 +1,26 @@
+
+from __future__ import annotations
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from loaders.bm25 import BM25Index
+from loaders.docs_loader import iter_docs
+
+DOCS_DIR = BASE / "data_lake" / "docs"
+INDEX_DIR = BASE / "indexes" / "docs"
+BM25_PATH = INDEX_DIR / "bm25.json"
+
+def main():
+    t0 = time.perf_counter()
+    index = BM25Index.build(iter_docs(DOCS_DIR))
+    index.save(BM25_PATH)
+    print(f"Built BM25 index over {len(index)} docs ({len(index.postings)} terms) "
+          f"in {time.perf_counter() - t0:.2f}s at {BM25_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 
 from __future__ import annotations
+import argparse
+import hashlib
 import json
+import os
+import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 import numpy as np
 
 try:
@@ -18,39 +22,178 @@ except Exception:
     _ST_OK = False
 
 BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from retrievers.ann import INDEX_TYPES, build_index, index_spec, read_spec
+
 DOCS_DIR = BASE / "data_lake" / "docs"
 INDEX_DIR = BASE / "indexes" / "docs"
-INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-def load_chunks() -> List[Dict]:
+# File names inside an index dir; the *_PATH constants are the default lake's copies
+EMB_FILE, META_FILE, OFFSETS_FILE = "embeddings.npy", "metadata.jsonl", "metadata.offsets.npy"
+FAISS_FILE, FAISS_SPEC_FILE, MANIFEST_FILE = "faiss.index", "faiss.json", "manifest.json"
+
+EMB_PATH = INDEX_DIR / EMB_FILE
+META_PATH = INDEX_DIR / META_FILE
+FAISS_PATH = INDEX_DIR / FAISS_FILE
+FAISS_SPEC_PATH = INDEX_DIR / FAISS_SPEC_FILE
+OFFSETS_PATH = INDEX_DIR / OFFSETS_FILE
+MANIFEST_PATH = INDEX_DIR / MANIFEST_FILE
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def load_chunks(docs_dir: Path = DOCS_DIR) -> List[Dict]:
     chunks = []
-    for p in DOCS_DIR.glob("*.txt"):
+    for p in sorted(Path(docs_dir).glob("*.txt")):
         text = p.read_text(encoding="utf-8", errors="ignore")
-        chunks.append({"doc": p.name, "chunk": text, "source_id": f"doc:{p.name}"})
+        chunks.append({"doc": p.name, "chunk": text, "source_id": f"doc:{p.name}", "sha256": content_hash(text)})
     return chunks
 
+def load_manifest(index_dir: Path = INDEX_DIR) -> Optional[Dict]:
+    """Manifest of the current index: model name and content hash per doc."""
+    index_dir = Path(index_dir)
+    if not all((index_dir / name).exists() for name in (MANIFEST_FILE, EMB_FILE, META_FILE)):
+        return None
+    return json.loads((index_dir / MANIFEST_FILE).read_text())
+
+def load_metadata(index_dir: Path = INDEX_DIR) -> List[Dict]:
+    with open(Path(index_dir) / META_FILE, "r") as f:
+        return [json.loads(line) for line in f]
+
+def plan_update(chunks: List[Dict], manifest: Dict, meta: List[Dict]) -> Tuple[np.ndarray, List[Dict], List[str]]:
+    """
+    Compare current docs against the manifest.
+    Returns (mask of stored rows to keep, chunks to embed, names of removed docs).
+    """
+    current = {c["doc"]: c["sha256"] for c in chunks}
+    indexed = manifest.get("docs", {})
+    keep = np.array([current.get(m["doc"]) == indexed.get(m["doc"]) for m in meta], dtype=bool)
+    todo = [c for c in chunks if indexed.get(c["doc"]) != c["sha256"]]
+    removed = sorted(set(indexed) - set(current))
+    return keep, todo, removed
+
+def _atomic_write(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+def _save_npy(path: Path, X: np.ndarray) -> None:
+    with open(path, "wb") as f:
+        np.save(f, X)
+
+def save_store(X: np.ndarray, meta: List[Dict], chunks: List[Dict], index_dir: Path = INDEX_DIR,
+               model_name: str = MODEL_NAME) -> None:
+    """
+    Write the retriever's on-disk format: normalized float32 embeddings that can be
+    opened with mmap_mode, metadata lines plus their byte offsets, and the manifest.
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    _atomic_write(index_dir / EMB_FILE, lambda p: _save_npy(p, np.ascontiguousarray(X, dtype="float32")))
+    offsets = [0]
+    def write_meta(p):
+        with open(p, "wb") as f:
+            for m in meta:
+                offsets.append(offsets[-1] + f.write((json.dumps(m) + "\n").encode("utf-8")))
+    _atomic_write(index_dir / META_FILE, write_meta)
+    _atomic_write(index_dir / OFFSETS_FILE, lambda p: _save_npy(p, np.asarray(offsets, dtype=np.int64)))
+    manifest = {"model": model_name, "normalized": True, "dim": int(X.shape[1]),
+                "docs": {c["doc"]: c["sha256"] for c in chunks}}
+    _atomic_write(index_dir / MANIFEST_FILE, lambda p: p.write_text(json.dumps(manifest, indent=2)))
+
+def write_faiss(X: np.ndarray, spec: Dict[str, Any], appended: Optional[np.ndarray] = None,
+                index_dir: Path = INDEX_DIR) -> None:
+    """
+    Append `appended` to the existing index when it was built with the same spec;
+    otherwise build (and train) a fresh index of the requested type from X.
+    The effective build/search parameters are stored in faiss.json next to the index.
+    """
+    if not _FAISS_OK:
+        print("FAISS not installed; using NumPy search fallback.")
+        return
+    faiss_path, spec_path = Path(index_dir) / FAISS_FILE, Path(index_dir) / FAISS_SPEC_FILE
+    stored = read_spec(spec_path)
+    if appended is not None and faiss_path.exists() and stored is not None and stored.get("requested") == spec:
+        index = faiss.read_index(str(faiss_path))
+        index.add(appended)
+        effective = stored
+        action = f"Appended {appended.shape[0]} vectors to"
+    else:
+        index, effective = build_index(X, spec)
+        effective["requested"] = spec
+        action = "Built"
+    effective["ntotal"] = int(index.ntotal)
+    _atomic_write(faiss_path, lambda p: faiss.write_index(index, str(p)))
+    _atomic_write(spec_path, lambda p: p.write_text(json.dumps(effective, indent=2)))
+    print(f"{action} {effective['type']} FAISS index ({index.ntotal} vectors) at {faiss_path}")
+
+def encode(encoder, chunks: List[Dict]) -> np.ndarray:
+    texts = [c["chunk"] for c in chunks]
+    return encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+
 def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--docs-dir", type=Path, default=DOCS_DIR, help="Directory of .txt docs to embed.")
+    p.add_argument("--index-dir", type=Path, default=INDEX_DIR, help="Where the embedding store and FAISS index live.")
+    p.add_argument("--full", action="store_true", help="Re-embed every doc instead of only new/changed ones.")
+    p.add_argument("--index-type", choices=INDEX_TYPES, default=None,
+                   help="FAISS index to build (default: keep the current type, else flat).")
+    p.add_argument("--nlist", type=int, default=None, help="IVF: number of clusters.")
+    p.add_argument("--nprobe", type=int, default=None, help="IVF: default clusters probed per query.")
+    p.add_argument("--pq-m", type=int, default=None, help="IVF-PQ: number of sub-quantizers.")
+    p.add_argument("--hnsw-m", type=int, default=None, help="HNSW: graph degree.")
+    p.add_argument("--ef-construction", type=int, default=None, help="HNSW: build-time candidate list size.")
+    p.add_argument("--ef-search", type=int, default=None, help="HNSW: default search-time candidate list size.")
+    args = p.parse_args()
+
+    knobs = dict(nlist=args.nlist, nprobe=args.nprobe, pq_m=args.pq_m, hnsw_m=args.hnsw_m,
+                 ef_construction=args.ef_construction, ef_search=args.ef_search)
+    index_dir = args.index_dir
+    stored = read_spec(index_dir / FAISS_SPEC_FILE)
+    if args.index_type is None and stored is not None and all(v is None for v in knobs.values()):
+        spec = stored.get("requested") or index_spec(stored["type"])
+    else:
+        spec = index_spec(args.index_type or (stored or {}).get("type", "flat"), **knobs)
+
     if not _ST_OK:
         raise RuntimeError("sentence-transformers not installed. Please `pip install sentence-transformers torch`.")
-    encoder = SentenceTransformer(MODEL_NAME)
-    chunks = load_chunks()
-    texts = [c["chunk"] for c in chunks]
-    X = encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
-    np.save(INDEX_DIR / "embeddings.npy", X)
-    with open(INDEX_DIR / "metadata.jsonl", "w") as f:
-        for c in chunks:
-            f.write(json.dumps(c) + "\n")
-    if _FAISS_OK:
-        dim = X.shape[1]
-        index = faiss.IndexFlatIP(dim)
-        index.add(X)
-        faiss.write_index(index, str(INDEX_DIR / "faiss.index"))
-        print(f"Built FAISS index with {X.shape[0]} vectors at {INDEX_DIR/'faiss.index'}")
-    else:
-        print("FAISS not installed; using NumPy search fallback.")
-    print(f"Saved embeddings to {INDEX_DIR/'embeddings.npy'} and metadata to {INDEX_DIR/'metadata.jsonl'}")
+    chunks = load_chunks(args.docs_dir)
+    manifest = None if args.full else load_manifest(index_dir)
+    if manifest is not None and manifest.get("model") != MODEL_NAME:
+        print(f"Embedding model changed ({manifest.get('model')} -> {MODEL_NAME}); doing a full rebuild.")
+        manifest = None
+
+    if manifest is None:
+        encoder = SentenceTransformer(MODEL_NAME)
+        X = encode(encoder, chunks)
+        meta = [{k: c[k] for k in ("doc", "chunk", "source_id")} for c in chunks]
+        save_store(X, meta, chunks, index_dir)
+        write_faiss(X, spec, index_dir=index_dir)
+        print(f"Embedded {len(chunks)} docs. Saved embeddings and metadata to {index_dir}")
+        return
+
+    old_meta = load_metadata(index_dir)
+    keep, todo, removed = plan_update(chunks, manifest, old_meta)
+    if not todo and keep.all():
+        if _FAISS_OK and (stored or {}).get("requested") != spec:
+            write_faiss(np.load(index_dir / EMB_FILE), spec, index_dir=index_dir)
+        print(f"Index up to date ({len(old_meta)} chunks); nothing to embed.")
+        return
+
+    old_X = np.load(index_dir / EMB_FILE, mmap_mode="r")
+    new_X = encode(SentenceTransformer(MODEL_NAME), todo) if todo else np.empty((0, old_X.shape[1]), dtype="float32")
+    compacted = not keep.all()
+    X = np.concatenate([old_X[keep] if compacted else np.asarray(old_X), new_X]).astype("float32", copy=False)
+    meta = [m for m, kept in zip(old_meta, keep) if kept] + [{k: c[k] for k in ("doc", "chunk", "source_id")} for c in todo]
+    del old_X
+    save_store(X, meta, chunks, index_dir)
+    write_faiss(X, spec, appended=None if compacted else new_X, index_dir=index_dir)
+    print(f"Incremental update: embedded {len(todo)} new/changed docs, dropped {int((~keep).sum())} stale rows "
+          f"({len(removed)} deleted docs); {X.shape[0]} rows total.")
 
 if __name__ == "__main__":
     main()
@@ -1,21 +1,59 @@
 import sqlite3
 from pathlib import Path
+from typing import Sequence
 
 BASE = Path(__file__).resolve().parent.parent
 DB_DIR = BASE / "data_lake" / "db"
 DB_PATH = DB_DIR / "movies.db"
 SEED_SQL = DB_DIR / "seed.sql"
 
-def main():
-    DB_DIR.mkdir(parents=True, exist_ok=True)
-    if DB_PATH.exists():
-        DB_PATH.unlink()  # fresh build
-    con = sqlite3.connect(DB_PATH)
-    with open(SEED_SQL, "r") as f:
+# Columns indexed for full-text search, per table
+FTS_COLUMNS = {"movies": ("title", "director", "genres")}
+
+def build_fts(con: sqlite3.Connection, table: str, columns: Sequence[str]) -> None:
+    """
+    Create an external-content FTS5 index `<table>_fts` over `columns`, kept in sync
+    with the base table by triggers, and populate it from existing rows.
+    """
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    con.executescript(f"""
+DROP TABLE IF EXISTS {fts};
+CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+DROP TRIGGER IF EXISTS {table}_fts_ai;
+DROP TRIGGER IF EXISTS {table}_fts_ad;
+DROP TRIGGER IF EXISTS {table}_fts_au;
+CREATE TRIGGER {table}_fts_ai AFTER INSERT ON {table} BEGIN
+  INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+END;
+CREATE TRIGGER {table}_fts_ad AFTER DELETE ON {table} BEGIN
+  INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+END;
+CREATE TRIGGER {table}_fts_au AFTER UPDATE ON {table} BEGIN
+  INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+  INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+END;
+INSERT INTO {fts}({fts}) VALUES ('rebuild');
+""")
+
+def seed(db_path: Path = DB_PATH, seed_sql: Path = SEED_SQL) -> None:
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()  # fresh build
+    con = sqlite3.connect(db_path)
+    with open(seed_sql, "r") as f:
         con.executescript(f.read())
+    for table, columns in FTS_COLUMNS.items():
+        build_fts(con, table, columns)
     con.commit()
     con.close()
-    print(f"Seeded SQLite database at {DB_PATH}")
+
+def main():
+    seed(DB_PATH, SEED_SQL)
+    print(f"Seeded SQLite database at {DB_PATH} (FTS5 index: {', '.join(t + '_fts' for t in FTS_COLUMNS)})")
 
 if __name__ == "__main__":
     main()
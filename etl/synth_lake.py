@@ -0,0 +1,153 @@
+
+from __future__ import annotations
+import argparse
+import csv
+import json
+import shutil
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+import numpy as np
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from etl.seed_db import FTS_COLUMNS, SEED_SQL, build_fts
+
+LAKE_DIR = BASE / "data_lake"
+
+ADJECTIVES = """Crimson Silent Broken Hidden Endless Golden Frozen Burning Distant Hollow Electric Midnight Scarlet Quiet
+Savage Lonely Shattered Eternal Velvet Iron Paper Glass Wild Lost Final Secret Fading Rising Falling Bitter Amber
+Neon Pale Restless Forgotten Sacred Stolen Wicked Gentle Northern""".split()
+NOUNS = """Horizon Empire Signal Garden Voyage Harbor Machine Kingdom Echo Frontier Mirror River Covenant Orbit Labyrinth
+Lantern Tide Citadel Memory Paradox Serpent Requiem Station Meridian Archive Compass Eclipse Reckoning Sanctuary
+Cascade Outpost Spiral Threshold Vertigo Monolith Prism Catalyst Inferno Harvest Static""".split()
+FIRST = "Ava Ben Chloe Dev Elena Farid Grace Hiro Ines Jonas Kira Luca Maya Nikolai Omar Priya Quinn Rosa Sven Tariq".split()
+LAST = "Okafor Lindqvist Moreau Tanaka Alvarez Novak Haddad Kowalski Mensah Ribeiro Varga Sato Brennan Iyer Castillo".split()
+GENRES = ["Science Fiction", "Thriller", "Drama", "Action", "Crime", "Mystery", "Biography", "Comedy", "Horror", "Romance"]
+THEMES = """grief memory identity ambition sacrifice time guilt love betrayal survival obsession redemption loneliness
+power family faith revenge freedom truth loss""".split()
+VERDICTS = ["a mind-bending puzzle", "a slow-burn character study", "a sprawling epic", "an intimate chamber piece",
+            "a relentless thriller", "a meditation on {theme}", "a crowd-pleasing spectacle", "an uneven but bold experiment"]
+PRAISE = ["layered structure", "practical effects", "haunting score", "committed performances", "striking cinematography",
+          "tight editing", "ambitious worldbuilding", "restrained direction"]
+
+def title_for(i: int) -> str:
+    """Unique, deterministic title for synthetic row i."""
+    a, rest = i % len(ADJECTIVES), i // len(ADJECTIVES)
+    n, part = rest % len(NOUNS), rest // len(NOUNS)
+    return f"The {ADJECTIVES[a]} {NOUNS[n]}" + (f" {part + 1}" if part else "")
+
+def movie_batches(rows: int, seed: int, batch: int) -> Iterator[Dict[str, List]]:
+    """Columns for `rows` synthetic movies, `batch` rows at a time (numpy-vectorized)."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        g1 = rng.integers(0, len(GENRES), n)
+        g2 = (g1 + rng.integers(1, len(GENRES), n)) % len(GENRES)
+        imdb = np.round(np.clip(rng.normal(6.6, 1.0, n), 1.0, 9.8), 1)
+        yield {
+            "title": [title_for(i) for i in range(start, start + n)],
+            "release_year": rng.integers(1950, 2025, n).tolist(),
+            "director": [f"{FIRST[f]} {LAST[l]}" for f, l in zip(rng.integers(0, len(FIRST), n), rng.integers(0, len(LAST), n))],
+            "box_office_usd": (rng.lognormal(17.5, 1.3, n)).astype(np.int64).tolist(),
+            "runtime_min": rng.integers(80, 200, n).tolist(),
+            "genres": [f"{GENRES[a]}, {GENRES[b]}" for a, b in zip(g1, g2)],
+            "imdb": imdb.tolist(),
+            "metacritic": np.clip(np.round(imdb * 10 + rng.normal(0, 8, n)), 1, 100).astype(int).tolist(),
+            "rt_tomatoes": np.clip(np.round(imdb * 11 + rng.normal(0, 12, n)), 1, 100).astype(int).tolist(),
+        }
+
+def review_text(title: str, rng: np.random.Generator) -> str:
+    themes = rng.choice(THEMES, 3, replace=False)
+    praise = rng.choice(PRAISE, 2, replace=False)
+    verdict = VERDICTS[rng.integers(len(VERDICTS))].format(theme=themes[0])
+    sentences = [
+        f"{title} is frequently described as {verdict} that delves into {themes[0]}, {themes[1]}, and {themes[2]}.",
+        f"Critics praise its {praise[0]} and {praise[1]}.",
+        "Some reviewers found the third act overlong, but most agree it rewards a second viewing.",
+        f"Its treatment of {themes[1]} has been compared to earlier genre classics.",
+    ]
+    return " ".join(sentences[: 2 + rng.integers(0, 3)]) + "\n"
+
+def write_csvs(out: Path, rows: int, seed: int, batch: int) -> None:
+    """movies.csv / ratings.csv with the shipped rows first, then synthetic rows."""
+    csv_dir = out / "csv"
+    csv_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("movies.csv", "ratings.csv"):
+        shutil.copyfile(LAKE_DIR / "csv" / name, csv_dir / name)
+    with open(csv_dir / "movies.csv", "a", newline="") as fm, open(csv_dir / "ratings.csv", "a", newline="") as fr:
+        wm, wr = csv.writer(fm), csv.writer(fr)
+        for cols in movie_batches(rows, seed, batch):
+            wm.writerows(zip(cols["title"], cols["release_year"], cols["director"], cols["box_office_usd"],
+                             cols["runtime_min"], cols["genres"]))
+            wr.writerows(zip(cols["title"], cols["imdb"], cols["metacritic"], cols["rt_tomatoes"]))
+
+def write_db(out: Path, rows: int, seed: int, batch: int) -> None:
+    """movies.db from seed.sql plus synthetic rows; the FTS index is built once after the bulk load."""
+    db_path = out / "db" / "movies.db"
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    if db_path.exists():
+        db_path.unlink()
+    con = sqlite3.connect(db_path)
+    con.executescript(SEED_SQL.read_text())
+    con.execute("PRAGMA journal_mode=OFF")
+    con.execute("PRAGMA synchronous=OFF")
+    for cols in movie_batches(rows, seed, batch):
+        con.executemany("INSERT INTO movies (title, release_year, director, box_office_usd, runtime_min, genres) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        zip(cols["title"], cols["release_year"], cols["director"], cols["box_office_usd"],
+                            cols["runtime_min"], cols["genres"]))
+    for table, columns in FTS_COLUMNS.items():
+        build_fts(con, table, columns)
+    con.commit()
+    con.close()
+
+def write_docs(out: Path, docs: int, rows: int, seed: int) -> None:
+    """The shipped docs plus `docs` synthetic reviews, each about one of the synthetic movies."""
+    docs_dir = out / "docs"
+    shutil.rmtree(docs_dir, ignore_errors=True)  # drop reviews from a previous, larger run
+    docs_dir.mkdir(parents=True)
+    for p in sorted((LAKE_DIR / "docs").glob("*.txt")):
+        shutil.copyfile(p, docs_dir / p.name)
+    rng = np.random.default_rng(seed + 1)
+    width = len(str(max(docs - 1, 0)))
+    for i in range(docs):
+        title = title_for(int(rng.integers(0, max(rows, 1))))
+        slug = title.lower().replace(" ", "_")
+        (docs_dir / f"review_{i:0{width}d}_{slug}.txt").write_text(review_text(title, rng), encoding="utf-8")
+
+def generate(out: Path, rows: int, docs: int, seed: int = 0, batch: int = 100_000) -> Dict:
+    """Write a lake with the data_lake schema under `out`; returns its lake.json record (with build timings)."""
+    out = Path(out)
+    timings: Dict[str, float] = {}
+    for name, step in (("csv_s", lambda: write_csvs(out, rows, seed, batch)),
+                       ("db_s", lambda: write_db(out, rows, seed, batch)),
+                       ("docs_s", lambda: write_docs(out, docs, rows, seed))):
+        t0 = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - t0
+    info = {"rows": rows, "docs": docs, "seed": seed, "timings": timings,
+            "bytes": {p.name: p.stat().st_size for p in [out / "csv" / "movies.csv", out / "csv" / "ratings.csv",
+                                                           out / "db" / "movies.db"]}}
+    (out / "lake.json").write_text(json.dumps(info, indent=2))
+    return info
+
+def main():
+    p = argparse.ArgumentParser(description="Generate a synthetic data lake with the same schema as data_lake/.")
+    p.add_argument("--out", type=Path, required=True, help="Output directory (gets csv/, db/, docs/, lake.json).")
+    p.add_argument("--rows", type=int, default=10_000, help="Synthetic movies (added to the shipped ones).")
+    p.add_argument("--docs", type=int, default=1_000, help="Synthetic review docs (added to the shipped ones).")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--batch", type=int, default=100_000, help="Rows generated and written per batch.")
+    args = p.parse_args()
+    info = generate(args.out, args.rows, args.docs, seed=args.seed, batch=args.batch)
+    t = info["timings"]
+    print(f"Wrote {args.rows} movies and {args.docs} docs to {args.out} "
+          f"(csv {t['csv_s']:.1f}s, db {t['db_s']:.1f}s, docs {t['docs_s']:.1f}s)")
+
+if __name__ == "__main__":
+    main()
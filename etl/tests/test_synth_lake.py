@@ -0,0 +1,25 @@
+import sqlite3
+
+import pandas as pd
+
+from etl.synth_lake import LAKE_DIR, generate, title_for
+from loaders.db_loader import DBSource
+
+def test_generated_lake_matches_shipped_schema(tmp_path):
+    info = generate(tmp_path, rows=500, docs=20, seed=1, batch=128)
+    movies = pd.read_csv(tmp_path / "csv" / "movies.csv")
+    ratings = pd.read_csv(tmp_path / "csv" / "ratings.csv")
+    shipped = pd.read_csv(LAKE_DIR / "csv" / "movies.csv")
+    assert list(movies.columns) == list(shipped.columns)
+    assert len(movies) == len(ratings) == 500 + len(shipped)
+    assert movies["title"].is_unique and (movies["title"] == ratings["title"]).all()
+    con = sqlite3.connect(tmp_path / "db" / "movies.db")
+    assert con.execute("SELECT COUNT(*) FROM movies").fetchone()[0] == len(movies)
+    con.close()
+    hits = DBSource(tmp_path / "db" / "movies.db").search(title_for(123), k=1)
+    assert hits[0].payload["title"] == title_for(123)
+    assert len(list((tmp_path / "docs").glob("*.txt"))) == 20 + 2
+    assert info["rows"] == 500 and set(info["timings"]) == {"csv_s", "db_s", "docs_s"}
+    # Same seed, same lake
+    generate(tmp_path / "again", rows=500, docs=20, seed=1, batch=128)
+    assert (tmp_path / "again" / "csv" / "movies.csv").read_bytes() == (tmp_path / "csv" / "movies.csv").read_bytes()
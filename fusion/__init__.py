@@ -1,2 +1,3 @@
-from .normalize import normalize_retrieval, canonical_title, row_to_triples
-__all__ = ['normalize_retrieval','canonical_title','row_to_triples']
+from .normalize import normalize_retrieval, canonical_title, row_to_triples, linked_facts
+from .entities import EntityIndex
+__all__ = ['normalize_retrieval','canonical_title','row_to_triples','linked_facts','EntityIndex']
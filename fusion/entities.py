@@ -0,0 +1,149 @@
+from __future__ import annotations
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loaders.text import STOPWORDS, _TOKEN_RE
+from .normalize import canonical_title
+
+# Longest title (in tokens) looked for in doc text
+MAX_TITLE_TOKENS = 8
+
+def title_key(title: str) -> str:
+    """Case/punctuation-insensitive form of a title, used only while building the index."""
+    return " ".join(_TOKEN_RE.findall((title or "").lower()))
+
+def _stamp(path: Path) -> List[Any]:
+    try:
+        st = Path(path).stat()
+        return [str(Path(path).resolve()), st.st_size, st.st_mtime_ns]
+    except FileNotFoundError:
+        return [str(Path(path).resolve()), None, None]
+
+def _doc_stamp(docs_dir: Path) -> List[Any]:
+    # Newest mtime and count of the .txt files; adding, editing or removing a doc changes it
+    files = sorted(Path(docs_dir).glob("*.txt"))
+    return [str(Path(docs_dir).resolve()), len(files), max((p.stat().st_mtime_ns for p in files), default=None)]
+
+class EntityIndex:
+    """
+    Cross-source entity index built at ingest by etl/build_entity_index.py.
+    `entities` maps a canonical id ("inception (2010)") to the entity's title and the source ids of its
+    DB rows, CSV rows (any file) and the docs that mention it; `titles` maps each raw title seen in
+    the lake to its id. Fusion resolves hits with dict lookups instead of re-canonicalizing strings.
+    """
+    def __init__(self, entities: Dict[str, Dict[str, Any]], titles: Dict[str, str],
+                 sources: Sequence[List[Any]] = ()) -> None:
+        self.entities = entities
+        self.titles = titles
+        self.sources = [list(s) for s in sources]
+        self.by_doc: Dict[str, List[str]] = {}
+        for eid, ent in entities.items():
+            for doc in ent["docs"]:
+                self.by_doc.setdefault(doc, []).append(eid)
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def entity_id(self, title: Any) -> Optional[str]:
+        return self.titles.get(title)
+
+    def doc_entities(self, doc: str) -> List[str]:
+        return self.by_doc.get(doc, [])
+
+    def is_current(self) -> bool:
+        """False once any source the index was built from has changed."""
+        return all((_doc_stamp(Path(s[0])) if Path(s[0]).is_dir() else _stamp(Path(s[0]))) == s for s in self.sources)
+
+    def covers(self, paths: Iterable[Path]) -> bool:
+        """True if the index was built from all of `paths` (so it describes the lake being queried)."""
+        built = {s[0] for s in self.sources}
+        return all(str(Path(p).resolve()) in built for p in paths)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"sources": self.sources, "titles": self.titles, "entities": self.entities},
+                                  ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "EntityIndex":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(data["entities"], data["titles"], data.get("sources", ()))
+
+    @classmethod
+    def build(cls, csv_paths: Iterable[Path], db_path: Optional[Path], docs_dir: Optional[Path],
+              table: str = "movies", key_column: str = "title") -> "EntityIndex":
+        """Link DB rows, CSV rows and docs of the same title; rows with a release year are canonicalized with it."""
+        entities: Dict[str, Dict[str, Any]] = {}
+        titles: Dict[str, str] = {}
+        keys: Dict[str, str] = {}
+        sources: List[List[Any]] = []
+
+        def add(title: Any, year: Any, source_id: str, kind: str) -> None:
+            if title is None or title == "":
+                return
+            title = str(title)
+            if isinstance(year, int):
+                eid = canonical_title(title, year)
+            else:
+                # Files without a year (ratings.csv) join on the title seen in a file that has one
+                eid = titles.get(title) or keys.get(title_key(title)) or canonical_title(title)
+            ent = entities.get(eid)
+            if ent is None:
+                ent = entities[eid] = {"title": title, "db": [], "csv": [], "docs": []}
+            ent[kind].append(source_id)
+            titles.setdefault(title, eid)
+            keys.setdefault(title_key(title), eid)
+
+        if db_path is not None and Path(db_path).exists():
+            sources.append(_stamp(Path(db_path)))
+            con = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+            try:
+                cols = [r[1] for r in con.execute(f"PRAGMA table_info({table})")]
+                year_sql = "release_year" if "release_year" in cols else "NULL"
+                for title, year in con.execute(f"SELECT {key_column}, {year_sql} FROM {table}"):
+                    add(title, year, f"db:{table}:{title}", "db")
+            finally:
+                con.close()
+        for path in csv_paths:
+            path = Path(path)
+            sources.append(_stamp(path))
+            for title, year in _csv_titles(path, key_column):
+                add(title, year, f"csv:{path.name}:{title}", "csv")
+
+        if docs_dir is not None and Path(docs_dir).is_dir():
+            from loaders.docs_loader import iter_docs
+            sources.append(_doc_stamp(Path(docs_dir)))
+            longest = min(MAX_TITLE_TOKENS, max((k.count(" ") + 1 for k in keys), default=0))
+            for doc, text in iter_docs(Path(docs_dir)):
+                for eid in _mentions(text, keys, longest):
+                    entities[eid]["docs"].append(doc)
+        return cls(entities, titles, sources)
+
+def _csv_titles(path: Path, key_column: str) -> Iterable[Tuple[Any, Any]]:
+    import pyarrow.csv as pacsv
+    opts = pacsv.ConvertOptions(include_columns=[key_column, "release_year"], include_missing_columns=True,
+                                column_types={key_column: "string"})
+    t = pacsv.read_csv(path, convert_options=opts)
+    return zip(t.column(key_column).to_pylist(), t.column("release_year").to_pylist())
+
+def _mentions(text: str, keys: Dict[str, str], longest: int) -> List[str]:
+    """Entity ids whose title occurs in `text`, longest match first at each position, in order of appearance."""
+    toks = _TOKEN_RE.findall(text.lower())
+    found: Dict[str, None] = {}
+    i = 0
+    while i < len(toks):
+        for n in range(min(longest, len(toks) - i), 0, -1):
+            key = " ".join(toks[i:i + n])
+            eid = keys.get(key)
+            if eid is not None and not (n == 1 and key in STOPWORDS):
+                found[eid] = None
+                i += n
+                break
+        else:
+            i += 1
+    return list(found)
@@ -1,7 +1,17 @@
 
 from __future__ import annotations
-from typing import Dict, List, Any, Tuple
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Sequence, Tuple, Union
 import re
+from loaders.common import Evidence
+from tracing import span
+
+if TYPE_CHECKING:
+    from .entities import EntityIndex
+
+# Row columns that are not facts about the entity
+LINK_SKIP = frozenset(("id", "title", "computed"))
+
+Hit = Union[Evidence, Dict[str, Any]]
 
 def _canon(s: str) -> str:
     s = (s or "").strip().lower()
@@ -22,55 +32,102 @@ def row_to_triples(row: Dict[str, Any], subject_hint: str = "movie") -> List[Tup
         triples.append((subject_hint, k, v))
     return triples
 
-def normalize_retrieval(query: str, retrieval: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
-    out = {"query": query, "retrieval": {"db": [], "csv": [], "docs": []}, "entities": {"canonical_map": {}}}
+def _source_part(source_id: str, default: str) -> str:
+    # "csv:ratings.csv:Inception" → "ratings.csv"; the loaders always put the table/file second
+    start = source_id.find(":") + 1
+    end = source_id.find(":", start)
+    return source_id[start:end] if start and end > 0 else default
+
+def _fields(h: Hit) -> Tuple[str, float, Dict[str, Any]]:
+    if type(h) is dict:
+        return h["source_id"], float(h.get("score", 0.0)), h["payload"]
+    return h.source_id, float(h.score), h.payload
+
+def normalize_retrieval(query: str, retrieval: Dict[str, Sequence[Hit]], timed_out: Optional[List[str]] = None,
+                        entities: Optional["EntityIndex"] = None, triples: bool = False) -> Dict[str, Any]:
+    """
+    Evidence pack for retrieval hits: `Evidence` objects straight from the retrievers, or
+    serialized {"source_id", "score", "payload"} dicts. Payloads become the pack's rows without
+    being copied, so neither the hits nor the pack should be mutated afterwards.
+    With an `entities` index (fusion/entities.py), hits resolve to their canonical id by lookup
+    and the source ids of DB rows, CSV rows and docs of the same film are grouped under
+    entities.linked (linked_facts() reads their merged columns back from the rows); without
+    one, ids are canonicalized once per title and docs stay unlinked.
+    Per-row `triples` are left out unless asked for; row_to_triples(item["row"]) derives them on demand.
+    """
+    with span("normalize", hits=sum(len(retrieval.get(m, ())) for m in ("db", "csv", "docs")),
+              entity_index=entities is not None) as s:
+        out = _normalize(query, retrieval, timed_out, entities, triples)
+        s.set(entities=len(out["entities"]["canonical_map"]), linked=len(out["entities"]["linked"]))
+    return out
+
+def linked_facts(pack: Dict[str, Any], eid: str) -> List[Tuple[str, Any, str]]:
+    """(column, value, origin) facts of a linked entity, read from the pack's rows; DB rows win ties."""
+    rows = {h["source_id"]: (h["origin"], h["row"]) for name in ("db", "csv") for h in pack["retrieval"][name]}
+    facts: Dict[str, Tuple[str, Any, str]] = {}
+    for source_id in pack["entities"]["linked"][eid]["sources"]:
+        origin, row = rows.get(source_id, (None, None))
+        for k, v in (row or {}).items():
+            if k not in facts and k not in LINK_SKIP and v is not None and v != "":
+                facts[k] = (k, v, origin)
+    return list(facts.values())
+
+def _link(linked: Dict[str, Dict[str, Any]], eid: str, title: str, source_id: str,
+          entities: Optional["EntityIndex"]) -> None:
+    ent = linked.get(eid)
+    if ent is None:
+        ent = linked[eid] = {"title": title, "sources": []}
+        if entities is not None and eid in entities.entities:
+            ent["title"] = entities.entities[eid]["title"]
+            ent["docs"] = entities.entities[eid]["docs"][:5]
+    ent["sources"].append(source_id)
+
+def _normalize(query: str, retrieval: Dict[str, Sequence[Hit]], timed_out: Optional[List[str]],
+               entities: Optional["EntityIndex"], triples: bool) -> Dict[str, Any]:
+    out = {"query": query, "retrieval": {"db": [], "csv": [], "docs": []},
+           "entities": {"canonical_map": {}, "linked": {}}}
+    if timed_out is not None:
+        # Backends that missed the retrieval deadline; their hits are absent from this pack
+        out["timed_out"] = list(timed_out)
     canonical_map: Dict[str, str] = {}
+    linked: Dict[str, Dict[str, Any]] = {}
+
+    for name, origin, field, default in (("db", "DB", "table", "movies"), ("csv", "CSV", "file", "")):
+        items = out["retrieval"][name]
+        for h in retrieval.get(name, ()):
+            source_id, score, row = _fields(h)
+            title = row.get("title", "")
+            can = canonical_map.get(title)
+            if can is None and entities is not None:
+                can = entities.entity_id(title)
+            if can is None:
+                year = row.get("release_year") or row.get("year")
+                can = canonical_title(title, year if isinstance(year, int) else None)
+            if title:
+                canonical_map[title] = can
+                _link(linked, can, title, source_id, entities)
+            item = {"source_id": source_id, "origin": origin, field: _source_part(source_id, default),
+                    "row": row, "canonical_id": can, "score": score}
+            if triples:
+                item["triples"] = row_to_triples(row)
+            items.append(item)
 
-    for h in retrieval.get("db", []):
-        row = dict(h["payload"])
-        title = row.get("title", "")
-        year = row.get("release_year") or row.get("year")
-        can = canonical_title(title, year if isinstance(year, int) else None)
-        if title:
-            canonical_map[title] = can
-        out["retrieval"]["db"].append({
-            "source_id": h["source_id"],
-            "origin": "DB",
-            "table": "movies",
-            "row": row,
-            "triples": row_to_triples(row),
-            "canonical_id": can,
-            "score": float(h.get("score", 0.0)),
-        })
-
-    for h in retrieval.get("csv", []):
-        row = dict(h["payload"])
-        title = row.get("title", "")
-        year = row.get("release_year") or row.get("year")
-        can = canonical_title(title, year if isinstance(year, int) else None)
-        if title:
-            canonical_map.setdefault(title, can)
-        out["retrieval"]["csv"].append({
-            "source_id": h["source_id"],
-            "origin": "CSV",
-            "file": "movies.csv" if "imdb" not in row else "ratings.csv",
-            "row": row,
-            "triples": row_to_triples(row),
-            "canonical_id": can,
-            "score": float(h.get("score", 0.0)),
-        })
-
-    for h in retrieval.get("docs", []):
-        payload = dict(h["payload"])
+    for h in retrieval.get("docs", ()):
+        source_id, score, payload = _fields(h)
         doc = payload.get("doc", "")
-        snippet = payload.get("snippet", "")
-        out["retrieval"]["docs"].append({
-            "source_id": h["source_id"],
+        item = {
+            "source_id": source_id,
             "origin": "DOC",
-            "chunk": snippet,
+            "chunk": payload.get("snippet", ""),
             "metadata": {"doc": doc},
-            "score": float(h.get("score", 0.0)),
-        })
+            "score": score,
+        }
+        if entities is not None:
+            item["entity_ids"] = entities.doc_entities(doc)
+            for eid in item["entity_ids"]:
+                _link(linked, eid, entities.entities[eid]["title"], source_id, entities)
+        out["retrieval"]["docs"].append(item)
 
     out["entities"]["canonical_map"] = canonical_map
+    out["entities"]["linked"] = linked
     return out
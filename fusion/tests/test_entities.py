@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+from etl.seed_db import seed, SEED_SQL
+from fusion import EntityIndex, linked_facts, normalize_retrieval
+
+LAKE = Path(__file__).resolve().parents[2] / "data_lake"
+CSVS = [LAKE / "csv" / "movies.csv", LAKE / "csv" / "ratings.csv"]
+
+def hit(source_id, **payload):
+    return {"source_id": source_id, "score": 0.9, "payload": payload}
+
+RETRIEVAL = {
+    "db": [hit("db:movies:Inception", id=1, title="Inception", release_year=2010, box_office_usd=829895144)],
+    "csv": [hit("csv:ratings.csv:Inception", title="Inception", imdb=8.8),
+            hit("csv:movies.csv:Interstellar", title="Interstellar", release_year=2014, runtime_min=169)],
+    "docs": [hit("doc:interstellar.txt", doc="interstellar.txt", snippet="Interstellar explores themes of love")],
+}
+
+def test_entity_index_links_sources(tmp_path):
+    db = tmp_path / "movies.db"
+    seed(db, SEED_SQL)
+    index = EntityIndex.build(CSVS, db, LAKE / "docs")
+    index.save(tmp_path / "entities.json")
+    index = EntityIndex.load(tmp_path / "entities.json")
+    assert index.is_current()
+    ent = index.entities["inception (2010)"]
+    assert ent["db"] == ["db:movies:Inception"] and ent["docs"] == ["inception.txt"]
+    assert ent["csv"] == ["csv:movies.csv:Inception", "csv:ratings.csv:Inception"]
+
+    pack = normalize_retrieval("Inception vs Interstellar", RETRIEVAL, entities=index)
+    assert [h["canonical_id"] for h in pack["retrieval"]["csv"]] == ["inception (2010)", "interstellar (2014)"]
+    assert [h["file"] for h in pack["retrieval"]["csv"]] == ["ratings.csv", "movies.csv"]
+    assert pack["retrieval"]["docs"][0]["entity_ids"] == ["interstellar (2014)"]
+    linked = pack["entities"]["linked"]
+    assert linked_facts(pack, "inception (2010)") == [("release_year", 2010, "DB"), ("box_office_usd", 829895144, "DB"),
+                                                      ("imdb", 8.8, "CSV")]
+    assert linked["interstellar (2014)"]["sources"] == ["csv:movies.csv:Interstellar", "doc:interstellar.txt"]
+
+    # Without the index, rows still join on title but docs stay unlinked
+    plain = normalize_retrieval("Inception vs Interstellar", RETRIEVAL)
+    assert plain["retrieval"]["csv"][0]["canonical_id"] == "inception (2010)"
+    assert plain["entities"]["linked"]["inception (2010)"]["sources"] == ["db:movies:Inception", "csv:ratings.csv:Inception"]
+    assert "entity_ids" not in plain["retrieval"]["docs"][0]
+
+    st = db.stat()
+    os.utime(db, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert not index.is_current()
+
+def test_normalize_accepts_evidence_without_copying_rows():
+    from loaders import Evidence
+    hits = {name: [Evidence(name.upper().rstrip("S"), h["source_id"], h["score"], h["payload"]) for h in RETRIEVAL[name]]
+            for name in RETRIEVAL}
+    pack = normalize_retrieval("q", hits)
+    assert pack == normalize_retrieval("q", RETRIEVAL)
+    assert pack["retrieval"]["db"][0]["row"] is RETRIEVAL["db"][0]["payload"]
+    assert "triples" not in pack["retrieval"]["db"][0]
+    assert ("movie", "imdb", 8.8) in normalize_retrieval("q", hits, triples=True)["retrieval"]["csv"][0]["triples"]
@@ -0,0 +1,5 @@
+
+from .client import LLMClient, LLMError, TokenBucket, get_client
+from .async_client import AsyncLLMClient, get_async_client
+
+__all__ = ["LLMClient", "LLMError", "TokenBucket", "get_client", "AsyncLLMClient", "get_async_client"]
@@ -0,0 +1,156 @@
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import ssl
+import weakref
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from .client import DEFAULT_BASE_URL, LLMError, _ClientBase, _Retryable
+
+_Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    """Read one HTTP/1.1 response (Content-Length, chunked, or until EOF)."""
+    status = int((await reader.readuntil(b"\r\n")).split()[1])
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        parts = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass  # trailers
+                return status, headers, b"".join(parts)
+            parts.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    if "content-length" in headers:
+        return status, headers, await reader.readexactly(int(headers["content-length"]))
+    headers["connection"] = "close"
+    return status, headers, await reader.read()
+
+class _AsyncHTTPPool:
+    """Keep-alive asyncio connections to one host; at most `size` requests in flight."""
+    def __init__(self, base_url: str, size: int, timeout: float) -> None:
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or ""
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle: List[_Conn] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def request(self, path: str, body: bytes, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        async with self._slots:
+            conn = None
+            while self._idle and conn is None:
+                conn = self._idle.pop()
+                if conn[1].is_closing():
+                    conn = None
+            if conn is None:
+                conn = await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+            reader, writer = conn
+            try:
+                head = f"POST {self.path}{path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+                head += "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+                writer.write(head.encode("latin-1") + body)
+                await writer.drain()
+                status, resp_headers, data = await asyncio.wait_for(_read_response(reader), self.timeout)
+            except BaseException:
+                writer.close()  # state unknown; do not reuse
+                raise
+            if resp_headers.get("connection", "").lower() == "close":
+                writer.close()
+            else:
+                self._idle.append(conn)
+            return status, resp_headers, data
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+class AsyncLLMClient(_ClientBase):
+    """
+    asyncio counterpart of LLMClient with the same pooling, rate-limit, retry and
+    coalescing policy. Connections belong to the event loop that created the client.
+    """
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, max_concurrency: int = 64,
+                 timeout: float = 60.0, **policy: Any) -> None:
+        super().__init__(api_key, base_url, **policy)
+        self.pool = _AsyncHTTPPool(base_url, size=max_concurrency, timeout=timeout)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _post(self, path: str, body: bytes) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            while True:
+                wait = self.limiter.try_acquire()
+                if not wait:
+                    break
+                await asyncio.sleep(wait)
+            try:
+                self.requests_sent += 1
+                status, headers, data = await self.pool.request(path, body, self._headers())
+                return self._check(status, headers.get("retry-after"), data)
+            except _Retryable as e:
+                if attempt == self.max_retries:
+                    raise LLMError(f"HTTP {e.status} after {attempt + 1} attempts", status=e.status) from None
+                await asyncio.sleep(self._backoff(attempt, e.retry_after))
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+                if attempt == self.max_retries:
+                    raise LLMError(f"{type(e).__name__}: {e}") from e
+                await asyncio.sleep(self._backoff(attempt, None))
+        raise AssertionError("unreachable")
+
+    async def chat(self, messages: List[Dict[str, str]], model: str = "gpt-4o-mini", temperature: float = 0.0,
+                   max_tokens: int = 600) -> str:
+        """Return the assistant message text for a chat-completions request."""
+        payload, key = self._chat_payload(messages, model, temperature, max_tokens)
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return self._content(await asyncio.shield(fut))
+        fut = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            data = await self._post("/chat/completions", json.dumps(payload, sort_keys=True).encode("utf-8"))
+            fut.set_result(data)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+        return self._content(data)
+
+    def close(self) -> None:
+        self.pool.close()
+
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncLLMClient]" = weakref.WeakKeyDictionary()
+
+def get_async_client() -> AsyncLLMClient:
+    """
+    Client for the running event loop, configured like get_client() (LLM_ASYNC_MAX_CONCURRENCY
+    caps in-flight requests, default 64). Raises RuntimeError when no API key is configured.
+    """
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY not set")
+        client = _CLIENTS[loop] = AsyncLLMClient(api_key=api_key,
+                                                 base_url=os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL),
+                                                 max_concurrency=int(os.getenv("LLM_ASYNC_MAX_CONCURRENCY", "64")),
+                                                 requests_per_second=float(os.getenv("LLM_RPS", "5")))
+    return client
@@ -0,0 +1,283 @@
+
+from __future__ import annotations
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+RETRY_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+class LLMError(RuntimeError):
+    """A chat-completions request failed (after retries, if the failure was retryable)."""
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+class _Retryable(Exception):
+    def __init__(self, status: int, retry_after: Optional[str]) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Allows `rate` requests/second on average with bursts of up to `capacity`."""
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token and return 0.0, or return the seconds until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+class _HTTPPool:
+    """Keep-alive HTTP(S) connections to one host; at most `size` are open at once."""
+    def __init__(self, base_url: str, size: int, timeout: float) -> None:
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self) -> Iterator[http.client.HTTPConnection]:
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                conn.close()  # state unknown; do not reuse
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class _ClientBase:
+    """Configuration and retry/rate-limit policy shared by the sync and async clients."""
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, requests_per_second: float = 5.0,
+                 burst: Optional[float] = None, max_retries: int = 4, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0) -> None:
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket(requests_per_second, burst)
+        self.requests_sent = 0
+        self.coalesced = 0
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _chat_payload(messages: List[Dict[str, str]], model: str, temperature: float, max_tokens: int) -> Tuple[Dict[str, Any], str]:
+        """(request payload, coalescing key)."""
+        payload = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        return payload, hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _check(status: int, retry_after: Optional[str], data: bytes) -> Dict[str, Any]:
+        """Decode a complete response, raising _Retryable or LLMError for error statuses."""
+        if status in RETRY_STATUS:
+            raise _Retryable(status, retry_after)
+        if status >= 400:
+            raise LLMError(f"HTTP {status}: {data[:200].decode('utf-8', 'replace')}", status=status)
+        return json.loads(data)
+
+    @staticmethod
+    def _content(data: Dict[str, Any]) -> str:
+        try:
+            return data["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Malformed chat-completions response: {str(data)[:200]}") from e
+
+class LLMClient(_ClientBase):
+    """
+    Chat-completions client shared by the router and the answer synthesizer.
+    - keep-alive connection pool (`max_concurrency` connections, which also caps in-flight requests)
+    - token-bucket rate limit (`requests_per_second`, `burst`)
+    - retries with full-jitter exponential backoff on 429/5xx/network errors, honouring Retry-After
+    - identical concurrent requests are coalesced into one HTTP call (not streams)
+    Speaks the OpenAI HTTP API directly, so any compatible endpoint (or a local stub) works.
+    """
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, max_concurrency: int = 8,
+                 timeout: float = 60.0, **policy: Any) -> None:
+        super().__init__(api_key, base_url, **policy)
+        self.pool = _HTTPPool(base_url, size=max_concurrency, timeout=timeout)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def _post_once(self, path: str, body: bytes) -> Dict[str, Any]:
+        self.limiter.acquire()
+        with self.pool.connection() as conn:
+            self.requests_sent += 1
+            conn.request("POST", self.pool.path + path, body=body, headers=self._headers())
+            resp = conn.getresponse()
+            data = resp.read()
+        # Response fully read, so the connection is back in the pool even for error statuses
+        return self._check(resp.status, resp.getheader("Retry-After"), data)
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps(payload, sort_keys=True).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._post_once(path, body)
+            except _Retryable as e:
+                if attempt == self.max_retries:
+                    raise LLMError(f"HTTP {e.status} after {attempt + 1} attempts", status=e.status) from None
+                time.sleep(self._backoff(attempt, e.retry_after))
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.max_retries:
+                    raise LLMError(f"{type(e).__name__}: {e}") from e
+                time.sleep(self._backoff(attempt, None))
+        raise AssertionError("unreachable")
+
+    def _coalesced(self, key: str, call) -> Any:
+        """Run call() once per key at a time; concurrent callers with the same key share its result."""
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            return fut.result()
+        try:
+            fut.set_result(call())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return fut.result()
+
+    def chat(self, messages: List[Dict[str, str]], model: str = "gpt-4o-mini", temperature: float = 0.0,
+             max_tokens: int = 600) -> str:
+        """Return the assistant message text for a chat-completions request."""
+        payload, key = self._chat_payload(messages, model, temperature, max_tokens)
+        return self._content(self._coalesced(key, lambda: self._post("/chat/completions", payload)))
+
+    def chat_stream(self, messages: List[Dict[str, str]], model: str = "gpt-4o-mini", temperature: float = 0.0,
+                    max_tokens: int = 600) -> Iterator[str]:
+        """
+        Yield assistant text deltas as the server streams them. Failures are retried only
+        until the first byte of a 200 response arrives; streams are never coalesced.
+        """
+        payload = dict(self._chat_payload(messages, model, temperature, max_tokens)[0], stream=True)
+        body = json.dumps(payload, sort_keys=True).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            started = False
+            try:
+                with self.pool.connection() as conn:
+                    self.requests_sent += 1
+                    conn.request("POST", self.pool.path + "/chat/completions", body=body, headers=self._headers())
+                    resp = conn.getresponse()
+                    if resp.status == 200:
+                        started = True
+                        yield from _sse_deltas(resp)
+                        resp.read()  # drain so the connection can be reused
+                        return
+                    data = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                if started:
+                    raise LLMError(f"Stream interrupted: {type(e).__name__}: {e}") from e
+                if attempt == self.max_retries:
+                    raise LLMError(f"{type(e).__name__}: {e}") from e
+                time.sleep(self._backoff(attempt, None))
+                continue
+            if resp.status not in RETRY_STATUS:
+                raise LLMError(f"HTTP {resp.status}: {data[:200].decode('utf-8', 'replace')}", status=resp.status)
+            if attempt == self.max_retries:
+                raise LLMError(f"HTTP {resp.status} after {attempt + 1} attempts", status=resp.status)
+            time.sleep(self._backoff(attempt, resp.getheader("Retry-After")))
+
+    def close(self) -> None:
+        self.pool.close()
+
+def _sse_deltas(lines: Iterable[bytes]) -> Iterator[str]:
+    """Parse chat-completions server-sent events into content deltas, stopping at [DONE]."""
+    for raw in lines:
+        line = raw.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return
+        choices = json.loads(data).get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            yield delta
+
+_CLIENT: Optional[LLMClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_client() -> LLMClient:
+    """
+    Process-wide client configured from the environment (OPENAI_API_KEY, OPENAI_BASE_URL,
+    LLM_MAX_CONCURRENCY, LLM_RPS). Raises RuntimeError when no API key is configured.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("OPENAI_API_KEY not set")
+                _CLIENT = LLMClient(api_key=api_key,
+                                    base_url=os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL),
+                                    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                                    requests_per_second=float(os.getenv("LLM_RPS", "5")))
+    return _CLIENT
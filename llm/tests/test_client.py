@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm import AsyncLLMClient, LLMClient, LLMError
+
+class StubChat(BaseHTTPRequestHandler):
+    """Minimal chat-completions endpoint: echoes the last message, optionally failing first."""
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with srv.lock:
+            srv.calls += 1
+            fail = srv.fail_first > 0
+            srv.fail_first -= fail
+        time.sleep(srv.delay)
+        if not fail and body.get("stream"):
+            return self._stream("echo: " + body["messages"][-1]["content"])
+        if fail:
+            payload, status = b'{"error": "rate limited"}', 429
+        else:
+            content = "echo: " + body["messages"][-1]["content"]
+            payload, status = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}).encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if fail:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, content):
+        # Server-sent events, one word per chunk, over chunked transfer encoding
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = content.split(" ")
+        deltas = [words[0]] + [" " + w for w in words[1:]]
+        for data in [json.dumps({"choices": [{"delta": {"content": d}}]}) for d in deltas] + ["[DONE]"]:
+            chunk = f"data: {data}\n\n".encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StubChat)
+    srv.daemon_threads = True
+    srv.lock, srv.calls, srv.connections, srv.fail_first, srv.delay = threading.Lock(), 0, 0, 0, 0.0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+def client_for(srv, **kw):
+    return LLMClient(api_key="test", base_url=f"http://127.0.0.1:{srv.server_address[1]}/v1",
+                     requests_per_second=1000, **kw)
+
+def msg(text):
+    return [{"role": "user", "content": text}]
+
+def test_keep_alive_reuses_connection(stub):
+    client = client_for(stub, max_concurrency=1)
+    assert [client.chat(msg(f"q{i}")) for i in range(5)] == [f"echo: q{i}" for i in range(5)]
+    assert stub.calls == 5 and stub.connections == 1
+
+def test_retries_429_then_succeeds(stub):
+    stub.fail_first = 2
+    client = client_for(stub, backoff_base=0.01)
+    assert client.chat(msg("hi")) == "echo: hi"
+    assert stub.calls == 3
+    stub.fail_first = 5
+    with pytest.raises(LLMError) as e:
+        client_for(stub, max_retries=1, backoff_base=0.01).chat(msg("hi"))
+    assert e.value.status == 429
+
+def test_identical_inflight_prompts_are_coalesced(stub):
+    stub.delay = 0.2
+    client = client_for(stub)
+    with ThreadPoolExecutor(8) as ex:
+        results = list(ex.map(lambda _: client.chat(msg("same")), range(8)))
+    assert results == ["echo: same"] * 8
+    assert stub.calls == 1 and client.coalesced == 7
+
+def test_token_bucket_limits_rate(stub):
+    client = LLMClient(api_key="test", base_url=f"http://127.0.0.1:{stub.server_address[1]}/v1",
+                       requests_per_second=20, burst=1)
+    t0 = time.perf_counter()
+    for i in range(5):
+        client.chat(msg(f"r{i}"))
+    assert time.perf_counter() - t0 >= 4 / 20 * 0.9
+
+def test_chat_stream_yields_deltas_and_keeps_connection(stub):
+    client = client_for(stub, max_concurrency=1)
+    assert list(client.chat_stream(msg("a b c"))) == ["echo:", " a", " b", " c"]
+    assert "".join(client.chat_stream(msg("x y"))) == "echo: x y"
+    assert client.chat(msg("z")) == "echo: z"
+    assert stub.connections == 1
+
+def test_async_client_coalesces_retries_and_reuses_connections(stub):
+    stub.delay, stub.fail_first = 0.1, 1
+    client = AsyncLLMClient(api_key="test", base_url=f"http://127.0.0.1:{stub.server_address[1]}/v1",
+                            requests_per_second=1000, backoff_base=0.01, max_concurrency=4)
+
+    async def run():
+        first = await asyncio.gather(*[client.chat(msg("same")) for _ in range(8)], client.chat(msg("other")))
+        second = await asyncio.gather(*[client.chat(msg(f"q{i}")) for i in range(4)])
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == ["echo: same"] * 8 + ["echo: other"]
+    assert second == [f"echo: q{i}" for i in range(4)]
+    assert client.coalesced == 7
+    assert stub.calls == 2 + 1 + 4  # one 429 retried
+    assert stub.connections <= 4
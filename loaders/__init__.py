@@ -1,5 +1,27 @@
+from importlib import import_module
+from typing import TYPE_CHECKING
 from .common import Evidence
-from .csv_loader import CSVSource
-from .docs_loader import DocSource
-from .db_loader import DBSource
-__all__ = ["Evidence", "CSVSource", "DocSource", "DBSource"]
+
+# Sources are imported on first access so that importing `loaders` (e.g. for Evidence)
+# does not pull in pandas/rapidfuzz unless a CSV or fuzzy source is actually used.
+_LAZY = {
+    "CSVSource": ".csv_loader",
+    "DocSource": ".docs_loader",
+    "DBSource": ".db_loader",
+    "FuzzyMatcher": ".fuzzy",
+}
+
+if TYPE_CHECKING:
+    from .csv_loader import CSVSource
+    from .docs_loader import DocSource
+    from .db_loader import DBSource
+    from .fuzzy import FuzzyMatcher
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ["Evidence", "CSVSource", "DocSource", "DBSource", "FuzzyMatcher"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import heapq
+import json
+import math
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .text import tokenize
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring.
+    Postings are stored per term as parallel lists of doc ids and term frequencies,
+    so a query only touches the postings of its own terms. Built at ingest time
+    (etl/build_doc_index.py) and loaded lazily from JSON on first search.
+    """
+    def __init__(self, path: Optional[Path] = None, k1: float = 1.5, b: float = 0.75) -> None:
+        self.path = Path(path) if path is not None else None
+        self.k1 = k1
+        self.b = b
+        self.docs: List[Dict[str, Any]] = []
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.doc_len: List[int] = []
+        self._norm: List[float] = []
+        self._idf: Dict[str, float] = {}
+        self._loaded = path is None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]], snippet_chars: int = 280,
+              k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """Index (name, text) pairs. Only a snippet of each text is kept for display."""
+        index = cls(k1=k1, b=b)
+        for doc_id, (name, text) in enumerate(docs):
+            toks = tokenize(text)
+            index.docs.append({"doc": name, "snippet": text[:snippet_chars]})
+            index.doc_len.append(len(toks))
+            for term, tf in Counter(toks).items():
+                ids, tfs = index.postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        index._prepare()
+        return index
+
+    def _prepare(self) -> None:
+        n = len(self.doc_len)
+        avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self._norm = [self.k1 * (1 - self.b + self.b * (dl / avgdl if avgdl else 0.0)) for dl in self.doc_len]
+        self._idf = {t: math.log(1 + (n - len(p[0]) + 0.5) / (len(p[0]) + 0.5)) for t, p in self.postings.items()}
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"k1": self.k1, "b": self.b, "docs": self.docs, "doc_len": self.doc_len,
+                "postings": {t: [ids, tfs] for t, (ids, tfs) in self.postings.items()}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.k1, self.b = data["k1"], data["b"]
+            self.docs = data["docs"]
+            self.doc_len = data["doc_len"]
+            self.postings = {t: (p[0], p[1]) for t, p in data["postings"].items()}
+            self._prepare()
+            self._loaded = True
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.docs)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, bm25_score) for the query, best first."""
+        self._ensure_loaded()
+        scores: Dict[int, float] = {}
+        k1p1 = self.k1 + 1
+        norm = self._norm
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            idf = self._idf[term]
+            for d, tf in zip(*posting):
+                scores[d] = scores.get(d, 0.0) + idf * tf * k1p1 / (tf + norm[d])
+        return heapq.nlargest(k, scores.items(), key=lambda it: (it[1], -it[0]))
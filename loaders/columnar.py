@@ -0,0 +1,112 @@
+
+from __future__ import annotations
+import bisect
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# Columnar copies of lake CSV/Excel files, written by etl/build_columnar.py.
+# Arrow IPC (uncompressed) is memory-mapped zero-copy; Parquet is smaller on disk and
+# is decoded per column / per row group on read.
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+SPREADSHEET_SUFFIXES = (".xlsx", ".xls")
+
+def source_stamp(src: Path) -> Dict[bytes, bytes]:
+    """Size and mtime of the source file, stored in the columnar file's schema metadata."""
+    st = Path(src).stat()
+    return {b"source_name": Path(src).name.encode(), b"source_size": str(st.st_size).encode(),
+            b"source_mtime_ns": str(st.st_mtime_ns).encode()}
+
+def read_source(src: Path) -> pa.Table:
+    """Parse a CSV (pyarrow's typed reader) or a spreadsheet's first sheet into an Arrow table."""
+    src = Path(src)
+    if src.suffix.lower() in SPREADSHEET_SUFFIXES:
+        import pandas as pd  # openpyxl/xlrd are optional and only needed here
+        return pa.Table.from_pandas(pd.read_excel(src, sheet_name=0), preserve_index=False)
+    import pyarrow.csv as pacsv
+    return pacsv.read_csv(src)
+
+def convert(src: Path, out_dir: Path, fmt: str = "arrow", row_group_size: int = 64 * 1024) -> Path:
+    """Write `src` as <out_dir>/<stem>.arrow|.parquet with typed columns; returns the path."""
+    table = read_source(src)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **source_stamp(src)})
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out = out_dir / (Path(src).stem + FORMATS[fmt])
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    if fmt == "arrow":
+        with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, tmp, row_group_size=row_group_size)
+    tmp.replace(out)
+    return out
+
+def _read_metadata(path: Path) -> Dict[bytes, bytes]:
+    if path.suffix == ".parquet":
+        return pq.read_schema(path).metadata or {}
+    with pa.memory_map(str(path)) as source:
+        return ipc.open_file(source).schema.metadata or {}
+
+def find_columnar(src: Path, columnar_dir: Path) -> Optional[Path]:
+    """The columnar copy of `src` under `columnar_dir`, or None if missing or stale."""
+    stamp = source_stamp(src)
+    for suffix in FORMATS.values():
+        path = Path(columnar_dir) / (Path(src).stem + suffix)
+        if path.exists():
+            meta = _read_metadata(path)
+            if all(meta.get(k) == v for k, v in stamp.items()):
+                return path
+    return None
+
+class ColumnarTable:
+    """
+    Read-only view of a columnar file. Arrow IPC is memory-mapped, so columns are paged in
+    only when touched; Parquet reads single columns and only the row groups holding requested rows.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        if self.path.suffix == ".parquet":
+            self._pf = pq.ParquetFile(self.path, memory_map=True)
+            self._table = None
+            self.schema = self._pf.schema_arrow
+            counts = [self._pf.metadata.row_group(i).num_rows for i in range(self._pf.num_row_groups)]
+            self._group_starts = [0, *accumulate(counts)][:-1]
+            self.num_rows = self._pf.metadata.num_rows
+        else:
+            self._table = ipc.open_file(pa.memory_map(str(self.path))).read_all()
+            self.schema = self._table.schema
+            self.num_rows = self._table.num_rows
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.schema.names
+
+    def column(self, name: str) -> List[Any]:
+        if self._table is not None:
+            return self._table.column(name).to_pylist()
+        return self._pf.read(columns=[name]).column(0).to_pylist()
+
+    def select(self, names: Sequence[str]) -> pa.Table:
+        """Only the named columns, for columnar filters/aggregates."""
+        if self._table is not None:
+            return self._table.select(list(names))
+        return self._pf.read(columns=list(names))
+
+    def rows(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """Full rows for `indices` (in that order) as plain dicts."""
+        # Zero-copy one-row slices: for top-k sized requests this beats Table.take, which
+        # also pulls in the pyarrow.compute kernels on first use
+        if self._table is not None:
+            return [self._table.slice(i, 1).to_pylist()[0] for i in indices]
+        groups: Dict[int, pa.Table] = {}
+        out = []
+        for i in indices:
+            g = bisect.bisect_right(self._group_starts, i) - 1
+            if g not in groups:
+                groups[g] = self._pf.read_row_group(g)
+            out.append(groups[g].slice(i - self._group_starts[g], 1).to_pylist()[0])
+        return out
@@ -1,11 +1,34 @@
 from dataclasses import dataclass
 from typing import Any, Dict, List, Literal
+import numpy as np
 
 Origin = Literal["DB", "CSV", "DOC"]
 
-@dataclass
+@dataclass(slots=True)
 class Evidence:
+    """
+    One retrieval hit. Slotted (no per-instance __dict__); `payload` is the row/passage dict
+    built by the source and is handed on to the evidence pack as is, so treat it as read-only.
+    """
     origin: Origin
     source_id: str
     score: float
-    payload: Dict[str, Any]  
+    payload: Dict[str, Any]
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, without sorting the whole array.
+    Ties keep the lower index first so results are deterministic.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[: k - above.shape[0]]
+        part = np.concatenate([above, tied])
+    else:
+        part = np.arange(n)
+    order = np.lexsort((part, -scores[part]))
+    return part[order]
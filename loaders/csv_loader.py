@@ -1,27 +1,66 @@
 from __future__ import annotations
-import pandas as pd
 from pathlib import Path
-from typing import List
-from rapidfuzz import fuzz
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from .common import Evidence
+from .fuzzy import FuzzyMatcher
+from tracing import span
 
 class CSVSource:
-    def __init__(self, file_path: Path, key_column: str = "title") -> None:
+    """
+    Fuzzy search over the key column of one CSV file.
+    With `columnar_dir`, an up-to-date Arrow/Parquet copy from etl/build_columnar.py is used
+    instead of the CSV: it is memory-mapped, only the key column is read for matching, and
+    full rows are materialized for the top-k hits only. Without one, pandas parses the CSV.
+    """
+    def __init__(self, file_path: Path, key_column: str = "title", columnar_dir: Optional[Path] = None) -> None:
         self.file_path = Path(file_path)
         self.key_column = key_column
-        self.df = pd.read_csv(self.file_path)
+        self.df = None
+        self.table = None
+        columnar = None
+        if columnar_dir is not None:
+            from .columnar import find_columnar
+            columnar = find_columnar(self.file_path, columnar_dir)
+        if columnar is not None:
+            from .columnar import ColumnarTable
+            self.table = ColumnarTable(columnar)
+            has_key = key_column in self.table.column_names
+            keys = self.table.column(key_column) if has_key else [""] * self.table.num_rows
+        else:
+            import pandas as pd
+            self.df = pd.read_csv(self.file_path)
+            keys = self.df[key_column] if key_column in self.df.columns else [""] * len(self.df)
+        self.matcher = FuzzyMatcher(list(keys))
 
-    def search(self, query: str, k: int = 5) -> List[Evidence]:
-        # Simple fuzzy ratio on the key column
-        scores = []
-        for idx, row in self.df.iterrows():
-            title = str(row.get(self.key_column, ""))
-            score = fuzz.token_set_ratio(query, title) / 100.0
-            scores.append((score, idx))
-        scores.sort(reverse=True)
+    @property
+    def columns(self) -> List[str]:
+        return list(self.table.column_names if self.table is not None else self.df.columns)
+
+    def arrow(self, columns: Sequence[str]):
+        """Projection of the table onto `columns` as a pyarrow.Table."""
+        if self.table is not None:
+            return self.table.select(columns)
+        import pyarrow as pa
+        return pa.Table.from_pandas(self.df[list(columns)], preserve_index=False)
+
+    def _rows(self, idxs: List[int]) -> List[Dict[str, Any]]:
+        if self.table is not None:
+            return self.table.rows(idxs)
+        return [self.df.iloc[idx].to_dict() for idx in idxs]
+
+    def _to_evidence(self, matches: List[Tuple[int, float]]) -> List[Evidence]:
         hits = []
-        for score, idx in scores[:k]:
-            payload = self.df.iloc[idx].to_dict()
+        for (idx, score), payload in zip(matches, self._rows([idx for idx, _ in matches])):
             source_id = f"csv:{self.file_path.name}:{payload.get(self.key_column,'row_'+str(idx))}"
             hits.append(Evidence(origin="CSV", source_id=source_id, score=score, payload=payload))
         return hits
+
+    def search(self, query: str, k: int = 5) -> List[Evidence]:
+        # Fuzzy token-set ratio on the key column, scored for all rows at once
+        with span("csv.search", file=self.file_path.name, rows=len(self.matcher), k=k) as s:
+            hits = self._to_evidence(self.matcher.top_k(query, k=k))
+            s.set(hits=len(hits))
+        return hits
+
+    def search_many(self, queries: Sequence[str], k: int = 5) -> List[List[Evidence]]:
+        return [self._to_evidence(m) for m in self.matcher.top_k_many(queries, k=k)]
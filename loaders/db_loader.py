@@ -1,25 +1,128 @@
 from __future__ import annotations
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 from .common import Evidence
+from .text import tokenize
+from tracing import span
+
+def fts_match_expr(query: str) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression: quoted tokens OR'ed together,
+    with prefix matching on longer tokens so partial titles still hit.
+    """
+    terms = []
+    for tok in tokenize(query):
+        term = '"' + tok + '"'
+        terms.append(term + "*" if len(tok) >= 4 else term)
+    return " OR ".join(terms)
+
+class ConnectionPool:
+    """
+    Thread-safe pool of read-only SQLite connections. Connections are created lazily
+    up to `size`; callers block when all are checked out. sqlite3 caches compiled
+    statements per connection, so reusing connections reuses prepared statements.
+    """
+    def __init__(self, db_path: Path, size: int = 4) -> None:
+        self.db_path = Path(db_path)
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = self.db_path.resolve().as_uri() + "?mode=ro"
+        con = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=64)
+        con.row_factory = sqlite3.Row
+        return con
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            con = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            con = self._connect() if grow else self._idle.get()
+        try:
+            yield con
+        finally:
+            self._idle.put(con)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
 
 class DBSource:
-    def __init__(self, db_path: Path, table: str = "movies", key_column: str = "title") -> None:
+    def __init__(self, db_path: Path, table: str = "movies", key_column: str = "title", pool_size: int = 4) -> None:
         self.db_path = Path(db_path)
         self.table = table
         self.key_column = key_column
+        self.fts_table = f"{table}_fts"
+        self.pool = ConnectionPool(self.db_path, size=pool_size)
+        self._has_fts: Optional[bool] = None
+        self._columns: Optional[List[str]] = None
 
-    def search(self, query: str, k: int = 5) -> List[Evidence]:
-        con = sqlite3.connect(self.db_path)
-        con.row_factory = sqlite3.Row
-        # Basic LIKE search. In Step 2 we'll improve with embeddings, etc.
-        sql = f"SELECT * FROM {self.table} WHERE {self.key_column} LIKE ? LIMIT ?"
-        rows = con.execute(sql, (f"%{query}%", k)).fetchall()
-        con.close()
+    def _fts_available(self, con: sqlite3.Connection) -> bool:
+        if self._has_fts is None:
+            row = con.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.fts_table,)).fetchone()
+            self._has_fts = row is not None
+        return self._has_fts
+
+    def _search(self, con: sqlite3.Connection, query: str, k: int) -> List[Evidence]:
+        if self._fts_available(con):
+            match = fts_match_expr(query)
+            if not match:
+                return []
+            # bm25() is lower-is-better and negative; map it to a (0, 1) similarity
+            sql = (f"SELECT t.*, bm25({self.fts_table}) AS _rank FROM {self.fts_table} "
+                   f"JOIN {self.table} t ON t.rowid = {self.fts_table}.rowid "
+                   f"WHERE {self.fts_table} MATCH ? ORDER BY _rank LIMIT ?")
+            rows = con.execute(sql, (match, k)).fetchall()
+        else:
+            # Legacy databases without an FTS index: substring scan, unranked
+            sql = f"SELECT *, NULL AS _rank FROM {self.table} WHERE {self.key_column} LIKE ? LIMIT ?"
+            rows = con.execute(sql, (f"%{query}%", k)).fetchall()
         hits = []
         for r in rows:
             row = dict(r)
+            rank = row.pop("_rank")
+            score = 1.0 if rank is None else -rank / (1.0 - rank)
             source_id = f"db:{self.table}:{row.get(self.key_column,'row')}"
-            hits.append(Evidence(origin='DB', source_id=source_id, score=1.0, payload=row))
+            hits.append(Evidence(origin='DB', source_id=source_id, score=score, payload=row))
+        return hits
+
+    def search(self, query: str, k: int = 5) -> List[Evidence]:
+        with span("db.search", table=self.table, k=k) as s, self.pool.connection() as con:
+            hits = self._search(con, query, k)
+            s.set(fts=bool(self._has_fts), hits=len(hits))
         return hits
+
+    def columns(self) -> List[str]:
+        if self._columns is None:
+            with self.pool.connection() as con:
+                self._columns = [r["name"] for r in con.execute(f"PRAGMA table_info({self.table})")]
+        return self._columns
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Rows of a read-only statement as dicts (used by the structured query planner)."""
+        with self.pool.connection() as con:
+            return [dict(r) for r in con.execute(sql, params).fetchall()]
+
+    def search_many(self, queries: Sequence[str], k: int = 5) -> List[List[Evidence]]:
+        """Run all queries on one pooled connection, reusing the same prepared statement."""
+        with self.pool.connection() as con:
+            return [self._search(con, q, k) for q in queries]
+
+    def close(self) -> None:
+        self.pool.close()
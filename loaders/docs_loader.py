@@ -1,27 +1,37 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List
-from rapidfuzz import fuzz
+from typing import Iterator, List, Optional, Tuple
+from .bm25 import BM25Index
 from .common import Evidence
 
+def iter_docs(dir_path: Path) -> Iterator[Tuple[str, str]]:
+    for p in sorted(Path(dir_path).glob("*.txt")):
+        yield p.name, p.read_text(encoding="utf-8", errors="ignore")
+
 class DocSource:
-    def __init__(self, dir_path: Path) -> None:
+    """
+    Lexical search over `.txt` docs with BM25.
+    If `index_path` points at an index built by etl/build_doc_index.py it is loaded
+    lazily on first search; otherwise the index is built in memory from `dir_path`.
+    """
+    def __init__(self, dir_path: Path, index_path: Optional[Path] = None) -> None:
         self.dir_path = Path(dir_path)
-        self.docs = []
-        for p in self.dir_path.glob("*.txt"):
-            text = p.read_text(encoding="utf-8", errors="ignore")
-            self.docs.append((p.name, text))
+        self.index_path = Path(index_path) if index_path is not None else None
+        self._index: Optional[BM25Index] = None
+
+    @property
+    def index(self) -> BM25Index:
+        if self._index is None:
+            if self.index_path is not None and self.index_path.exists():
+                self._index = BM25Index(self.index_path)
+            else:
+                self._index = BM25Index.build(iter_docs(self.dir_path))
+        return self._index
 
     def search(self, query: str, k: int = 5) -> List[Evidence]:
-        scored = []
-        for name, text in self.docs:
-            score = fuzz.partial_ratio(query, text) / 100.0
-            scored.append((score, name, text))
-        scored.sort(reverse=True)
         hits = []
-        for score, name, text in scored[:k]:
-            snippet = text[:280]
-            payload = {"doc": name, "snippet": snippet}
-            source_id = f"doc:{name}"
-            hits.append(Evidence(origin="DOC", source_id=source_id, score=score, payload=payload))
+        for doc_id, raw in self.index.search(query, k=k):
+            payload = dict(self.index.docs[doc_id])
+            source_id = f"doc:{payload['doc']}"
+            hits.append(Evidence(origin="DOC", source_id=source_id, score=raw / (1.0 + raw), payload=payload))
         return hits
@@ -0,0 +1,45 @@
+from __future__ import annotations
+from typing import Any, Callable, List, Sequence, Tuple
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+from .common import top_k_indices
+
+class FuzzyMatcher:
+    """
+    Batched fuzzy matching over one column of strings.
+    Choices are preprocessed once; every query is scored against all rows in a
+    single rapidfuzz cdist call (multi-threaded) and top-k is picked with a partial sort.
+    """
+    def __init__(self, choices: Sequence[Any], scorer: Callable = fuzz.token_set_ratio,
+                 workers: int = -1, query_chunk: int = 256) -> None:
+        self.scorer = scorer
+        self.workers = workers
+        self.query_chunk = query_chunk
+        self.choices: List[str] = [default_process("" if c is None else str(c)) for c in choices]
+
+    def __len__(self) -> int:
+        return len(self.choices)
+
+    def scores(self, queries: Sequence[str]) -> np.ndarray:
+        """Score matrix of shape [len(queries), len(choices)] in [0, 1]."""
+        processed = [default_process(q or "") for q in queries]
+        if not processed or not self.choices:
+            return np.zeros((len(processed), len(self.choices)), dtype=np.float32)
+        S = process.cdist(processed, self.choices, scorer=self.scorer, processor=None,
+                          dtype=np.float32, workers=self.workers)
+        S /= 100.0
+        return S
+
+    def top_k(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        return self.top_k_many([query], k=k)[0]
+
+    def top_k_many(self, queries: Sequence[str], k: int = 5) -> List[List[Tuple[int, float]]]:
+        """Top-k (row_index, score) per query. Queries are scored in chunks to bound memory."""
+        out: List[List[Tuple[int, float]]] = []
+        for start in range(0, len(queries), self.query_chunk):
+            S = self.scores(queries[start:start + self.query_chunk])
+            for row in S:
+                idxs = top_k_indices(row, k)
+                out.append([(int(i), float(row[i])) for i in idxs])
+        return out
@@ -0,0 +1,27 @@
+
+from loaders.bm25 import BM25Index
+from loaders.docs_loader import DocSource
+
+DOCS = [
+    ("inception.txt", "Inception is a mind-bending heist set inside layered dreams."),
+    ("interstellar.txt", "Interstellar explores love, time dilation and survival."),
+    ("tenet.txt", "Tenet plays with time inversion in a spy thriller."),
+]
+
+def test_bm25_ranks_and_roundtrips(tmp_path):
+    index = BM25Index.build(DOCS)
+    top = index.search("dreams heist", k=2)
+    assert [d for d, _ in top] == [0]
+    assert [d for d, _ in index.search("time", k=5)] == [1, 2]
+    path = tmp_path / "bm25.json"
+    index.save(path)
+    lazy = BM25Index(path)
+    assert not lazy._loaded
+    assert lazy.search("time", k=5) == index.search("time", k=5)
+
+def test_doc_source_builds_in_memory(tmp_path):
+    for name, text in DOCS:
+        (tmp_path / name).write_text(text)
+    hits = DocSource(tmp_path).search("time inversion", k=1)
+    assert hits[0].source_id == "doc:tenet.txt"
+    assert 0.0 < hits[0].score < 1.0
@@ -0,0 +1,30 @@
+import os
+from pathlib import Path
+
+from loaders.columnar import ColumnarTable, convert, find_columnar
+from loaders.csv_loader import CSVSource
+
+LAKE_CSV = Path(__file__).resolve().parents[2] / "data_lake" / "csv"
+
+def test_columnar_csv_source_matches_pandas(tmp_path):
+    src = tmp_path / "movies.csv"
+    src.write_bytes((LAKE_CSV / "movies.csv").read_bytes())
+    pandas_src = CSVSource(src)
+    for fmt in ("arrow", "parquet"):
+        out = convert(src, tmp_path / fmt, fmt=fmt, row_group_size=2)
+        assert find_columnar(src, tmp_path / fmt) == out
+        col = CSVSource(src, columnar_dir=tmp_path / fmt)
+        assert col.df is None and col.table is not None
+        for q in ("Inception", "dark knight", "interstellar"):
+            a, b = pandas_src.search(q, k=4), col.search(q, k=4)
+            assert [h.source_id for h in a] == [h.source_id for h in b]
+            assert [h.payload for h in a] == [h.payload for h in b]
+    table = ColumnarTable(tmp_path / "parquet" / "movies.parquet")
+    assert table.schema.field("release_year").type == "int64"
+    assert [r["title"] for r in table.rows([5, 0, 3])] == [table.column("title")[i] for i in (5, 0, 3)]
+
+    # A rewritten CSV makes the columnar copies stale, so CSVSource goes back to parsing it
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert find_columnar(src, tmp_path / "arrow") is None
+    assert CSVSource(src, columnar_dir=tmp_path / "arrow").table is None
@@ -0,0 +1,22 @@
+
+from concurrent.futures import ThreadPoolExecutor
+from etl.seed_db import seed, SEED_SQL
+from loaders.db_loader import DBSource, fts_match_expr
+
+def test_fts_match_expr():
+    assert fts_match_expr("The Dark Knight") == '"dark"* OR "knight"*'
+    assert fts_match_expr("?!") == ""
+
+def test_bm25_ranked_hits_and_pool(tmp_path):
+    db = tmp_path / "movies.db"
+    seed(db, SEED_SQL)
+    src = DBSource(db, pool_size=2)
+    hits = src.search("dark knight", k=3)
+    assert hits[0].payload["title"] == "The Dark Knight"
+    assert 0.0 < hits[0].score < 1.0
+    assert "_rank" not in hits[0].payload
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        titles = list(ex.map(lambda q: src.search(q, k=1)[0].payload["title"], ["Inception", "Tenet"] * 20))
+    assert titles == ["Inception", "Tenet"] * 20
+    assert src.pool._created <= 2
+    src.close()
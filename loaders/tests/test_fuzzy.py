@@ -0,0 +1,17 @@
+
+import numpy as np
+from loaders.common import top_k_indices
+from loaders.fuzzy import FuzzyMatcher
+
+def test_top_k_indices_ties_and_order():
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.1], dtype=np.float32)
+    assert top_k_indices(scores, 2).tolist() == [1, 3]
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0, 4]
+
+def test_matcher_batch_matches_single():
+    m = FuzzyMatcher(["Inception", "Interstellar", "The Dark Knight", "Tenet"])
+    best = m.top_k("inception", k=1)
+    assert best[0][0] == 0 and best[0][1] == 1.0
+    queries = ["dark knight", "Interstellar", "tenet"]
+    assert m.top_k_many(queries, k=2) == [m.top_k(q, k=2) for q in queries]
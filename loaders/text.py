@@ -0,0 +1,16 @@
+from __future__ import annotations
+import re
+from typing import List
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""a an and are as at be by did do does for from has have how in is it its of on or
+than that the their there these this to was were what when where which who why will with""".split())
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """Lowercase word tokens; stopwords are dropped unless nothing else remains."""
+    toks = _TOKEN_RE.findall((text or "").lower())
+    if not drop_stopwords:
+        return toks
+    kept = [t for t in toks if t not in STOPWORDS]
+    return kept or toks
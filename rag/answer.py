@@ -1,8 +1,9 @@
 
 from __future__ import annotations
-import os, json, re, time
+import json, re, time
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from tracing import span
 
 # Optional deps
 try:
@@ -11,19 +12,25 @@ try:
 except Exception:
     pass
 
-def _format_structured(evidence: Dict[str, Any]) -> str:
-    """Render DB/CSV rows as compact tables in markdown-like format."""
+def _format_rows(hits: List[Dict[str, Any]], tag: str, keys: Tuple[str, ...]) -> List[str]:
     lines: List[str] = []
-    # DB
-    for h in evidence.get("db", [])[:5]:
-        row = h.get("row", {})
-        subset = {k: row.get(k) for k in ("title","release_year","box_office_usd","runtime_min","imdb","metacritic") if k in row}
-        lines.append(f"- [DB] {subset}")
-    # CSV
-    for h in evidence.get("csv", [])[:5]:
+    computed = None
+    for h in hits[:5]:
         row = h.get("row", {})
-        subset = {k: row.get(k) for k in ("title","release_year","imdb","metacritic","rt_tomatoes") if k in row}
-        lines.append(f"- [CSV] {subset}")
+        if "computed" in row:
+            # Planner output: already reduced to the relevant columns, shown whole under its description
+            if row["computed"] != computed:
+                computed = row["computed"]
+                lines.append(f"- [{tag}] Computed over the full table: {computed}")
+            lines.append(f"  - { {k: v for k, v in row.items() if k != 'computed'} }")
+        else:
+            lines.append(f"- [{tag}] { {k: row.get(k) for k in keys if k in row} }")
+    return lines
+
+def _format_structured(evidence: Dict[str, Any]) -> str:
+    """Render DB/CSV rows as compact tables in markdown-like format."""
+    lines = _format_rows(evidence.get("db", []), "DB", ("title","release_year","box_office_usd","runtime_min","imdb","metacritic"))
+    lines += _format_rows(evidence.get("csv", []), "CSV", ("title","release_year","imdb","metacritic","rt_tomatoes"))
     return "\n".join(lines) if lines else "(none)"
 
 def _format_unstructured(evidence: Dict[str, Any]) -> str:
@@ -34,14 +41,28 @@ def _format_unstructured(evidence: Dict[str, Any]) -> str:
         lines.append(f"- [DOC] ({doc}) {chunk[:400]}")
     return "\n".join(lines) if lines else "(none)"
 
-def build_prompt(pack: Dict[str, Any]) -> Dict[str, str]:
-    """Return dict with 'system' and 'user' strings."""
+def _format_linked(pack: Dict[str, Any]) -> str:
+    """One line per film seen in more than one source, facts tagged with the source they came from."""
+    from fusion import linked_facts
+    lines: List[str] = []
+    for eid, ent in pack.get("entities", {}).get("linked", {}).items():
+        if len(ent.get("sources", [])) < 2:
+            continue
+        facts = "; ".join(f"{k} {v} [{origin}]" for k, v, origin in linked_facts(pack, eid))
+        docs = ", ".join(ent.get("docs", []))
+        lines.append(f"- {ent['title']}: {facts or '(no row facts)'}" + (f"; discussed in {docs} [DOC]" if docs else ""))
+    return "\n".join(lines[:5])
+
+def build_prompt(pack: Dict[str, Any], stream: bool = False) -> Dict[str, str]:
+    """Return dict with 'system' and 'user' strings; `stream` asks for plain text instead of JSON."""
     query = pack.get("query","")
     struct = _format_structured(pack.get("retrieval",{}))
     unstruct = _format_unstructured(pack.get("retrieval",{}))
+    linked = _format_linked(pack)
+    linked = f"\n# Linked Entities (same film across sources)\n{linked}\n" if linked else ""
 
     system_path = Path(__file__).resolve().parent / "prompts" / "answer_system.md"
-    cite_path = Path(__file__).resolve().parent / "prompts" / "cite_instructions.md"
+    cite_path = Path(__file__).resolve().parent / "prompts" / ("cite_instructions_stream.md" if stream else "cite_instructions.md")
     system_rules = system_path.read_text()
     cite_rules = cite_path.read_text()
 
@@ -53,7 +74,7 @@ def build_prompt(pack: Dict[str, Any]) -> Dict[str, str]:
 
 # Unstructured Evidence (passages)
 {unstruct}
-
+{linked}
 # Instructions
 {cite_rules}
 """
@@ -70,14 +91,27 @@ def _extract_json(text: str) -> Dict[str, Any]:
             pass
     return {}
 
-def _fallback_compose(pack: Dict[str, Any]) -> Dict[str, Any]:
-    """Compose a minimal grounded answer without calling an LLM."""
+def _computed_lines(hits: List[Dict[str, Any]], tag: str) -> List[str]:
+    """State planner results (aggregate values or the top rows of an ordering) directly."""
+    rows = [h.get("row", {}) for h in hits if "computed" in h.get("row", {})]
+    if not rows:
+        return []
+    if "aggregate" in rows[0]:
+        return [f"- The {r['computed']} is {r['value']}" + ("" if r["aggregate"] == "count" else f" ({r['rows']} rows)")
+                + f" [{tag}]." for r in rows]
+    ranked = ", ".join(f"{r.get('title')} (" + ", ".join(f"{k} {v}" for k, v in r.items() if k not in ("title", "computed"))
+                       + ")" for r in rows[:3])
+    return [f"- {rows[0]['computed'][0].upper()}{rows[0]['computed'][1:]}: {ranked} [{tag}]."]
+
+def _fallback_lines(pack: Dict[str, Any]) -> List[str]:
+    """Minimal grounded answer lines with citation tags, composed without an LLM."""
     db = pack.get("retrieval",{}).get("db",[])
     csv = pack.get("retrieval",{}).get("csv",[])
     docs = pack.get("retrieval",{}).get("docs",[])
 
-    lines: List[str] = []
-    used = set()
+    lines = _computed_lines(db, "DB") + _computed_lines(csv, "CSV")
+    if lines:
+        db = csv = []  # the computed rows are the structured answer
 
     # Try to find top DB facts
     for h in db[:2]:
@@ -90,7 +124,6 @@ def _fallback_compose(pack: Dict[str, Any]) -> Dict[str, Any]:
                 lines.append(f"- {title} ({year}) grossed ${boxo:,} [DB].")
             else:
                 lines.append(f"- {title} ({year}) [DB].")
-            used.add("DB")
 
     # Ratings from CSV
     for h in csv[:2]:
@@ -105,71 +138,192 @@ def _fallback_compose(pack: Dict[str, Any]) -> Dict[str, Any]:
             bits.append(f"Metacritic {meta}")
         if title and bits:
             lines.append(f"- {title} ratings: {', '.join(bits)} [CSV].")
-            used.add("CSV")
 
     # Themes from docs
     if docs:
         chunk = docs[0].get("chunk","").strip().replace("\n"," ")
         if chunk:
             lines.append(f"- Critics note: {chunk[:200]} [DOC].")
-            used.add("DOC")
 
     if not lines:
         lines.append("Insufficient evidence in the pack to answer. Please refine the query.")
-    return {"answer": "\n".join(lines), "used_modalities": sorted(list(used)), "citations": []}
-
-def synthesize_with_openai(prompt: Dict[str,str], model: str = "gpt-4o-mini", timeout: int = 60) -> Dict[str, Any]:
-    """Use OpenAI if available; otherwise raise to trigger fallback."""
-    try:
-        import openai # type: ignore
-    except Exception as e:
-        raise RuntimeError("openai package not installed") from e
-
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set")
-    openai.api_key = api_key
-
-    # Use Chat Completions (SDK v0.28 style) or new client if v1+ is installed.
-    try:
-        from openai import OpenAI # type: ignore
-        client = OpenAI(api_key=api_key)
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role":"system","content":prompt["system"]},
-                {"role":"user","content":prompt["user"]},
-            ],
-            temperature=0.0,
-            max_tokens=600,
-            timeout=timeout,
-        )
-        text = resp.choices[0].message.content
-    except Exception:
-        # Fallback to legacy
-        text = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role":"system","content":prompt["system"]},
-                {"role":"user","content":prompt["user"]},
-            ],
-            temperature=0.0,
-            max_tokens=600,
-            request_timeout=timeout,
-        )["choices"][0]["message"]["content"]
+    return lines
+
+def _fallback_chunks(pack: Dict[str, Any]) -> Iterator[str]:
+    # Word-sized pieces so the fallback streams like an LLM would
+    yield from re.findall(r"\S+\s*", "\n".join(_fallback_lines(pack)))
+
+def _fallback_compose(pack: Dict[str, Any]) -> Dict[str, Any]:
+    """Compose a minimal grounded answer without calling an LLM."""
+    result = AnswerStream(pack, prefer_llm=False).result()
+    result.pop("stream")
+    return result
+
+def _messages(prompt: Dict[str,str]) -> List[Dict[str,str]]:
+    return [{"role":"system","content":prompt["system"]}, {"role":"user","content":prompt["user"]}]
 
+def _parse_answer(text: str) -> Dict[str, Any]:
     data = _extract_json(text)
     if not data:
         # If LLM didn't return JSON, wrap as best-effort
         data = {"answer": text.strip(), "used_modalities": [], "citations": []}
     return data
 
+def synthesize_with_openai(prompt: Dict[str,str], model: str = "gpt-4o-mini") -> Dict[str, Any]:
+    """Call the chat-completions API through the shared client; raises to trigger fallback."""
+    from llm import get_client
+    return _parse_answer(get_client().chat(_messages(prompt), model=model, temperature=0.0, max_tokens=600))
+
+async def synthesize_with_openai_async(prompt: Dict[str,str], model: str = "gpt-4o-mini") -> Dict[str, Any]:
+    from llm import get_async_client
+    return _parse_answer(await get_async_client().chat(_messages(prompt), model=model, temperature=0.0, max_tokens=600))
+
+TAG_RE = re.compile(r"\[(DB|CSV|DOC)\]")
+
+class CitationParser:
+    """
+    Incremental [DB]/[CSV]/[DOC] tag parser for streamed text. Each tag closes a citation
+    whose span is the text since the previous one; adjacent tags ([DB][CSV]) share a span.
+    A trailing partial tag is held back until the next chunk completes it.
+    """
+    def __init__(self) -> None:
+        self.citations: List[Dict[str, Any]] = []
+        self.used: set = set()
+        self._pending = ""
+        self._span = ""
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk; returns citations completed by it (updated in place by later tags)."""
+        buf = self._pending + text
+        cut = buf.rfind("[")
+        if cut != -1 and len(buf) - cut < 5 and "]" not in buf[cut:]:
+            buf, self._pending = buf[:cut], buf[cut:]
+        else:
+            self._pending = ""
+        new: List[Dict[str, Any]] = []
+        pos = 0
+        for m in TAG_RE.finditer(buf):
+            tag = m.group(1)
+            span = (self._span + buf[pos:m.start()]).lstrip(".,;:-* \t\r\n").strip()
+            self._span = ""
+            if span or not self.citations:
+                cite = {"span": span, "source_tags": [tag]}
+                self.citations.append(cite)
+                new.append(cite)
+            elif tag not in self.citations[-1]["source_tags"]:
+                self.citations[-1]["source_tags"].append(tag)
+            self.used.add(tag)
+            pos = m.end()
+        self._span += buf[pos:]
+        return new
+
+    def close(self) -> None:
+        self._span += self._pending
+        self._pending = ""
+
+class AnswerStream:
+    """
+    Streams an answer as text chunks: from the LLM when `prefer_llm` and it starts
+    responding, else from the deterministic fallback. Iterate for text, events() for
+    ("delta", text) / ("citation", dict) pairs; result() returns the answer dict with
+    `stream` metrics (time to first token, tokens/sec; a token is one streamed chunk).
+    Times are measured from `started` (a perf_counter value) or from the first iteration.
+    """
+    def __init__(self, pack: Dict[str, Any], prefer_llm: bool = True, model: str = "gpt-4o-mini",
+                 started: Optional[float] = None) -> None:
+        self.pack = pack
+        self.prefer_llm = prefer_llm
+        self.model = model
+        self.source: Optional[str] = None
+        self.parser = CitationParser()
+        self._text: List[str] = []
+        self._metrics: Optional[Dict[str, Any]] = None
+        self._started = started
+
+    def _chunks(self) -> Iterator[str]:
+        if self.prefer_llm:
+            try:
+                from llm import get_client
+                prompt = build_prompt(self.pack, stream=True)
+                it = get_client().chat_stream(_messages(prompt), model=self.model, temperature=0.0, max_tokens=600)
+                first = next(it)
+            except Exception:
+                pass  # nothing emitted yet, so fall back cleanly
+            else:
+                self.source = "llm"
+                yield first
+                yield from it
+                return
+        self.source = "fallback"
+        yield from _fallback_chunks(self.pack)
+
+    def events(self) -> Iterator[Tuple[str, Any]]:
+        if self._metrics is not None:
+            raise RuntimeError("AnswerStream already consumed")
+        t0 = self._started if self._started is not None else time.perf_counter()
+        t_first = None
+        tokens = 0
+        for chunk in self._chunks():
+            if t_first is None:
+                t_first = time.perf_counter()
+            tokens += 1
+            self._text.append(chunk)
+            yield ("delta", chunk)
+            for cite in self.parser.feed(chunk):
+                yield ("citation", cite)
+        self.parser.close()
+        t_end = time.perf_counter()
+        gen_s = t_end - (t_first or t_end)
+        self._metrics = {"source": self.source, "ttft_s": None if t_first is None else t_first - t0,
+                         "total_s": t_end - t0, "tokens": tokens,
+                         "tokens_per_s": tokens / gen_s if gen_s > 0 else None}
+
+    def __iter__(self) -> Iterator[str]:
+        return (data for kind, data in self.events() if kind == "delta")
+
+    def result(self) -> Dict[str, Any]:
+        if self._metrics is None:
+            for _ in self.events():
+                pass
+        text = "".join(self._text).strip()
+        return {"answer": text or "(no answer)", "used_modalities": sorted(self.parser.used),
+                "citations": self.parser.citations, "stream": self._metrics}
+
+def stream_answer(pack: Dict[str, Any], prefer_llm: bool = True, model: str = "gpt-4o-mini",
+                  started: Optional[float] = None) -> AnswerStream:
+    return AnswerStream(pack, prefer_llm=prefer_llm, model=model, started=started)
+
+def _evidence_count(pack: Dict[str, Any]) -> int:
+    return sum(len(v) for v in pack.get("retrieval", {}).values())
+
 def synthesize_answer(pack: Dict[str, Any], prefer_llm: bool = True, model: str = "gpt-4o-mini") -> Dict[str, Any]:
-    prompt = build_prompt(pack)
-    if prefer_llm:
-        try:
-            return synthesize_with_openai(prompt, model=model)
-        except Exception:
-            pass
-    # Fallback deterministic composition
-    return _fallback_compose(pack)
+    with span("synthesize", evidence=_evidence_count(pack), llm=prefer_llm) as s:
+        prompt = build_prompt(pack)
+        s.set(prompt_chars=len(prompt["system"]) + len(prompt["user"]))
+        answer = None
+        if prefer_llm:
+            try:
+                answer = synthesize_with_openai(prompt, model=model)
+            except Exception:
+                pass
+        source = "llm" if answer is not None else "fallback"
+        if answer is None:
+            # Fallback deterministic composition
+            answer = _fallback_compose(pack)
+        s.set(source=source, citations=len(answer.get("citations", [])))
+    return answer
+
+async def synthesize_answer_async(pack: Dict[str, Any], prefer_llm: bool = True, model: str = "gpt-4o-mini") -> Dict[str, Any]:
+    """synthesize_answer() that awaits the LLM instead of blocking a thread on it."""
+    with span("synthesize", evidence=_evidence_count(pack), llm=prefer_llm) as s:
+        answer = None
+        if prefer_llm:
+            try:
+                answer = await synthesize_with_openai_async(build_prompt(pack), model=model)
+            except Exception:
+                pass
+        source = "llm" if answer is not None else "fallback"
+        if answer is None:
+            answer = _fallback_compose(pack)
+        s.set(source=source, citations=len(answer.get("citations", [])))
+    return answer
@@ -0,0 +1,129 @@
+
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from retrievers.embed_cache import normalize_query
+
+# Files under the docs index dir whose change means retrieval results may differ
+DOCS_INDEX_FILES = ("manifest.json", "faiss.json", "faiss.index", "bm25.json")
+
+def _stat(path: Path) -> List[Any]:
+    try:
+        st = path.stat()
+        return [str(path), st.st_size, st.st_mtime_ns]
+    except FileNotFoundError:
+        return [str(path), None, None]
+
+def lake_version(csv_paths: Iterable[Path], db_path: Path, docs_index: Path, extra: Iterable[Path] = ()) -> str:
+    """
+    Fingerprint of everything retrieval reads: CSV files, the SQLite file (and its WAL),
+    the docs index manifest/index files and any `extra` files (e.g. the entity index). Uses size + mtime, so it costs a few stat()
+    calls and changes whenever any source is rewritten.
+    """
+    db_path = Path(db_path)
+    parts = [_stat(Path(p)) for p in csv_paths]
+    parts += [_stat(db_path), _stat(db_path.with_name(db_path.name + "-wal"))]
+    parts += [_stat(Path(docs_index) / name) for name in DOCS_INDEX_FILES]
+    parts += [_stat(Path(p)) for p in extra]
+    return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+def pack_key(query: str, route: str, k: int, version: str) -> str:
+    return hashlib.sha256(json.dumps([normalize_query(query), route, k, version]).encode("utf-8")).hexdigest()
+
+class PackCache:
+    """
+    Cache of finished evidence packs keyed by (normalized query, route, k, lake version).
+    Tier 1 is an in-process LRU of `capacity` packs; tier 2 (optional) is a SQLite file
+    bounded to `max_disk_bytes` of pack JSON, evicting least recently used rows.
+    Entries for an older lake version can never hit and are purged when a new version is seen.
+    """
+    def __init__(self, capacity: int = 256, disk_path: Optional[Path] = None, max_disk_bytes: int = 256 * 2**20) -> None:
+        self.capacity = capacity
+        self.disk_path = Path(disk_path) if disk_path is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self._lru: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+        self._last_version: Optional[str] = None
+        self._unchecked = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_path is not None:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._con = sqlite3.connect(self.disk_path, check_same_thread=False, timeout=5.0)
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("""CREATE TABLE IF NOT EXISTS packs (
+                key TEXT PRIMARY KEY, version TEXT NOT NULL, pack TEXT NOT NULL,
+                nbytes INTEGER NOT NULL, accessed REAL NOT NULL)""")
+            self._con.execute("CREATE INDEX IF NOT EXISTS packs_accessed ON packs (accessed)")
+            self._con.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "size": len(self._lru)}
+
+    def _remember(self, key: str, pack: Dict[str, Any]) -> None:
+        self._lru[key] = pack
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached pack or None. Callers must not mutate the returned pack."""
+        with self._lock:
+            pack = self._lru.get(key)
+            if pack is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return pack
+            if self._con is not None:
+                row = self._con.execute("SELECT pack FROM packs WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._con.execute("UPDATE packs SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._con.commit()
+                    pack = json.loads(row[0])
+                    self._remember(key, pack)
+                    self.disk_hits += 1
+                    return pack
+            self.misses += 1
+            return None
+
+    def put(self, key: str, version: str, pack: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, pack)
+            if self._con is None:
+                return
+            blob = json.dumps(pack, ensure_ascii=False, default=str)
+            if version != self._last_version:
+                self._con.execute("DELETE FROM packs WHERE version != ?", (version,))
+                self._last_version = version
+            self._con.execute("INSERT OR REPLACE INTO packs (key, version, pack, nbytes, accessed) VALUES (?, ?, ?, ?, ?)",
+                              (key, version, blob, len(blob), time.time()))
+            self._unchecked += 1
+            total = 0
+            if self._unchecked >= 32:
+                # Amortized size check; the budget may be overshot by at most a few dozen packs
+                self._unchecked = 0
+                total = self._con.execute("SELECT COALESCE(SUM(nbytes), 0) FROM packs").fetchone()[0]
+            if total > self.max_disk_bytes:
+                # Evict least recently used packs until under the byte budget
+                evict, freed = [], 0
+                for k, n in self._con.execute("SELECT key, nbytes FROM packs ORDER BY accessed ASC"):
+                    if total - freed <= self.max_disk_bytes:
+                        break
+                    evict.append((k,))
+                    freed += n
+                self._con.executemany("DELETE FROM packs WHERE key = ?", evict)
+            self._con.commit()
+
+    def close(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
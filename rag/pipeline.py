@@ -0,0 +1,224 @@
+
+from __future__ import annotations
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from loaders import Evidence
+from retrievers import UnifiedRetriever
+from retrievers.fanout import fan_out
+from fusion import EntityIndex, normalize_retrieval
+from router.route import route_query, route_query_async
+from rag.pack_cache import PackCache, lake_version, pack_key
+from tracing import NOOP, propagate, span, trace as start_trace
+
+CSV_PATHS = [
+    BASE / "data_lake" / "csv" / "movies.csv",
+    BASE / "data_lake" / "csv" / "ratings.csv",
+]
+DB_PATH = BASE / "data_lake" / "db" / "movies.db"
+COLUMNAR_DIR = BASE / "indexes" / "columnar"  # etl/build_columnar.py; CSVs are parsed directly when absent
+DOCS_INDEX = BASE / "indexes" / "docs"
+ENTITY_INDEX = BASE / "indexes" / "entities.json"  # etl/build_entity_index.py; packs are unlinked when absent
+EMBED_CACHE = BASE / "indexes" / "cache" / "query_embeddings.sqlite"
+PACK_CACHE = BASE / "indexes" / "cache" / "evidence_packs.sqlite"
+
+ROUTES = ("auto", "structured", "unstructured", "both")
+
+# Max questions per stage of answer_async(); anything beyond waits on the stage's semaphore
+STAGE_LIMITS = {"route": 64, "retrieve": 16, "synthesize": 64}
+
+class QAPipeline:
+    """
+    route → retrieve → normalize → synthesize, over retrievers that stay loaded between
+    queries. Sources are loaded on first use; call warm() to load everything up front
+    (the API server does this at startup). Safe to call answer() from many threads.
+    With a `pack_cache`, finished evidence packs are reused while the query, route, k
+    and the data-lake version are unchanged.
+    answer_async() runs the same stages on an event loop: retrieval on a dedicated thread
+    pool, LLM calls awaited natively, each stage bounded by `stage_limits` so many questions
+    can be in flight while memory and backend load stay bounded.
+    With an up-to-date `entity_index` (etl/build_entity_index.py), normalize links DB rows, CSV rows
+    and docs of the same film by lookup (pack["entities"]["linked"]).
+    With `trace=True`, answer()/answer_stream()/answer_async() add result["trace"]: nested
+    spans (route, retrieve, per-backend searches, normalize, synthesize) with their
+    duration in ms, input sizes and hit counts. Untraced calls only pay a ContextVar lookup per span.
+    """
+    def __init__(self, csv_paths: Optional[List[Path]] = None, db_path: Path = DB_PATH, docs_index: Path = DOCS_INDEX,
+                 embed_cache_path: Optional[Path] = EMBED_CACHE, backend_timeout: Optional[float] = None,
+                 model: str = "gpt-4o-mini", pack_cache: Optional[PackCache] = None,
+                 stage_limits: Optional[Dict[str, int]] = None, columnar_dir: Optional[Path] = COLUMNAR_DIR,
+                 entity_index: Optional[Path] = ENTITY_INDEX) -> None:
+        self.csv_paths = list(csv_paths or CSV_PATHS)
+        self.db_path = db_path
+        self.docs_index = docs_index
+        self.retriever = UnifiedRetriever(csv_paths=self.csv_paths, db_path=db_path, docs_index_dir=docs_index,
+                                          embed_cache_path=embed_cache_path, lazy=True, columnar_dir=columnar_dir)
+        self.backend_timeout = backend_timeout
+        self.model = model
+        self.pack_cache = pack_cache
+        self.stage_limits = {**STAGE_LIMITS, **(stage_limits or {})}
+        self._stage_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stage_sems: Dict[str, asyncio.Semaphore] = {}
+        self._retrieve_pool: Optional[ThreadPoolExecutor] = None
+        self._async_lock = threading.Lock()
+        self.entity_index = Path(entity_index) if entity_index is not None else None
+        self._entities: Optional[EntityIndex] = None
+        self._entities_loaded = False
+        self._entities_lock = threading.Lock()
+
+    @property
+    def entities(self) -> Optional[EntityIndex]:
+        """The entity index, loaded on first use; None when missing or built from an older lake."""
+        if not self._entities_loaded:
+            with self._entities_lock:
+                if not self._entities_loaded:
+                    if self.entity_index is not None and self.entity_index.exists():
+                        index = EntityIndex.load(self.entity_index)
+                        if not index.covers([*self.csv_paths, self.db_path]):
+                            print(f"Warning: {self.entity_index} was built from another lake; not used", file=sys.stderr)
+                        elif index.is_current():
+                            self._entities = index
+                        else:
+                            print(f"Warning: {self.entity_index} is stale; re-run etl/build_entity_index.py",
+                                  file=sys.stderr)
+                    self._entities_loaded = True
+        return self._entities
+
+    def warm(self) -> "QAPipeline":
+        self.retriever.structured
+        try:
+            self.retriever.unstructured
+        except FileNotFoundError as e:
+            # Structured routes still work; doc routes will raise until the index is built
+            print(f"Warning: doc index not loaded: {e}", file=sys.stderr)
+        self.entities
+        return self
+
+    def route(self, query: str, route: str = "auto", use_llm_router: bool = False) -> Tuple[str, float, Dict[str, bool]]:
+        if route == "auto":
+            return route_query(query, use_llm=use_llm_router, model=self.model)
+        return (route, 1.0, {"forced": True})
+
+    def retrieve(self, query: str, route: str, k: int = 5) -> Tuple[Dict[str, List[Evidence]], List[str]]:
+        """Run the backends for `route`; returns (hits per modality, timed-out backends)."""
+        with span("retrieve", route=route, k=k) as s:
+            out, timed_out = self._retrieve(query, route, k)
+            s.set(hits={name: len(out[name]) for name in ("db", "csv", "docs")}, timed_out=timed_out)
+        return out, timed_out
+
+    def _retrieve(self, query: str, route: str, k: int) -> Tuple[Dict[str, List[Evidence]], List[str]]:
+        timeout = self.backend_timeout
+        if route == "structured":
+            struct, timed_out = self.retriever.structured.search_with_status(query, k_per_modality=k, timeout=timeout)
+            out = {"db": struct.get("db", []), "csv": struct.get("csv", []), "docs": []}
+        elif route == "unstructured":
+            docs = self.retriever.unstructured
+            finished, timed_out = fan_out({"docs": lambda: docs.search(query, k=k)}, timeout=timeout)
+            out = {"db": [], "csv": [], "docs": finished.get("docs", [])}
+        else:  # both
+            out, timed_out = self.retriever.search_all_with_status(query, k_per_modality=k, timeout=timeout)
+        return {name: out[name] for name in ("db", "csv", "docs")}, timed_out
+
+    def lake_version(self) -> str:
+        extra = [self.entity_index] if self.entity_index is not None else []
+        return lake_version(self.csv_paths, self.db_path, self.docs_index, extra=extra)
+
+    def evidence_pack(self, query: str, route: str, k: int = 5) -> Tuple[Dict[str, Any], bool]:
+        """Evidence pack for an already-routed query; returns (pack, served_from_cache)."""
+        key = version = None
+        if self.pack_cache is not None:
+            with span("pack_cache.get") as s:
+                version = self.lake_version()
+                key = pack_key(query, route, k, version)
+                pack = self.pack_cache.get(key)
+                s.set(hit=pack is not None)
+            if pack is not None:
+                return pack, True
+        hits, timed_out = self.retrieve(query, route, k=k)
+        # Evidence objects go straight into the pack; their payloads become its rows uncopied
+        pack = normalize_retrieval(query=query, retrieval=hits, timed_out=timed_out, entities=self.entities)
+        if key is not None and not timed_out:
+            # Partial packs (some backend timed out) are never cached
+            self.pack_cache.put(key, version, pack)
+        return pack, False
+
+    def embed_cache_stats(self) -> Optional[Dict[str, int]]:
+        unstructured = self.retriever._unstructured
+        if unstructured is None or unstructured.cache is None:
+            return None
+        return unstructured.cache.stats()
+
+    def _prepare(self, query: str, k: int, route: str, use_llm_router: bool) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        route, conf, _ = self.route(query, route=route, use_llm_router=use_llm_router)
+        pack, cache_hit = self.evidence_pack(query, route, k=k)
+        return pack, {"query": query, "route": route, "route_confidence": conf, "answer": None,
+                      "cache_hit": cache_hit, "embed_cache": self.embed_cache_stats(), "evidence": pack}
+
+    def answer(self, query: str, k: int = 5, route: str = "auto", use_llm_router: bool = False,
+               use_llm: bool = False, trace: bool = False) -> Dict[str, Any]:
+        with start_trace("answer", k=k) if trace else NOOP as t:
+            pack, result = self._prepare(query, k, route, use_llm_router)
+            from rag.answer import synthesize_answer
+            result["answer"] = synthesize_answer(pack, prefer_llm=use_llm, model=self.model)
+        if trace:
+            result["trace"] = t.to_dict()
+        return result
+
+    def answer_stream(self, query: str, k: int = 5, route: str = "auto", use_llm_router: bool = False,
+                      use_llm: bool = False, trace: bool = False):
+        """
+        Like answer(), but returns (result, AnswerStream) as soon as the evidence pack is ready.
+        Consume the stream, then set result["answer"] = stream.result(). Stream timings
+        (time to first token) include routing and retrieval; the trace covers those two only.
+        """
+        started = time.perf_counter()
+        with start_trace("prepare", k=k) if trace else NOOP as t:
+            pack, result = self._prepare(query, k, route, use_llm_router)
+        if trace:
+            result["trace"] = t.to_dict()
+        from rag.answer import stream_answer
+        return result, stream_answer(pack, prefer_llm=use_llm, model=self.model, started=started)
+
+    def _stages(self) -> Tuple[Dict[str, asyncio.Semaphore], ThreadPoolExecutor]:
+        """Per-event-loop stage semaphores and the retrieval thread pool, created on first use."""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            if self._stage_loop is not loop:
+                self._stage_sems = {name: asyncio.Semaphore(n) for name, n in self.stage_limits.items()}
+                self._stage_loop = loop
+            if self._retrieve_pool is None:
+                # Separate from the fan-out pool: these threads block waiting on fan-out results
+                self._retrieve_pool = ThreadPoolExecutor(max_workers=self.stage_limits["retrieve"],
+                                                         thread_name_prefix="qa-retrieve")
+        return self._stage_sems, self._retrieve_pool
+
+    async def answer_async(self, query: str, k: int = 5, route: str = "auto", use_llm_router: bool = False,
+                           use_llm: bool = False, trace: bool = False) -> Dict[str, Any]:
+        """answer() for asyncio callers; same result dict."""
+        stages, pool = self._stages()
+        with start_trace("answer", k=k) if trace else NOOP as t:
+            if route == "auto":
+                async with stages["route"]:
+                    route, conf, _ = await route_query_async(query, use_llm=use_llm_router, model=self.model)
+            else:
+                conf = 1.0
+            async with stages["retrieve"]:
+                pack, cache_hit = await asyncio.get_running_loop().run_in_executor(
+                    pool, propagate(lambda: self.evidence_pack(query, route, k)))
+            async with stages["synthesize"]:
+                from rag.answer import synthesize_answer_async
+                answer = await synthesize_answer_async(pack, prefer_llm=use_llm, model=self.model)
+        result = {"query": query, "route": route, "route_confidence": conf, "answer": answer,
+                  "cache_hit": cache_hit, "embed_cache": self.embed_cache_stats(), "evidence": pack}
+        if trace:
+            result["trace"] = t.to_dict()
+        return result
@@ -0,0 +1,209 @@
+from __future__ import annotations
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+BASE = Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from rag.pipeline import ROUTES, EMBED_CACHE
+
+# Scalar columns of every output record; citations/evidence are nested (JSON strings in Parquet)
+COLUMNS = ("id", "query", "route", "route_confidence", "cache_hit", "answer", "used_modalities", "elapsed_ms", "error")
+
+def read_questions(path: Path) -> List[Dict[str, str]]:
+    """
+    Questions from a .jsonl file ({"query" or "question", optional "id"}) or a .csv file with a
+    query/question column. Rows without an id get their 1-based line number, so ids stay stable across resumes.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    out = []
+    for i, row in enumerate(rows, 1):
+        query = row.get("query") or row.get("question")
+        if query:
+            out.append({"id": str(row.get("id") or i), "query": query})
+    return out
+
+def spool_path(out: Path) -> Path:
+    """Where results are appended: the output itself for .jsonl, a sidecar for .parquet (compacted at the end)."""
+    out = Path(out)
+    return out if out.suffix != ".parquet" else out.with_name(out.name + ".partial.jsonl")
+
+def completed_ids(spool: Path) -> Set[str]:
+    """
+    Ids already answered in `spool`. A torn last line (the run was killed mid-write) is
+    truncated away so appends continue from the last complete record.
+    """
+    done: Set[str] = set()
+    if not spool.exists():
+        return done
+    good = 0
+    with open(spool, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                break
+            good += len(line)
+    if good != spool.stat().st_size:
+        with open(spool, "r+b") as f:
+            f.truncate(good)
+    return done
+
+_PIPELINE = None
+_ANSWER_KWARGS: Dict[str, Any] = {}
+
+def _init_worker(pipeline_kwargs: Dict[str, Any], answer_kwargs: Dict[str, Any]) -> None:
+    # Once per worker process: retrievers (CSVs, DB pool, FAISS, encoder) stay loaded for all its questions
+    global _PIPELINE, _ANSWER_KWARGS
+    from rag.pipeline import QAPipeline
+    _PIPELINE = QAPipeline(**pipeline_kwargs).warm()
+    _ANSWER_KWARGS = answer_kwargs
+
+def _answer_chunk(questions: Sequence[Dict[str, str]], keep_evidence: bool) -> List[Dict[str, Any]]:
+    records = []
+    for q in questions:
+        t0 = time.perf_counter()
+        rec: Dict[str, Any] = {"id": q["id"], "query": q["query"]}
+        try:
+            result = _PIPELINE.answer(q["query"], **_ANSWER_KWARGS)
+            answer = result["answer"] or {}
+            rec.update(route=result["route"], route_confidence=result["route_confidence"], cache_hit=result["cache_hit"],
+                       answer=answer.get("answer"), used_modalities=answer.get("used_modalities", []),
+                       citations=answer.get("citations", []), error=None)
+            if keep_evidence:
+                rec["evidence"] = result["evidence"]
+        except Exception as e:
+            # One bad question must not stop the batch; it is recorded (and counted as done) with its error
+            rec["error"] = f"{type(e).__name__}: {e}"
+        rec["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+        records.append(rec)
+    return records
+
+def _chunks(items: Sequence[Dict[str, str]], size: int) -> Iterator[List[Dict[str, str]]]:
+    for i in range(0, len(items), size):
+        yield list(items[i:i + size])
+
+def write_parquet(spool: Path, out: Path, batch_rows: int = 10_000) -> int:
+    """Compact the JSONL spool into one Parquet file, `batch_rows` records per row group."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([("id", pa.string()), ("query", pa.string()), ("route", pa.string()),
+                        ("route_confidence", pa.float64()), ("cache_hit", pa.bool_()), ("answer", pa.string()),
+                        ("used_modalities", pa.list_(pa.string())), ("elapsed_ms", pa.float64()),
+                        ("error", pa.string()), ("citations", pa.string()), ("evidence", pa.string())])
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    rows = 0
+    with open(spool, encoding="utf-8") as f, pq.ParquetWriter(tmp, schema) as writer:
+        batch: List[Dict[str, Any]] = []
+        for line in f:
+            rec = json.loads(line)
+            for key in ("citations", "evidence"):
+                rec[key] = json.dumps(rec[key], ensure_ascii=False, default=str) if key in rec else None
+            batch.append(rec)
+            if len(batch) >= batch_rows:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            rows += len(batch)
+    tmp.replace(out)
+    spool.unlink()
+    return rows
+
+def run_batch(questions: Sequence[Dict[str, str]], out: Path, workers: int = 4, chunk_size: int = 16,
+              pipeline_kwargs: Optional[Dict[str, Any]] = None, answer_kwargs: Optional[Dict[str, Any]] = None,
+              keep_evidence: bool = False) -> Dict[str, Any]:
+    """
+    Answer `questions` across `workers` processes (0 = in this process) and append one JSON
+    record per question to the output. Results are flushed and fsynced after every chunk of
+    `chunk_size` questions, so a rerun with the same output skips everything already answered.
+    """
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    spool = spool_path(out)
+    done = completed_ids(spool)
+    todo = [q for q in questions if q["id"] not in done]
+    pipeline_kwargs, answer_kwargs = pipeline_kwargs or {}, answer_kwargs or {}
+    t0 = time.perf_counter()
+    answered = errors = 0
+    with open(spool, "a", encoding="utf-8") as sink:
+        def write(records: List[Dict[str, Any]]) -> None:
+            nonlocal answered, errors
+            sink.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in records))
+            sink.flush()
+            os.fsync(sink.fileno())
+            answered += len(records)
+            errors += sum(r["error"] is not None for r in records)
+            rate = answered / max(time.perf_counter() - t0, 1e-9)
+            print(f"\r  {answered}/{len(todo)} answered ({rate:.1f} q/s, {errors} error(s))", end="", file=sys.stderr)
+
+        chunks = _chunks(todo, chunk_size)
+        if workers <= 0:
+            _init_worker(pipeline_kwargs, answer_kwargs)
+            for chunk in chunks:
+                write(_answer_chunk(chunk, keep_evidence))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(pipeline_kwargs, answer_kwargs)) as pool:
+                # Bounded window of in-flight chunks keeps memory flat for any file size
+                pending = set()
+                for chunk in chunks:
+                    pending.add(pool.submit(_answer_chunk, chunk, keep_evidence))
+                    if len(pending) >= 2 * workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in finished:
+                            write(fut.result())
+                for fut in wait(pending).done:
+                    write(fut.result())
+    if todo:
+        print(file=sys.stderr)
+    elapsed = time.perf_counter() - t0
+    if out.suffix == ".parquet":
+        write_parquet(spool, out)
+    return {"questions": len(questions), "skipped": len(done), "answered": answered, "errors": errors,
+            "elapsed_s": elapsed, "questions_per_s": answered / elapsed if elapsed > 0 else 0.0, "output": str(out)}
+
+def main():
+    p = argparse.ArgumentParser(description="Answer a file of questions with a process pool into one JSONL/Parquet file.")
+    p.add_argument("--questions", type=Path, required=True, help=".jsonl ({'id', 'query'} per line) or .csv with a query column.")
+    p.add_argument("--out", type=Path, default=None,
+                   help="Output .jsonl or .parquet (default: outputs/batch_<questions stem>.jsonl). Rerun to resume.")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes; 0 runs in this process.")
+    p.add_argument("--chunk-size", type=int, default=16, help="Questions per task; also the checkpoint granularity.")
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--route", type=str, default="auto", choices=list(ROUTES))
+    p.add_argument("--use-llm-router", action="store_true")
+    p.add_argument("--use-llm", action="store_true")
+    p.add_argument("--model", type=str, default="gpt-4o-mini")
+    p.add_argument("--backend-timeout", type=float, default=None)
+    p.add_argument("--no-embed-cache", action="store_true")
+    p.add_argument("--evidence", action="store_true", help="Store each question's evidence pack in its record.")
+    args = p.parse_args()
+    out = args.out or BASE / "outputs" / f"batch_{args.questions.stem}.jsonl"
+    pipeline_kwargs = {"embed_cache_path": None if args.no_embed_cache else EMBED_CACHE,
+                       "backend_timeout": args.backend_timeout, "model": args.model}
+    answer_kwargs = {"k": args.k, "route": args.route, "use_llm_router": args.use_llm_router, "use_llm": args.use_llm}
+    stats = run_batch(read_questions(args.questions), out, workers=args.workers, chunk_size=args.chunk_size,
+                      pipeline_kwargs=pipeline_kwargs, answer_kwargs=answer_kwargs, keep_evidence=args.evidence)
+    print(f"Answered {stats['answered']} question(s) ({stats['skipped']} already done, {stats['errors']} error(s)) "
+          f"in {stats['elapsed_s']:.1f}s, {stats['questions_per_s']:.1f} q/s → {stats['output']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 
 from __future__ import annotations
 import os, json, time, argparse, sys
+from contextlib import nullcontext
 from pathlib import Path
 
 # Ensure repo root on sys.path when executed directly
@@ -8,73 +9,90 @@ BASE = Path(__file__).resolve().parent.parent
 if str(BASE) not in sys.path:
     sys.path.insert(0, str(BASE))
 
-from typing import List
-from retrievers import UnifiedRetriever, StructuredRetriever, UnstructuredRetriever
-from fusion import normalize_retrieval
-from router.route import route_query
+from rag.pipeline import QAPipeline, ROUTES, EMBED_CACHE, PACK_CACHE
+from rag.pack_cache import PackCache
+
+def _print_header(result):
+    print(f"\nRoute: {result['route']} (conf={result['route_confidence']:.2f})  Query: {result['query']}")
+    print(f"Evidence pack: {'cache hit' if result['cache_hit'] else 'computed'}\n")
+
+def _print_trace(trace):
+    stages = ", ".join(f"{c['name']} {c['ms']:.1f} ms" for c in trace.get("children", []))
+    print(f"Stages ({trace['ms']:.1f} ms): {stages}")
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--query", type=str, required=False, default="Which Nolan movie has the highest IMDb rating?")
     p.add_argument("--k", type=int, default=5)
-    p.add_argument("--route", type=str, default="auto", choices=["auto","structured","unstructured","both"], help="Force a route or auto-route.")
+    p.add_argument("--route", type=str, default="auto", choices=list(ROUTES), help="Force a route or auto-route.")
     p.add_argument("--use-llm-router", action="store_true", help="Use LLM backstop for routing (requires OPENAI_API_KEY).")
     p.add_argument("--use-llm", action="store_true", help="Use LLM for answer synthesis (requires OPENAI_API_KEY).")
     p.add_argument("--model", type=str, default="gpt-4o-mini")
+    p.add_argument("--no-embed-cache", action="store_true", help="Do not persist query embeddings across runs.")
+    p.add_argument("--no-pack-cache", action="store_true", help="Always recompute the evidence pack.")
+    p.add_argument("--stream", action="store_true", help="Print the answer as it is generated; records TTFT and tokens/sec.")
+    p.add_argument("--backend-timeout", type=float, default=None,
+                   help="Seconds to wait for each retrieval backend; slow ones are skipped and listed in the pack.")
+    p.add_argument("--no-trace", action="store_true", help="Do not record per-stage spans in the output JSON.")
+    p.add_argument("--profile", choices=["cpu", "memory", "all"], default=None,
+                   help="Capture cProfile (cpu) and/or tracemalloc (memory) around the query; "
+                        "a summary goes in the output JSON, cProfile stats next to it as .prof.")
     args = p.parse_args()
+    trace = not args.no_trace
 
-    csv_paths = [
-        BASE / "data_lake" / "csv" / "movies.csv",
-        BASE / "data_lake" / "csv" / "ratings.csv",
-    ]
-    db_path = BASE / "data_lake" / "db" / "movies.db"
-    docs_index = BASE / "indexes" / "docs"
-
-    # Decide route
-    if args.route == "auto":
-        route, conf, feats = route_query(args.query, use_llm=args.use_llm_router, model=args.model)
-    else:
-        route, conf, feats = (args.route, 1.0, {"forced": True})
-
-    # Retrieve per route
-    if route == "structured":
-        from retrievers import StructuredRetriever
-        retr = StructuredRetriever(csv_paths=csv_paths, db_path=db_path)
-        struct = retr.search(args.query, k_per_modality=args.k)
-        retrieval_dict = {
-            "db": [{"origin":"DB","source_id":h.source_id,"score":float(h.score),"payload":h.payload} for h in struct.get("db",[])],
-            "csv": [{"origin":"CSV","source_id":h.source_id,"score":float(h.score),"payload":h.payload} for h in struct.get("csv",[])],
-            "docs": []
-        }
-    elif route == "unstructured":
-        from retrievers import UnstructuredRetriever
-        retr = UnstructuredRetriever(index_dir=docs_index)
-        docs = retr.search(args.query, k=args.k)
-        retrieval_dict = {"db": [], "csv": [], "docs": [{"origin":"DOC","source_id":h.source_id,"score":float(h.score),"payload":h.payload} for h in docs]}
-    else:  # both
-        retr = UnifiedRetriever(csv_paths=csv_paths, db_path=db_path, docs_index_dir=docs_index)
-        out = retr.search_all(args.query, k_per_modality=args.k)
-        def ser(hits):
-            return [{"origin":h.origin, "source_id":h.source_id, "score":float(h.score), "payload":h.payload} for h in hits]
-        retrieval_dict = {"db": ser(out["db"]), "csv": ser(out["csv"]), "docs": ser(out["docs"])}
-
-    pack = normalize_retrieval(query=args.query, retrieval=retrieval_dict)
-
-    from rag.answer import synthesize_answer
-    answer = synthesize_answer(pack, prefer_llm=args.use_llm, model=args.model)
+    pipeline = QAPipeline(embed_cache_path=None if args.no_embed_cache else EMBED_CACHE,
+                          backend_timeout=args.backend_timeout, model=args.model,
+                          pack_cache=None if args.no_pack_cache else PackCache(disk_path=PACK_CACHE))
+    profiler = None
+    if args.profile:
+        from tracing.profile import Profiler
+        profiler = Profiler(cpu=args.profile in ("cpu", "all"), memory=args.profile in ("memory", "all"))
+    with profiler or nullcontext():
+        if args.stream:
+            result, stream = pipeline.answer_stream(args.query, k=args.k, route=args.route, trace=trace,
+                                                    use_llm_router=args.use_llm_router, use_llm=args.use_llm)
+            _print_header(result)
+            print("Answer:")
+            for chunk in stream:
+                print(chunk, end="", flush=True)
+            print()
+            result["answer"] = stream.result()
+        else:
+            result = pipeline.answer(args.query, k=args.k, route=args.route, trace=trace,
+                                     use_llm_router=args.use_llm_router, use_llm=args.use_llm)
+    answer = result["answer"]
+    timed_out = result["evidence"].get("timed_out", [])
+    cache_stats = result["embed_cache"]
 
     # Save
     outputs = BASE / "outputs"
     outputs.mkdir(exist_ok=True, parents=True)
     ts = int(time.time())
     outpath = outputs / f"answer_{ts}.json"
+    if profiler is not None:
+        result["profile"] = profiler.summary()
+        if profiler.cpu:
+            profiler.dump_stats(outputs / f"profile_{ts}.prof")
     with open(outpath, "w", encoding="utf-8") as f:
-        json.dump({"query": args.query, "route": route, "route_confidence": conf, "answer": answer, "evidence": pack}, f, ensure_ascii=False, indent=2)
+        json.dump(result, f, ensure_ascii=False, indent=2)
 
-    print(f"\nRoute: {route} (conf={conf:.2f})  Query: {args.query}\n")
-    print("Answer:\n" + answer.get("answer","(no answer)"))
+    if not args.stream:
+        _print_header(result)
+        print("Answer:\n" + answer.get("answer","(no answer)"))
+    if timed_out:
+        print(f"\nTimed out (partial results): {', '.join(timed_out)}")
     print(f"\nUsed modalities: {', '.join(answer.get('used_modalities', [])) or '(none)'}")
+    metrics = answer.get("stream")
+    if metrics:
+        rate = f"{metrics['tokens_per_s']:.1f} tokens/s" if metrics["tokens_per_s"] else "n/a"
+        print(f"Streamed from {metrics['source']}: first token after {1000 * (metrics['ttft_s'] or 0):.0f} ms, {rate}")
+    if "trace" in result:
+        _print_trace(result["trace"])
+    if cache_stats:
+        print(f"Query embedding cache: {cache_stats['hits']} hit(s), {cache_stats['disk_hits']} disk hit(s), {cache_stats['misses']} miss(es)")
     print(f"\nSaved → {outpath}")
+    if profiler is not None and profiler.cpu:
+        print(f"cProfile stats → {outputs / f'profile_{ts}.prof'}")
 
 if __name__ == "__main__":
     main()
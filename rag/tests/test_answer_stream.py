@@ -0,0 +1,26 @@
+from rag.answer import AnswerStream, CitationParser, _fallback_compose
+
+PACK = {"query": "Inception", "retrieval": {
+    "db": [{"row": {"title": "Inception", "release_year": 2010, "box_office_usd": 836800000}}],
+    "csv": [{"row": {"title": "Inception", "imdb": 8.8, "metacritic": 74}}],
+    "docs": [{"chunk": "A heist film set inside dreams.", "metadata": {"doc": "inception.md"}}]}}
+
+def test_citation_parser_handles_tags_split_across_chunks():
+    parser = CitationParser()
+    text = "- Inception grossed $836M [DB][C", "SV].\n- Critics call it a heist film [D", "OC]."
+    new = [c for chunk in text for c in parser.feed(chunk)]
+    parser.close()
+    assert [c["span"] for c in new] == ["Inception grossed $836M", "Critics call it a heist film"]
+    assert parser.citations[0]["source_tags"] == ["DB", "CSV"]
+    assert parser.used == {"DB", "CSV", "DOC"}
+
+def test_fallback_streams_through_same_interface():
+    stream = AnswerStream(PACK, prefer_llm=False)
+    chunks = list(stream)
+    result = stream.result()
+    assert len(chunks) > 5 and "".join(chunks).strip() == result["answer"]
+    assert result["used_modalities"] == ["CSV", "DB", "DOC"]
+    assert result["stream"]["source"] == "fallback" and result["stream"]["tokens"] == len(chunks)
+    assert result["stream"]["ttft_s"] >= 0
+    composed = _fallback_compose(PACK)
+    assert composed["answer"] == result["answer"] and composed["citations"] == result["citations"]
@@ -0,0 +1,28 @@
+import asyncio
+import threading
+import time
+
+from rag.pipeline import QAPipeline
+
+def test_answer_async_bounds_retrieval_concurrency():
+    pipeline = QAPipeline(embed_cache_path=None, stage_limits={"retrieve": 3})
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def fake_pack(query, route, k=5):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return {"query": query, "retrieval": {"db": [], "csv": [], "docs": []}}, False
+
+    pipeline.evidence_pack = fake_pack
+
+    async def run():
+        return await asyncio.gather(*(pipeline.answer_async(f"q{i}", route="structured") for i in range(30)))
+
+    results = asyncio.run(run())
+    assert [r["query"] for r in results] == [f"q{i}" for i in range(30)]
+    assert results[0]["answer"]["answer"].startswith("Insufficient evidence")
+    assert peak[0] == 3
@@ -0,0 +1,28 @@
+
+import os
+from rag.pack_cache import PackCache, lake_version, pack_key
+
+def test_lake_version_tracks_source_changes(tmp_path):
+    csv = tmp_path / "a.csv"
+    csv.write_text("title\nInception\n")
+    db = tmp_path / "movies.db"
+    db.write_bytes(b"")
+    v1 = lake_version([csv], db, tmp_path / "idx")
+    assert lake_version([csv], db, tmp_path / "idx") == v1
+    csv.write_text("title\nInception\nTenet\n")
+    assert lake_version([csv], db, tmp_path / "idx") != v1
+
+def test_pack_cache_tiers_and_keys(tmp_path):
+    path = tmp_path / "packs.sqlite"
+    key = pack_key("Tenet  box office", "structured", 5, "v1")
+    assert key == pack_key(" Tenet box office", "structured", 5, "v1")
+    assert key != pack_key("Tenet box office", "both", 5, "v1")
+    cache = PackCache(disk_path=path)
+    assert cache.get(key) is None
+    cache.put(key, "v1", {"query": "Tenet box office"})
+    assert cache.get(key) == {"query": "Tenet box office"}
+    fresh = PackCache(disk_path=path)
+    assert fresh.get(key) == {"query": "Tenet box office"}
+    assert fresh.stats()["disk_hits"] == 1
+    fresh.put(pack_key("q", "both", 5, "v2"), "v2", {"query": "q"})
+    assert PackCache(disk_path=path).get(key) is None  # stale version purged
@@ -0,0 +1,33 @@
+import json
+from rag.run_batch import completed_ids, read_questions, run_batch
+
+QUESTIONS = ["Inception box office", "Tenet release year", "Memento runtime", "How many Nolan movies are there?"]
+ANSWER = {"route": "structured", "k": 3}
+
+def test_batch_resumes_from_checkpoint(tmp_path):
+    qfile = tmp_path / "questions.jsonl"
+    qfile.write_text("".join(json.dumps({"query": q}) + "\n" for q in QUESTIONS))
+    questions = read_questions(qfile)
+    assert [q["id"] for q in questions] == ["1", "2", "3", "4"]
+    out = tmp_path / "answers.jsonl"
+    # An interrupted run: one finished record and a torn one
+    out.write_text(json.dumps({"id": "1", "query": QUESTIONS[0], "error": None}) + "\n" + '{"id": "2", "que')
+    stats = run_batch(questions, out, workers=0, chunk_size=2, pipeline_kwargs={"embed_cache_path": None},
+                      answer_kwargs=ANSWER)
+    assert (stats["skipped"], stats["answered"], stats["errors"]) == (1, 3, 0)
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["id"] for r in records] == ["1", "2", "3", "4"]
+    assert "[DB]" in records[1]["answer"] and records[3]["route"] == "structured"
+    assert completed_ids(out) == {"1", "2", "3", "4"}
+
+def test_batch_process_pool_parquet(tmp_path):
+    import pyarrow.parquet as pq
+    qfile = tmp_path / "questions.csv"
+    qfile.write_text("id,question\n" + "".join(f"q{i},{q}\n" for i, q in enumerate(QUESTIONS)))
+    out = tmp_path / "answers.parquet"
+    stats = run_batch(read_questions(qfile), out, workers=2, chunk_size=1, pipeline_kwargs={"embed_cache_path": None},
+                      answer_kwargs=ANSWER, keep_evidence=True)
+    assert stats["answered"] == 4 and not (tmp_path / "answers.parquet.partial.jsonl").exists()
+    table = pq.read_table(out)
+    assert sorted(table.column("id").to_pylist()) == ["q0", "q1", "q2", "q3"]
+    assert all(json.loads(e)["retrieval"] for e in table.column("evidence").to_pylist())
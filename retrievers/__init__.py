@@ -1,5 +1,26 @@
 
-from .structured import StructuredRetriever
-from .unstructured import UnstructuredRetriever
-from .unified import UnifiedRetriever
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Retrievers are imported on first access: `from retrievers import StructuredRetriever`
+# never loads the dense stack, and the dense stack itself defers faiss and
+# sentence-transformers until a doc search runs.
+_LAZY = {
+    "StructuredRetriever": ".structured",
+    "UnstructuredRetriever": ".unstructured",
+    "UnifiedRetriever": ".unified",
+}
+
+if TYPE_CHECKING:
+    from .structured import StructuredRetriever
+    from .unstructured import UnstructuredRetriever
+    from .unified import UnifiedRetriever
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 __all__ = ["StructuredRetriever", "UnstructuredRetriever", "UnifiedRetriever"]
@@ -0,0 +1,100 @@
+
+from __future__ import annotations
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+import numpy as np
+
+@lru_cache(maxsize=None)
+def load_faiss():
+    """Import faiss on first use (it is optional and slow to import); None if unavailable."""
+    try:
+        import faiss  # type: ignore
+        return faiss
+    except Exception:
+        return None
+
+INDEX_TYPES = ("flat", "ivf-flat", "ivf-pq", "hnsw")
+
+DEFAULT_PARAMS: Dict[str, Dict[str, Any]] = {
+    "flat": {},
+    "ivf-flat": {"nlist": 1024, "nprobe": 16},
+    "ivf-pq": {"nlist": 1024, "pq_m": 16, "pq_nbits": 8, "nprobe": 16},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+}
+
+def index_spec(index_type: str = "flat", **overrides: Any) -> Dict[str, Any]:
+    """Build spec stored next to the index as faiss.json; None overrides are ignored."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    params = dict(DEFAULT_PARAMS[index_type])
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    return {"type": index_type, "metric": "ip", "params": params}
+
+def _fit_params(spec: Dict[str, Any], n: int, dim: int) -> Dict[str, Any]:
+    """Clamp cluster/codebook sizes so small corpora can still be trained."""
+    p = dict(spec["params"])
+    if "nlist" in p:
+        p["nlist"] = max(1, min(p["nlist"], n // 39 or 1))
+        p["nprobe"] = min(p.get("nprobe", 1), p["nlist"])
+    if "pq_m" in p:
+        m = min(p["pq_m"], dim)
+        while dim % m:
+            m -= 1
+        p["pq_m"] = m
+        p["pq_nbits"] = max(1, min(p["pq_nbits"], int(math.log2(max(n, 2)))))
+    return p
+
+def build_index(X: np.ndarray, spec: Dict[str, Any]):
+    """
+    Build and train an inner-product FAISS index over normalized vectors X.
+    Returns (index, effective_spec) where effective_spec records the clamped params.
+    """
+    faiss = load_faiss()
+    if faiss is None:
+        raise RuntimeError("faiss not installed. Please `pip install faiss-cpu`.")
+    n, dim = X.shape
+    kind = spec["type"]
+    p = _fit_params(spec, n, dim)
+    ip = faiss.METRIC_INNER_PRODUCT
+    if kind == "flat":
+        index = faiss.IndexFlatIP(dim)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, p["hnsw_m"], ip)
+        index.hnsw.efConstruction = p["ef_construction"]
+    else:
+        quantizer = faiss.IndexFlatIP(dim)
+        if kind == "ivf-flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, p["nlist"], ip)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, p["nlist"], p["pq_m"], p["pq_nbits"], ip)
+        index.train(X)
+    index.add(X)
+    apply_search_params(index, nprobe=p.get("nprobe"), ef_search=p.get("ef_search"))
+    return index, {"type": kind, "metric": "ip", "params": p}
+
+def apply_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Set recall/latency knobs on whatever index type this is; irrelevant knobs are ignored."""
+    if nprobe is not None:
+        try:
+            load_faiss().extract_index_ivf(index).nprobe = int(nprobe)
+        except Exception:
+            pass
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(ef_search)
+
+def similarity(index, D: np.ndarray) -> np.ndarray:
+    """
+    Convert FAISS distances to cosine similarity for normalized vectors.
+    Inner-product indexes already return similarity; L2 indexes return squared
+    distance, and for unit vectors ||a-b||^2 = 2 - 2cos.
+    """
+    if index.metric_type == load_faiss().METRIC_INNER_PRODUCT:
+        return D
+    return 1.0 - D / 2.0
+
+def read_spec(path: Path) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else None
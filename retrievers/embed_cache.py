@@ -0,0 +1,122 @@
+
+from __future__ import annotations
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+def normalize_query(text: str) -> str:
+    """Cache key text: NFC, trimmed, internal whitespace collapsed. Case is kept (models may be cased)."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+class QueryEmbeddingCache:
+    """
+    Bounded cache of query embeddings keyed by (model name, normalized query).
+    Tier 1 is an in-process LRU; tier 2 (optional) is a SQLite file shared across
+    runs and processes, pruned to `disk_capacity` rows by last access.
+    """
+    def __init__(self, model_name: str, capacity: int = 1024, disk_path: Optional[Path] = None,
+                 disk_capacity: int = 100_000) -> None:
+        self.model_name = model_name
+        self.capacity = capacity
+        self.disk_path = Path(disk_path) if disk_path is not None else None
+        self.disk_capacity = disk_capacity
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._con: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._unpruned = 0
+        if self.disk_path is not None:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._con = sqlite3.connect(self.disk_path, check_same_thread=False, timeout=5.0)
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("""CREATE TABLE IF NOT EXISTS query_embeddings (
+                model TEXT NOT NULL, query TEXT NOT NULL, vec BLOB NOT NULL, accessed REAL NOT NULL,
+                PRIMARY KEY (model, query))""")
+            self._con.execute("CREATE INDEX IF NOT EXISTS query_embeddings_accessed ON query_embeddings (accessed)")
+            self._con.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "size": len(self._lru)}
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._con is None or not keys:
+            return {}
+        rows = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows += self._con.execute(f"SELECT query, vec FROM query_embeddings WHERE model = ? AND query IN ({marks})",
+                                      (self.model_name, *chunk)).fetchall()
+        if rows:
+            now = time.time()
+            self._con.executemany("UPDATE query_embeddings SET accessed = ? WHERE model = ? AND query = ?",
+                                  [(now, self.model_name, q) for q, _ in rows])
+            self._con.commit()
+        return {q: np.frombuffer(blob, dtype=np.float32) for q, blob in rows}
+
+    def _disk_put(self, items: Dict[str, np.ndarray]) -> None:
+        if self._con is None or not items:
+            return
+        now = time.time()
+        self._con.executemany("INSERT OR REPLACE INTO query_embeddings (model, query, vec, accessed) VALUES (?, ?, ?, ?)",
+                              [(self.model_name, q, v.astype(np.float32).tobytes(), now) for q, v in items.items()])
+        self._unpruned += len(items)
+        if self._unpruned >= 256:
+            # Amortized size bound: drop least recently accessed rows beyond capacity
+            self._con.execute("""DELETE FROM query_embeddings WHERE rowid IN (
+                SELECT rowid FROM query_embeddings ORDER BY accessed DESC LIMIT -1 OFFSET ?)""", (self.disk_capacity,))
+            self._unpruned = 0
+        self._con.commit()
+
+    def encode(self, texts: Sequence[str], encoder: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Return embeddings for `texts`, calling `encoder` once for the cache misses only.
+        """
+        keys = [normalize_query(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            from_disk = self._disk_get(missing)
+            for key, vec in from_disk.items():
+                self._remember(key, vec)
+            todo = [k for k in missing if k not in from_disk]
+            for key in keys:
+                if key in found:
+                    self.hits += 1
+                elif key in from_disk:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+            found.update(from_disk)
+        if todo:
+            vecs = encoder(todo)
+            fresh = {k: vecs[i] for i, k in enumerate(todo)}
+            with self._lock:
+                for key, vec in fresh.items():
+                    self._remember(key, vec)
+                self._disk_put(fresh)
+            found.update(fresh)
+        return np.stack([found[k] for k in keys]).astype(np.float32, copy=False)
+
+    def close(self) -> None:
+        if self._con is not None:
+            self._con.close()
+            self._con = None
@@ -0,0 +1,53 @@
+
+from __future__ import annotations
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from tracing import active, propagate, span
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+MAX_WORKERS = 32
+
+def executor() -> ThreadPoolExecutor:
+    """Process-wide pool shared by all retrievers, created on first use."""
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="retrieval")
+    return _EXECUTOR
+
+def fan_out(tasks: Dict[str, Callable[[], T]], timeout: Optional[float] = None) -> Tuple[Dict[str, T], List[str]]:
+    """
+    Run named backend calls concurrently and wait at most `timeout` seconds for them.
+    Returns (results of the backends that finished, names of those that timed out).
+    A timed-out call keeps running in the background; its result is discarded.
+    Exceptions from finished backends propagate as they would in a serial call.
+    """
+    if active():
+        tasks = {name: _traced(name, fn) for name, fn in tasks.items()}
+    if len(tasks) == 1 and timeout is None:
+        name, fn = next(iter(tasks.items()))
+        return {name: fn()}, []
+    with span("fan_out", backends=len(tasks), timeout=timeout) as s:
+        futures: Dict[str, Future] = {name: executor().submit(propagate(fn)) for name, fn in tasks.items()}
+        wait(futures.values(), timeout=timeout)
+    results: Dict[str, T] = {}
+    timed_out: List[str] = []
+    for name, fut in futures.items():
+        if fut.done():
+            results[name] = fut.result()
+        else:
+            fut.cancel()
+            timed_out.append(name)
+    s.set(timed_out=timed_out)
+    return results, timed_out
+
+def _traced(name: str, fn: Callable[[], T]) -> Callable[[], T]:
+    def run() -> T:
+        with span(f"backend:{name}"):
+            return fn()
+    return run
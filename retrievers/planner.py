@@ -0,0 +1,246 @@
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+from loaders import Evidence
+from tracing import span
+
+if TYPE_CHECKING:
+    from loaders import CSVSource, DBSource
+
+# Phrase → column, longest phrases first. Superlatives that name their column ("longest",
+# "newest") are in SUPERLATIVE_METRICS; "best"/"worst" only default to IMDb when no column is named.
+METRIC_PHRASES = (
+    ("rotten tomatoes", "rt_tomatoes"), ("box office", "box_office_usd"), ("running time", "runtime_min"),
+    ("release year", "release_year"), ("metacritic", "metacritic"), ("tomatometer", "rt_tomatoes"),
+    ("tomatoes", "rt_tomatoes"), ("grossing", "box_office_usd"), ("grossed", "box_office_usd"),
+    ("revenue", "box_office_usd"), ("runtime", "runtime_min"), ("minutes", "runtime_min"), ("gross", "box_office_usd"),
+    ("earned", "box_office_usd"), ("imdb", "imdb"), ("rating", "imdb"), ("rated", "imdb"), ("score", "imdb"),
+)
+SUPERLATIVE_METRICS = {"longest": "runtime_min", "shortest": "runtime_min", "newest": "release_year",
+                       "latest": "release_year", "most recent": "release_year", "oldest": "release_year",
+                       "earliest": "release_year"}
+DEFAULT_METRIC = "imdb"
+DESC_CUES = ("highest", "most", "max", "maximum", "best", "top", "largest", "biggest", "longest", "latest", "newest",
+             "most recent")
+ASC_CUES = ("lowest", "least", "minimum", "worst", "smallest", "shortest", "earliest", "oldest", "fewest", "bottom")
+AGG_CUES = (("average", "avg"), ("mean", "avg"), ("avg", "avg"), ("total", "sum"), ("combined", "sum"), ("sum", "sum"))
+COUNT_RE = re.compile(r"\b(?:how many|number of|count(?: of)?)\s+(?:[\w-]+\s+){0,3}?(?:movies|films|titles)\b")
+THRESHOLD_RE = re.compile(r"\b(above|over|more than|greater than|at least|below|under|less than|at most)\s+"
+                          r"\$?(\d[\d,]*(?:\.\d+)?)\s*(million|billion|m|b)?\b")
+THRESHOLD_OPS = {"above": ">", "over": ">", "more than": ">", "greater than": ">", "at least": ">=",
+                 "below": "<", "under": "<", "less than": "<", "at most": "<="}
+YEAR_RANGE_RE = re.compile(r"\b(?:between|from)\s+((?:19|20)\d\d)\s+(?:and|to)\s+((?:19|20)\d\d)\b")
+YEAR_RE = re.compile(r"\b(before|after|since|in)\s+((?:19|20)\d\d)\b")
+DECADE_RE = re.compile(r"\b((?:19|20)\d)0s\b")
+YEAR_OPS = {"before": "<", "after": ">", "since": ">=", "in": "="}
+TOP_N_RE = re.compile(r"\b(?:top|bottom)\s+(\d{1,3})\b|\b(\d{1,3})\s+(?:highest|lowest|best|worst|longest|shortest|most|least)\b")
+
+@dataclass
+class Plan:
+    """A structured question as one aggregate or ordering over a filtered table."""
+    op: str                                # "top" | "bottom" | "avg" | "sum" | "count"
+    metric: Optional[str] = None           # column ordered/aggregated (None for plain counts)
+    filters: List[Tuple[str, str, Any]] = field(default_factory=list)  # (column, op, value); op "contains" or <,<=,=,>=,>
+    limit: Optional[int] = None            # explicit "top N"; otherwise k
+
+    @property
+    def columns(self) -> List[str]:
+        cols = [self.metric] if self.metric else []
+        return cols + [c for c, _, _ in self.filters if c not in cols]
+
+    def describe(self) -> str:
+        what = {"top": f"highest {self.metric}", "bottom": f"lowest {self.metric}", "avg": f"average {self.metric}",
+                "sum": f"total {self.metric}", "count": "count of movies"}[self.op]
+        where = " and ".join(f"{c} contains '{v}'" if op == "contains" else f"{c} {op} {v}" for c, op, v in self.filters)
+        return what + (f" where {where}" if where else "")
+
+def _find(q: str, phrase: str, plural: bool = False) -> Optional[int]:
+    m = re.search(rf"\b{re.escape(phrase)}{'s?' if plural else ''}\b", q)
+    return m.start() if m else None
+
+def _has(q: str, phrase: str, plural: bool = False) -> bool:
+    return _find(q, phrase, plural) is not None
+
+def _nearest(mentions: List[Tuple[int, str]], pos: int, before: bool = False) -> Optional[str]:
+    """Column mentioned closest to `pos` (with `before`, preferring mentions that precede it)."""
+    if before and any(p <= pos for p, _ in mentions):
+        mentions = [(p, c) for p, c in mentions if p <= pos]
+    return min(mentions, key=lambda pc: abs(pc[0] - pos))[1] if mentions else None
+
+def _number(text: str, scale: Optional[str]) -> float:
+    value = float(text.replace(",", ""))
+    return value * {"million": 1e6, "m": 1e6, "billion": 1e9, "b": 1e9}.get(scale or "", 1)
+
+def parse_plan(query: str, vocab: Callable[[str], Sequence[str]]) -> Optional[Plan]:
+    """
+    Plan for an aggregate/ordering question, or None when the query has no such cue.
+    `vocab(column)` returns the distinct values used to recognise director/genre filters.
+    """
+    q = (query or "").lower()
+    # Column mentions by position; overlapping phrases ("box office" / "office") keep the longer one
+    mentions: List[Tuple[int, str]] = []
+    taken: List[Tuple[int, int]] = []
+    for phrase, col in METRIC_PHRASES:
+        for m in re.finditer(rf"\b{re.escape(phrase)}\b", q):
+            if not any(s < m.end() and m.start() < e for s, e in taken):
+                mentions.append((m.start(), col))
+                taken.append(m.span())
+    op = cue = None
+    if COUNT_RE.search(q):
+        op = "count"
+    else:
+        for cues in (AGG_CUES, [(c, "bottom") for c in ASC_CUES], [(c, "top") for c in DESC_CUES]):
+            # Earliest cue wins; at the same position the longer one ("most recent" over "most")
+            found = sorted((pos, -len(c), c, o) for c, o in cues for pos in [_find(q, c)] if pos is not None)
+            if found:
+                pos, _, cue, op = found[0]
+                break
+    if op is None:
+        return None
+    metric = None
+    if op != "count":
+        metric = SUPERLATIVE_METRICS.get(cue) or _nearest(mentions, pos)
+        if metric is None and cue in ("best", "worst", "top", "bottom"):
+            metric = DEFAULT_METRIC
+        if metric is None:
+            return None
+
+    filters: List[Tuple[str, str, Any]] = []
+    for name in vocab("director"):
+        full = name.lower()
+        last = full.split()[-1] if full.split() else ""
+        if _has(q, full):
+            filters.append(("director", "contains", full))
+        elif len(last) >= 3 and _has(q, last) and ("director", "contains", last) not in filters:
+            filters.append(("director", "contains", last))
+    for genre in vocab("genres"):
+        if _has(q, genre.lower(), plural=True):
+            filters.append(("genres", "contains", genre.lower()))
+    m = YEAR_RANGE_RE.search(q)
+    if m:
+        filters += [("release_year", ">=", int(m.group(1))), ("release_year", "<=", int(m.group(2)))]
+    else:
+        for word, year in YEAR_RE.findall(q):
+            filters.append(("release_year", YEAR_OPS[word], int(year)))
+        for decade in DECADE_RE.findall(q):
+            filters += [("release_year", ">=", int(decade) * 10), ("release_year", "<=", int(decade) * 10 + 9)]
+    for m in THRESHOLD_RE.finditer(q):
+        col = _nearest([mc for mc in mentions if mc[1] != "release_year"], m.start(), before=True)
+        if col is not None:
+            filters.append((col, THRESHOLD_OPS[m.group(1)], _number(m.group(2), m.group(3))))
+    m = TOP_N_RE.search(q)
+    limit = int(m.group(1) or m.group(2)) if m else None
+    return Plan(op=op, metric=metric, filters=filters, limit=limit)
+
+class QueryPlanner:
+    """
+    Runs Plans where the data lives: as SQL on the DB table when it has every column the
+    plan needs, otherwise as Arrow compute over the CSV sources (joined on the key column).
+    Only the few rows or the single value computed come back as evidence.
+    """
+    def __init__(self, db_source: "DBSource", csv_sources: Sequence["CSVSource"], key_column: str = "title") -> None:
+        self.db_source = db_source
+        self.csv_sources = list(csv_sources)
+        self.key_column = key_column
+        self._vocab: Dict[str, List[str]] = {}
+
+    def vocab(self, column: str) -> List[str]:
+        """Distinct values of a categorical column (genres split on commas); cached."""
+        if column not in self._vocab:
+            if column in self.db_source.columns():
+                raw = [r["v"] for r in self.db_source.query(
+                    f"SELECT DISTINCT {column} AS v FROM {self.db_source.table} WHERE {column} IS NOT NULL")]
+            else:
+                src = next((s for s in self.csv_sources if column in s.columns), None)
+                raw = [] if src is None else src.arrow([column]).column(0).unique().to_pylist()
+            values = {p.strip() for v in raw if isinstance(v, str) for p in v.split(",")}
+            self._vocab[column] = sorted(v for v in values if v)
+        return self._vocab[column]
+
+    def plan(self, query: str) -> Optional[Plan]:
+        plan = parse_plan(query, self.vocab)
+        if plan is None:
+            return None
+        available = set(self.db_source.columns()).union(*(s.columns for s in self.csv_sources))
+        return plan if set(plan.columns) <= available else None
+
+    def execute(self, plan: Plan, k: int = 5) -> List[Evidence]:
+        engine = "sql" if set(plan.columns) <= set(self.db_source.columns()) else "arrow"
+        with span("plan", engine=engine, op=plan.op, metric=plan.metric, filters=len(plan.filters)) as s:
+            hits = self._sql(plan, k) if engine == "sql" else self._arrow(plan, k)
+            s.set(hits=len(hits))
+        return hits
+
+    def _output_columns(self, plan: Plan, available: Sequence[str]) -> List[str]:
+        cols = [self.key_column, "release_year"] + plan.columns
+        return [c for i, c in enumerate(cols) if c in available and c not in cols[:i]]
+
+    def _evidence(self, origin: str, table: str, plan: Plan, rows: List[Dict[str, Any]]) -> List[Evidence]:
+        desc = plan.describe()
+        hits = []
+        for i, row in enumerate(rows):
+            row["computed"] = desc
+            name = row.get(self.key_column) if plan.op in ("top", "bottom") else plan.op
+            hits.append(Evidence(origin=origin, source_id=f"{origin.lower()}:{table}:{name}", score=1.0 - i * 1e-3,
+                                 payload=row))
+        return hits
+
+    def _sql(self, plan: Plan, k: int) -> List[Evidence]:
+        table = self.db_source.table
+        where, params = [], []
+        for col, op, value in plan.filters:
+            if op == "contains":
+                where.append(f"LOWER({col}) LIKE ?")
+                params.append(f"%{value}%")
+            else:
+                where.append(f"{col} {op} ?")
+                params.append(value)
+        m = plan.metric
+        if plan.op in ("top", "bottom"):
+            where.append(f"{m} IS NOT NULL")
+            cols = ", ".join(self._output_columns(plan, self.db_source.columns()))
+            order = "DESC" if plan.op == "top" else "ASC"
+            sql = f"SELECT {cols} FROM {table} WHERE {' AND '.join(where)} ORDER BY {m} {order} LIMIT ?"
+            params.append(plan.limit or k)
+        else:
+            agg = {"avg": f"AVG({m})", "sum": f"SUM({m})", "count": "COUNT(*)"}[plan.op]
+            counted = f"COUNT({m})" if m else "COUNT(*)"
+            sql = f"SELECT {agg} AS value, {counted} AS rows FROM {table}" + (f" WHERE {' AND '.join(where)}" if where else "")
+        rows = self.db_source.query(sql, params)
+        if plan.op not in ("top", "bottom"):
+            rows = [{"metric": m or "movies", "aggregate": plan.op, **r} for r in rows]
+        return self._evidence("DB", table, plan, rows)
+
+    def _arrow(self, plan: Plan, k: int) -> List[Evidence]:
+        import pyarrow.compute as pc
+        needed = self._output_columns(plan, [c for s in self.csv_sources for c in s.columns])
+        table, files = None, []
+        for src in self.csv_sources:
+            cols = [c for c in needed if c in src.columns and (table is None or c not in table.column_names)]
+            if not cols or (table is not None and self.key_column not in src.columns):
+                continue
+            part = src.arrow(cols if table is None else [self.key_column, *cols])
+            table = part if table is None else table.join(part, self.key_column, join_type="inner")
+            files.append(src.file_path.name)
+        mask = None
+        for col, op, value in plan.filters:
+            c = table.column(col)
+            cond = {"contains": lambda: pc.match_substring(pc.utf8_lower(c), value), ">": lambda: pc.greater(c, value),
+                    ">=": lambda: pc.greater_equal(c, value), "<": lambda: pc.less(c, value),
+                    "<=": lambda: pc.less_equal(c, value), "=": lambda: pc.equal(c, value)}[op]()
+            mask = cond if mask is None else pc.and_kleene(mask, cond)
+        if plan.metric:
+            valid = pc.is_valid(table.column(plan.metric))
+            mask = valid if mask is None else pc.and_kleene(mask, valid)
+        if mask is not None:
+            table = table.filter(mask)
+        m = plan.metric
+        if plan.op in ("top", "bottom"):
+            order = "descending" if plan.op == "top" else "ascending"
+            rows = table.sort_by([(m, order)]).slice(0, plan.limit or k).select(needed).to_pylist()
+        else:
+            value = table.num_rows if plan.op == "count" else getattr(pc, {"avg": "mean", "sum": "sum"}[plan.op])(table.column(m)).as_py()
+            rows = [{"metric": m or "movies", "aggregate": plan.op, "value": value, "rows": table.num_rows}]
+        return self._evidence("CSV", "+".join(files), plan, rows)
@@ -0,0 +1,68 @@
+
+from __future__ import annotations
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from loaders.common import top_k_indices
+
+class EmbeddingStore:
+    """
+    Read-only view over an index directory written by etl/build_vectors.py:
+      - embeddings.npy          float32, L2-normalized rows; opened with mmap_mode="r"
+      - metadata.jsonl          one JSON object per row
+      - metadata.offsets.npy    N+1 byte offsets delimiting the metadata lines (optional)
+      - manifest.json           build info; "normalized": true marks the mmap-safe format
+    Opening is O(1): the matrix stays in the page cache shared by all processes on the
+    host, and metadata lines are read by offset only for the rows that are returned.
+    Stores without the manifest flag (older builds) are loaded into a private,
+    renormalized float32 copy as before.
+    """
+    def __init__(self, index_dir: Path) -> None:
+        self.index_dir = Path(index_dir)
+        self.emb_path = self.index_dir / "embeddings.npy"
+        self.meta_path = self.index_dir / "metadata.jsonl"
+        self.offsets_path = self.index_dir / "metadata.offsets.npy"
+        self.manifest_path = self.index_dir / "manifest.json"
+        if not self.emb_path.exists() or not self.meta_path.exists():
+            raise FileNotFoundError(f"Missing embeddings or metadata in {self.index_dir}. Run etl/build_vectors.py.")
+        self.manifest: Dict[str, Any] = json.loads(self.manifest_path.read_text()) if self.manifest_path.exists() else {}
+        emb = np.load(self.emb_path, mmap_mode="r")
+        self.mmapped = bool(self.manifest.get("normalized")) and emb.dtype == np.float32
+        if not self.mmapped:
+            emb = np.array(emb, dtype="float32")
+            emb /= (np.linalg.norm(emb, axis=1, keepdims=True) + 1e-12)
+        self.emb = emb
+        self.dim = self.emb.shape[1]
+        self._offsets = np.load(self.offsets_path, mmap_mode="r") if self.offsets_path.exists() else None
+        self._meta: Optional[List[Dict[str, Any]]] = None
+        self._meta_fd: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self.emb.shape[0]
+
+    def meta(self, i: int) -> Dict[str, Any]:
+        if self._offsets is not None:
+            if self._meta_fd is None:
+                self._meta_fd = os.open(self.meta_path, os.O_RDONLY)
+            start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+            # pread does not move a shared file position, so concurrent lookups are safe
+            return json.loads(os.pread(self._meta_fd, end - start, start))
+        if self._meta is None:
+            with open(self.meta_path, "r") as f:
+                self._meta = [json.loads(line) for line in f]
+        return self._meta[i]
+
+    def top_k(self, q: np.ndarray, k: int) -> Tuple[List[int], List[float]]:
+        """Exact inner-product top-k for one normalized query vector."""
+        return self.top_k_many(q[None, :], k)[0]
+
+    def top_k_many(self, Q: np.ndarray, k: int) -> List[Tuple[List[int], List[float]]]:
+        """Exact inner-product top-k for a batch of query vectors, via one matrix-matrix product."""
+        S = Q @ self.emb.T
+        out = []
+        for sims in S:
+            idxs = top_k_indices(sims, k)
+            out.append((idxs.tolist(), sims[idxs].tolist()))
+        return out
@@ -1,28 +1,73 @@
 
 from __future__ import annotations
+from functools import partial
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 from loaders import CSVSource, DBSource, Evidence
+from .fanout import fan_out
+from .planner import QueryPlanner
 
 class StructuredRetriever:
     """
     Wraps CSV + DB structured sources. Returns top-k hits per structured modality.
+    Each CSV file and the DB are separate backends, queried concurrently.
+    CSVs with a current columnar copy in `columnar_dir` are read from it (see CSVSource).
+    Aggregate/ordering questions ("highest IMDb", "how many ... after 2010") are answered
+    by the QueryPlanner instead of title matching: one "plan" backend computes the
+    result in SQL or Arrow and returns only those rows.
     """
-    def __init__(self, csv_paths: List[Path], db_path: Path, table: str = "movies") -> None:
-        self.csv_sources = [CSVSource(p) for p in csv_paths]
+    def __init__(self, csv_paths: List[Path], db_path: Path, table: str = "movies",
+                 columnar_dir: Optional[Path] = None, plan_queries: bool = True) -> None:
+        self.csv_sources = [CSVSource(p, columnar_dir=columnar_dir) for p in csv_paths]
         self.db_source = DBSource(db_path, table=table)
+        self.planner: Optional[QueryPlanner] = QueryPlanner(self.db_source, self.csv_sources) if plan_queries else None
+        names = [f"csv:{src.file_path.name}" for src in self.csv_sources]
+        self.csv_backends = [n if names.count(n) == 1 else f"{n}#{i}" for i, n in enumerate(names)]
 
-    def search(self, query: str, k_per_modality: int = 5) -> Dict[str, List[Evidence]]:
-        results: Dict[str, List[Evidence]] = {"csv": [], "db": []}
-        # CSV: gather top-k from each CSV file
-        csv_hits: List[Evidence] = []
-        for src in self.csv_sources:
-            csv_hits.extend(src.search(query, k=k_per_modality))
+    @staticmethod
+    def _merge_csv(per_source: List[List[Evidence]], k: int) -> List[Evidence]:
         # Sort by score and keep top-k overall
-        csv_hits = sorted(csv_hits, key=lambda e: e.score, reverse=True)[:k_per_modality]
-        results["csv"] = csv_hits
+        csv_hits = [h for hits in per_source for h in hits]
+        return sorted(csv_hits, key=lambda e: e.score, reverse=True)[:k]
 
-        # DB
-        db_hits = self.db_source.search(query, k=k_per_modality)
-        results["db"] = db_hits
-        return results
+    def backend_tasks(self, query: str, k_per_modality: int = 5) -> Dict[str, Callable[[], List[Evidence]]]:
+        """One zero-arg call per backend ('csv:<file>' per CSV, 'db'; or 'plan' alone), for fan-out."""
+        plan = self.planner.plan(query) if self.planner is not None else None
+        if plan is not None:
+            return {"plan": partial(self.planner.execute, plan, k_per_modality)}
+        tasks: Dict[str, Callable[[], List[Evidence]]] = {
+            name: partial(src.search, query, k=k_per_modality) for name, src in zip(self.csv_backends, self.csv_sources)}
+        tasks["db"] = partial(self.db_source.search, query, k=k_per_modality)
+        return tasks
+
+    def collect(self, finished: Dict[str, Any], k_per_modality: int = 5) -> Dict[str, List[Evidence]]:
+        """Merge per-backend hits (missing backends contribute nothing) into {"csv", "db"}."""
+        if "plan" in finished:
+            computed = finished["plan"]
+            return {"csv": [h for h in computed if h.origin == "CSV"], "db": [h for h in computed if h.origin == "DB"]}
+        csv_hits = [finished[name] for name in self.csv_backends if name in finished]
+        return {"csv": self._merge_csv(csv_hits, k_per_modality), "db": finished.get("db", [])}
+
+    def search_with_status(self, query: str, k_per_modality: int = 5,
+                           timeout: Optional[float] = None) -> Tuple[Dict[str, List[Evidence]], List[str]]:
+        """Fan out across CSV files and the DB; returns (partial results, timed-out backend names)."""
+        finished, timed_out = fan_out(self.backend_tasks(query, k_per_modality), timeout=timeout)
+        return self.collect(finished, k_per_modality), timed_out
+
+    def search(self, query: str, k_per_modality: int = 5, timeout: Optional[float] = None) -> Dict[str, List[Evidence]]:
+        return self.search_with_status(query, k_per_modality=k_per_modality, timeout=timeout)[0]
+
+    def search_many(self, queries: Sequence[str], k_per_modality: int = 5) -> List[Dict[str, List[Evidence]]]:
+        """Same results as calling search() per query; each CSV scores all queries in one batch."""
+        plans = [self.planner.plan(q) if self.planner is not None else None for q in queries]
+        matched = [q for q, plan in zip(queries, plans) if plan is None]
+        per_source = [src.search_many(matched, k=k_per_modality) for src in self.csv_sources]
+        db_hits = self.db_source.search_many(matched, k=k_per_modality)
+        out, i = [], 0
+        for plan in plans:
+            if plan is not None:
+                out.append(self.collect({"plan": self.planner.execute(plan, k_per_modality)}))
+                continue
+            out.append({"csv": self._merge_csv([hits[i] for hits in per_source], k_per_modality), "db": db_hits[i]})
+            i += 1
+        return out
@@ -0,0 +1,31 @@
+
+import numpy as np
+from retrievers.embed_cache import QueryEmbeddingCache
+
+def fake_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+    return encode
+
+def test_lru_tier_skips_encoder_and_evicts():
+    calls = []
+    cache = QueryEmbeddingCache("m", capacity=2)
+    enc = fake_encoder(calls)
+    cache.encode(["a", "bb"], enc)
+    out = cache.encode(["  a ", "bb", "ccc"], enc)
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert out[:, 0].tolist() == [1.0, 2.0, 3.0]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+    cache.encode(["a"], enc)  # evicted by "ccc"
+    assert calls[-1] == ["a"]
+
+def test_disk_tier_persists_per_model(tmp_path):
+    path = tmp_path / "q.sqlite"
+    calls = []
+    QueryEmbeddingCache("m", disk_path=path).encode(["hello"], fake_encoder(calls))
+    warm = QueryEmbeddingCache("m", disk_path=path)
+    assert warm.encode(["hello"], fake_encoder(calls))[0, 0] == 5.0
+    assert warm.stats()["disk_hits"] == 1 and len(calls) == 1
+    QueryEmbeddingCache("other", disk_path=path).encode(["hello"], fake_encoder(calls))
+    assert len(calls) == 2
@@ -0,0 +1,17 @@
+
+import time
+from retrievers.fanout import fan_out
+
+def test_fan_out_runs_concurrently_and_reports_timeouts():
+    def slow():
+        time.sleep(0.5)
+        return "slow"
+    t0 = time.perf_counter()
+    results, timed_out = fan_out({"a": lambda: 1, "b": lambda: 2, "slow": slow}, timeout=0.1)
+    assert time.perf_counter() - t0 < 0.4
+    assert results == {"a": 1, "b": 2}
+    assert timed_out == ["slow"]
+
+def test_fan_out_without_timeout_waits_for_all():
+    results, timed_out = fan_out({"x": lambda: time.sleep(0.05) or "x", "y": lambda: "y"})
+    assert results == {"x": "x", "y": "y"} and timed_out == []
@@ -0,0 +1,51 @@
+from pathlib import Path
+from etl.seed_db import seed, SEED_SQL
+from retrievers.planner import parse_plan
+from retrievers.structured import StructuredRetriever
+
+BASE = Path(__file__).resolve().parent.parent.parent
+CSVS = [BASE / "data_lake" / "csv" / "movies.csv", BASE / "data_lake" / "csv" / "ratings.csv"]
+VOCAB = {"director": ["Christopher Nolan", "Denis Villeneuve"], "genres": ["Drama", "Science Fiction"]}
+
+def plan(q):
+    p = parse_plan(q, lambda col: VOCAB.get(col, []))
+    return p and (p.op, p.metric, p.filters, p.limit)
+
+def test_parse_plan():
+    assert plan("Which Nolan movie has the highest IMDb rating?") == ("top", "imdb", [("director", "contains", "nolan")], None)
+    assert plan("How many drama films were released after 2010?") == (
+        "count", None, [("genres", "contains", "drama"), ("release_year", ">", 2010)], None)
+    assert plan("Top 3 science fiction films by box office in the 2010s") == (
+        "top", "box_office_usd", [("genres", "contains", "science fiction"), ("release_year", ">=", 2010),
+                                  ("release_year", "<=", 2019)], 3)
+    assert plan("Which movie grossed over $800 million and has the best rating?") == (
+        "top", "imdb", [("box_office_usd", ">", 800e6)], None)
+    assert plan("Shortest Christopher Nolan movie")[:3] == ("bottom", "runtime_min", [("director", "contains", "christopher nolan")])
+    assert plan("Compare Inception and Interstellar box office") is None
+    assert plan("What is the most emotional Nolan film?") is None
+
+def test_planner_pushes_down_to_sql_and_arrow(tmp_path):
+    db = tmp_path / "movies.db"
+    seed(db, SEED_SQL)
+    retr = StructuredRetriever(csv_paths=CSVS, db_path=db)
+    # imdb lives only in ratings.csv: joined with movies.csv on title and ranked with Arrow
+    res = retr.search("Which Nolan movie has the highest IMDb rating?", k_per_modality=2)
+    assert res["db"] == [] and [h.payload["title"] for h in res["csv"]] == ["The Dark Knight", "Inception"]
+    assert res["csv"][0].payload["imdb"] == 9.0
+    # Every column is in the DB table, so this one is SQL
+    res = retr.search("How many Nolan movies were released after 2010?")
+    assert res["csv"] == [] and res["db"][0].payload["value"] == 3
+    planner = retr.planner
+    p = planner.plan("Average runtime of Nolan films")
+    sql, arrow = planner._sql(p, 5)[0].payload, planner._arrow(p, 5)[0].payload
+    assert sql["value"] == arrow["value"] == 152.0 and sql["rows"] == arrow["rows"] == 6
+    assert [h.source_id for h in retr.search("Tenet")["db"]][0] == "db:movies:Tenet"  # no cue: title match
+
+def test_computed_rows_render_in_prompt(tmp_path):
+    from fusion import normalize_retrieval
+    from rag.answer import build_prompt
+    seed(tmp_path / "movies.db", SEED_SQL)
+    retr = StructuredRetriever(csv_paths=CSVS, db_path=tmp_path / "movies.db")
+    hits = retr.search("Which Nolan movie has the highest IMDb rating?", k_per_modality=1)["csv"]
+    user = build_prompt(normalize_retrieval("q", {"csv": hits}))["user"]
+    assert "- [CSV] Computed over the full table:" in user and "'title': 'The Dark Knight'" in user
@@ -0,0 +1,44 @@
+
+import json
+from pathlib import Path
+import numpy as np
+from etl.seed_db import seed, SEED_SQL
+from retrievers.structured import StructuredRetriever
+from retrievers.unstructured import UnstructuredRetriever
+
+BASE = Path(__file__).resolve().parent.parent.parent
+CSVS = [BASE / "data_lake" / "csv" / "movies.csv", BASE / "data_lake" / "csv" / "ratings.csv"]
+QUERIES = ["Inception", "dark knight box office", "Tenet", "Nolan", "memento", "Which Nolan movie has the highest IMDb rating?"]
+
+def toy_encoder(texts):
+    X = np.array([[sum(map(ord, t)) % 13 + 1, len(t) % 7 + 1, t.count("n") + 1] for t in texts], dtype=np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+def write_index(index_dir: Path, docs):
+    index_dir.mkdir()
+    np.save(index_dir / "embeddings.npy", toy_encoder(docs))
+    with open(index_dir / "metadata.jsonl", "w") as f:
+        for i, d in enumerate(docs):
+            f.write(json.dumps({"doc": f"d{i}.txt", "chunk": d, "source_id": f"doc:d{i}.txt"}) + "\n")
+    (index_dir / "manifest.json").write_text(json.dumps({"normalized": True}))
+
+def key(hits):
+    return [(h.source_id, round(h.score, 5)) for h in hits]
+
+def test_structured_search_many_matches_search(tmp_path):
+    db = tmp_path / "movies.db"
+    seed(db, SEED_SQL)
+    retr = StructuredRetriever(csv_paths=CSVS, db_path=db)
+    batched = retr.search_many(QUERIES, k_per_modality=3)
+    for q, res in zip(QUERIES, batched):
+        single = retr.search(q, k_per_modality=3)
+        assert key(res["csv"]) == key(single["csv"])
+        assert key(res["db"]) == key(single["db"])
+
+def test_unstructured_search_many_matches_search(tmp_path):
+    write_index(tmp_path / "idx", ["dreams within dreams", "love and time", "time inversion", "memory loss"])
+    retr = UnstructuredRetriever(tmp_path / "idx", cache_size=0)
+    retr._index_loaded = True  # no FAISS index: exercise the NumPy path
+    retr._encode_uncached = toy_encoder
+    batched = retr.search_many(QUERIES, k=2, batch_size=2)
+    assert [key(h) for h in batched] == [key(retr.search(q, k=2)) for q in QUERIES]
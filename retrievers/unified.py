@@ -1,20 +1,82 @@
 
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, List
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 from loaders import Evidence
-from .structured import StructuredRetriever
-from .unstructured import UnstructuredRetriever
+from tracing import span
+from .fanout import fan_out
+
+if TYPE_CHECKING:
+    from .structured import StructuredRetriever
+    from .unstructured import UnstructuredRetriever
 
 class UnifiedRetriever:
-    def __init__(self, csv_paths: List[Path], db_path: Path, docs_index_dir: Path) -> None:
-        self.structured = StructuredRetriever(csv_paths=csv_paths, db_path=db_path)
-        self.unstructured = UnstructuredRetriever(index_dir=docs_index_dir)
+    """
+    Structured (CSV + DB) and unstructured (doc) retrieval behind one interface.
+    With lazy=True each side is loaded on first use, so callers that only need one
+    modality never pay for the other; warm() loads both up front.
+    """
+    def __init__(self, csv_paths: List[Path], db_path: Path, docs_index_dir: Path,
+                 embed_cache_path: Optional[Path] = None, lazy: bool = False,
+                 columnar_dir: Optional[Path] = None) -> None:
+        self.csv_paths = list(csv_paths)
+        self.columnar_dir = columnar_dir
+        self.db_path = db_path
+        self.docs_index_dir = docs_index_dir
+        self.embed_cache_path = embed_cache_path
+        self._structured: Optional[StructuredRetriever] = None
+        self._unstructured: Optional[UnstructuredRetriever] = None
+        if not lazy:
+            self.warm()
+
+    @property
+    def structured(self) -> StructuredRetriever:
+        if self._structured is None:
+            with span("load.structured", csv_files=len(self.csv_paths)):
+                from .structured import StructuredRetriever
+                self._structured = StructuredRetriever(csv_paths=self.csv_paths, db_path=self.db_path,
+                                                       columnar_dir=self.columnar_dir)
+        return self._structured
+
+    @property
+    def unstructured(self) -> UnstructuredRetriever:
+        if self._unstructured is None:
+            with span("load.unstructured"):
+                from .unstructured import UnstructuredRetriever
+                self._unstructured = UnstructuredRetriever(index_dir=self.docs_index_dir, cache_path=self.embed_cache_path)
+        return self._unstructured
 
-    def search_all(self, query: str, k_per_modality: int = 5) -> Dict[str, List[Evidence]]:
+    def warm(self) -> "UnifiedRetriever":
+        self.structured
+        self.unstructured
+        return self
+
+    def search_all_with_status(self, query: str, k_per_modality: int = 5,
+                               timeout: Optional[float] = None) -> Tuple[Dict[str, List[Evidence]], List[str]]:
+        """
+        Query every CSV file, the DB and the doc index concurrently, waiting at most
+        `timeout` seconds. Returns (results, names of backends that timed out);
+        a timed-out backend contributes no hits.
+        """
+        tasks = self.structured.backend_tasks(query, k_per_modality=k_per_modality)
+        tasks["docs"] = partial(self.unstructured.search, query, k=k_per_modality)
+        finished, timed_out = fan_out(tasks, timeout=timeout)
         out: Dict[str, List[Evidence]] = {"csv": [], "db": [], "docs": []}
-        struct = self.structured.search(query, k_per_modality=k_per_modality)
+        struct = self.structured.collect(finished, k_per_modality=k_per_modality)
         out["csv"] = struct.get("csv", [])
         out["db"] = struct.get("db", [])
-        out["docs"] = self.unstructured.search(query, k=k_per_modality)
-        return out
+        out["docs"] = finished.get("docs", [])
+        return out, timed_out
+
+    def search_all(self, query: str, k_per_modality: int = 5, timeout: Optional[float] = None) -> Dict[str, List[Evidence]]:
+        return self.search_all_with_status(query, k_per_modality=k_per_modality, timeout=timeout)[0]
+
+    def search_many(self, queries: Sequence[str], k_per_modality: int = 5) -> List[Dict[str, List[Evidence]]]:
+        """
+        Batched search_all for offline evaluation/backfills: queries are encoded in batches
+        and answered with batched FAISS/matrix searches; CSV scoring is batched per file.
+        """
+        struct = self.structured.search_many(queries, k_per_modality=k_per_modality)
+        docs = self.unstructured.search_many(queries, k=k_per_modality)
+        return [{"csv": s.get("csv", []), "db": s.get("db", []), "docs": d} for s, d in zip(struct, docs)]
@@ -1,76 +1,137 @@
 
 from __future__ import annotations
-import json
+import threading
 import numpy as np
 from pathlib import Path
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
 from loaders import Evidence
+from tracing import span
+from .embed_cache import QueryEmbeddingCache
+from .ann import apply_search_params, load_faiss, read_spec, similarity
+from .store import EmbeddingStore
 
-# Optional imports
-try:
-    import faiss  # type: ignore
-    _FAISS_OK = True
-except Exception:
-    _FAISS_OK = False
-
-try:
+# Optional heavy deps (faiss, sentence-transformers/torch) are imported on the first
+# doc search, not at module import, so structured-only callers never load them.
+if TYPE_CHECKING:
     from sentence_transformers import SentenceTransformer
-    _ST_OK = True
-except Exception:
-    _ST_OK = False
+
+def _read_faiss(faiss, path: Path):
+    """Memory-map the index where the FAISS build supports it, so workers share its pages."""
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or getattr(faiss, "IO_FLAG_MMAP", None)
+    if flag is not None:
+        try:
+            return faiss.read_index(str(path), flag)
+        except Exception:
+            pass
+    return faiss.read_index(str(path))
 
 class UnstructuredRetriever:
     """
     Embedding-based retriever over doc chunks, using FAISS if available.
-    Expects files under index_dir:
-      - embeddings.npy  (shape: [N, D], float32, L2-normalized)
+    Expects files under index_dir (see EmbeddingStore for the on-disk format):
+      - embeddings.npy  (shape: [N, D], float32, L2-normalized; memory-mapped)
       - metadata.jsonl  (N lines, each with {"doc": str, "chunk": str, "source_id": str})
       - faiss.index     (optional; used if present and faiss is available)
+      - faiss.json      (optional; index type and default search params from the build)
+    `nprobe` (IVF) and `ef_search` (HNSW) override the build defaults to trade recall for latency.
+    Query embeddings go through an LRU cache (`cache_size` entries, 0 disables it); pass
+    `cache_path` to also persist them in a SQLite file across runs.
     """
-    def __init__(self, index_dir: Path, embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, index_dir: Path, embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                 cache_size: int = 1024, cache_path: Optional[Path] = None):
         self.index_dir = Path(index_dir)
-        self.emb_path = self.index_dir / "embeddings.npy"
-        self.meta_path = self.index_dir / "metadata.jsonl"
         self.faiss_path = self.index_dir / "faiss.index"
-        if not self.emb_path.exists() or not self.meta_path.exists():
-            raise FileNotFoundError(f"Missing embeddings or metadata in {self.index_dir}. Run etl/build_vectors.py.")
-        self.emb = np.load(self.emb_path).astype("float32")
-        self.emb /= (np.linalg.norm(self.emb, axis=1, keepdims=True) + 1e-12)
-        with open(self.meta_path, "r") as f:
-            self.meta = [json.loads(line) for line in f]
-        self.dim = self.emb.shape[1]
+        self.store = EmbeddingStore(self.index_dir)
+        self.dim = self.store.dim
         self.model_name = embedding_model_name
+        self.index_spec = read_spec(self.index_dir / "faiss.json") or {"type": "flat", "params": {}}
+        params = self.index_spec.get("params", {})
+        self._search_params: Dict[str, Any] = {
+            "nprobe": nprobe if nprobe is not None else params.get("nprobe"),
+            "ef_search": ef_search if ef_search is not None else params.get("ef_search"),
+        }
         self._index = None
-        if _FAISS_OK and self.faiss_path.exists():
-            self._index = faiss.read_index(str(self.faiss_path))
+        self._index_loaded = False
+        self._index_lock = threading.Lock()
         self._encoder: Optional[SentenceTransformer] = None
+        self._encoder_lock = threading.Lock()
+        self.cache: Optional[QueryEmbeddingCache] = None
+        if cache_size > 0:
+            self.cache = QueryEmbeddingCache(self.model_name, capacity=cache_size, disk_path=cache_path)
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        if nprobe is not None:
+            self._search_params["nprobe"] = nprobe
+        if ef_search is not None:
+            self._search_params["ef_search"] = ef_search
+        if self._index is not None:
+            apply_search_params(self._index, nprobe=nprobe, ef_search=ef_search)
+
+    @property
+    def index(self):
+        """FAISS index, read on first use; None when faiss or faiss.index is unavailable."""
+        if not self._index_loaded:
+            with self._index_lock:
+                if not self._index_loaded:
+                    with span("faiss.load", type=self.index_spec.get("type")):
+                        faiss = load_faiss()
+                        if faiss is not None and self.faiss_path.exists():
+                            self._index = _read_faiss(faiss, self.faiss_path)
+                            apply_search_params(self._index, **self._search_params)
+                    self._index_loaded = True
+        return self._index
 
     def _encode(self, texts: List[str]) -> np.ndarray:
-        if not _ST_OK:
-            raise RuntimeError("sentence-transformers not installed. Please install to encode queries.")
+        if self.cache is not None:
+            return self.cache.encode(texts, self._encode_uncached)
+        return self._encode_uncached(texts)
+
+    def _encode_uncached(self, texts: List[str]) -> np.ndarray:
         if self._encoder is None:
-            from sentence_transformers import SentenceTransformer
-            self._encoder = SentenceTransformer(self.model_name)
-        vecs = self._encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
+            with self._encoder_lock:
+                if self._encoder is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                    except Exception as e:
+                        raise RuntimeError("sentence-transformers not installed. Please install to encode queries.") from e
+                    with span("encoder.load", model=self.model_name):
+                        self._encoder = SentenceTransformer(self.model_name)
+        with span("encode", texts=len(texts)):
+            vecs = self._encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype("float32")
         return vecs
 
-    def search(self, query: str, k: int = 5) -> List[Evidence]:
-        q = self._encode([query])
-        if self._index is not None:
-            D, I = self._index.search(q, k)
-            idxs = I[0].tolist()
-            # Using inner product; higher is better. If L2 index used, convert distance to similarity.
-            scores = (1 - D[0]).tolist() if D is not None else [0.0] * len(idxs)
-        else:
-            sims = (self.emb @ q[0])
-            idxs = np.argsort(-sims)[:k].tolist()
-            scores = sims[idxs].tolist()
-
+    def _to_hits(self, idxs: List[int], scores: List[float]) -> List[Evidence]:
         hits: List[Evidence] = []
         for i, s in zip(idxs, scores):
-            if i < 0 or i >= len(self.meta):
+            if i < 0 or i >= len(self.store):
                 continue
-            m = self.meta[i]
+            m = self.store.meta(i)
             payload = {"doc": m["doc"], "snippet": m["chunk"][:500]}
             hits.append(Evidence(origin="DOC", source_id=m["source_id"], score=float(s), payload=payload))
         return hits
+
+    def search(self, query: str, k: int = 5) -> List[Evidence]:
+        return self.search_many([query], k=k)[0]
+
+    def search_many(self, queries: Sequence[str], k: int = 5, batch_size: int = 64) -> List[List[Evidence]]:
+        """
+        Top-k hits per query. Queries are encoded `batch_size` at a time and each batch
+        is answered by one FAISS search (or one matrix-matrix product in the NumPy fallback).
+        """
+        out: List[List[Evidence]] = []
+        with span("docs.search", queries=len(queries), k=k, chunks=len(self.store)) as s:
+            for start in range(0, len(queries), batch_size):
+                Q = self._encode(list(queries[start:start + batch_size]))
+                index = self.index
+                if index is not None:
+                    with span("faiss.search", queries=Q.shape[0], ntotal=index.ntotal):
+                        D, I = index.search(Q, k)
+                    S = similarity(index, D)
+                    out.extend(self._to_hits(I[r].tolist(), S[r].tolist()) for r in range(Q.shape[0]))
+                else:
+                    with span("numpy.search", queries=Q.shape[0], ntotal=len(self.store)):
+                        top = self.store.top_k_many(Q, k)
+                    out.extend(self._to_hits(idxs, scores) for idxs, scores in top)
+            s.set(hits=sum(len(h) for h in out))
+        return out
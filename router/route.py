@@ -1,47 +1,20 @@
 
 from __future__ import annotations
 from typing import Dict, Tuple, Optional
-import os
+from tracing import span
 
 # Optional LLM backstop
-def _llm_route(query: str, model: str = "gpt-4o-mini") -> Optional[Tuple[str, float]]:
-    """
-    Ask an LLM to pick a route. Returns (route, confidence) or None if unavailable.
-    """
-    try:
-        import openai  # type: ignore # legacy import path fallback
-    except Exception:
-        openai = None
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or openai is None:
-        return None
+def _route_prompt(query: str) -> str:
+    return (
+        "Route the user query to one of: structured, unstructured, both.\n"
+        "structured: numeric/date facts, counts, filters, aggregates, exact release years.\n"
+        "unstructured: opinions, themes, sentiment, long-form descriptions.\n"
+        "both: comparisons across multiple entities mixing facts and descriptions.\n"
+        f"Query: {query}\n"
+        "Respond as JSON: {\"route\":\"structured|unstructured|both\",\"confidence\":0.0-1.0}"
+    )
 
-    try:
-        from openai import OpenAI # type: ignore
-        client = OpenAI(api_key=api_key)
-        prompt = (
-            "Route the user query to one of: structured, unstructured, both.\n"
-            "structured: numeric/date facts, counts, filters, aggregates, exact release years.\n"
-            "unstructured: opinions, themes, sentiment, long-form descriptions.\n"
-            "both: comparisons across multiple entities mixing facts and descriptions.\n"
-            f"Query: {query}\n"
-            "Respond as JSON: {\"route\":\"structured|unstructured|both\",\"confidence\":0.0-1.0}"
-        )
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.0,
-            max_tokens=60,
-        )
-        text = resp.choices[0].message.content.strip()
-    except Exception:
-        # Legacy SDK
-        text = openai.ChatCompletion.create(
-            model=model,
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.0,
-            max_tokens=60,
-        )["choices"][0]["message"]["content"].strip()
+def _parse_route(text: str) -> Optional[Tuple[str, float]]:
     import json, re
     m = re.search(r"\{.*\}", text, re.DOTALL)
     if not m:
@@ -56,6 +29,25 @@ def _llm_route(query: str, model: str = "gpt-4o-mini") -> Optional[Tuple[str, fl
         return None
     return None
 
+def _llm_route(query: str, model: str = "gpt-4o-mini") -> Optional[Tuple[str, float]]:
+    """
+    Ask an LLM to pick a route. Returns (route, confidence) or None if unavailable.
+    """
+    from llm import get_client
+    try:
+        text = get_client().chat([{"role":"user","content":_route_prompt(query)}], model=model, temperature=0.0, max_tokens=60)
+    except Exception:
+        return None
+    return _parse_route(text)
+
+async def _llm_route_async(query: str, model: str = "gpt-4o-mini") -> Optional[Tuple[str, float]]:
+    from llm import get_async_client
+    try:
+        text = await get_async_client().chat([{"role":"user","content":_route_prompt(query)}], model=model, temperature=0.0, max_tokens=60)
+    except Exception:
+        return None
+    return _parse_route(text)
+
 STRUCTURED_CUES = set("""max highest lowest average sum count how many total runtime budget box office revenue year released release_year imdb metacritic rating rt tomato score numeric number greater less before after since between top compare vs vs. difference""".split())
 UNSTRUCTURED_CUES = set("""theme themes critics say review describe described described as plot summary opinion sentiment tone character relationship emotional""".split())
 COMPARATIVE_CUES = set("""compare vs versus both and contrast than between against""".split())
@@ -85,17 +77,28 @@ def heuristic_route(query: str) -> Tuple[str, float, Dict[str, bool]]:
     # Default
     return ("both", 0.5, {"structured": has_struct, "unstructured": has_unstruct, "comparative": has_compare})
 
+def _blend(heuristic: Tuple[str, float, Dict[str,bool]], llm: Optional[Tuple[str, float]]) -> Tuple[str, float, Dict[str,bool]]:
+    r, conf, feats = heuristic
+    if llm is not None:
+        lr, lc = llm
+        # Blend decisions: prefer llm if confident, else heuristic
+        if lc >= conf or (lr != r and lc >= 0.7):
+            return (lr, lc, feats)
+    return (r, conf, feats)
+
 def route_query(query: str, use_llm: bool = False, model: str = "gpt-4o-mini") -> Tuple[str, float, Dict[str,bool]]:
     """
     Decide route: 'structured' | 'unstructured' | 'both'.
     If use_llm is True and OPENAI is configured, will backstop the heuristic.
     """
-    r, conf, feats = heuristic_route(query)
-    if use_llm:
-        llm = _llm_route(query, model=model)
-        if llm is not None:
-            lr, lc = llm
-            # Blend decisions: prefer llm if confident, else heuristic
-            if lc >= conf or (lr != r and lc >= 0.7):
-                return (lr, lc, feats)
-    return (r, conf, feats)
+    with span("route", query_chars=len(query or ""), llm=use_llm) as s:
+        decision = _blend(heuristic_route(query), _llm_route(query, model=model) if use_llm else None)
+        s.set(route=decision[0], confidence=decision[1])
+    return decision
+
+async def route_query_async(query: str, use_llm: bool = False, model: str = "gpt-4o-mini") -> Tuple[str, float, Dict[str,bool]]:
+    """route_query() that awaits the LLM backstop instead of blocking on it."""
+    with span("route", query_chars=len(query or ""), llm=use_llm) as s:
+        decision = _blend(heuristic_route(query), await _llm_route_async(query, model=model) if use_llm else None)
+        s.set(route=decision[0], confidence=decision[1])
+    return decision
@@ -0,0 +1,4 @@
+from .spans import NOOP, Span, active, propagate, span, trace
+
+# tracing.profile (cProfile/tracemalloc) is imported only by callers that profile
+__all__ = ["NOOP", "Span", "active", "propagate", "span", "trace"]
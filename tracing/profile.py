@@ -0,0 +1,68 @@
+
+from __future__ import annotations
+import cProfile
+import pstats
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+class Profiler:
+    """
+    Opt-in cProfile (`cpu`) and/or tracemalloc (`memory`) capture around a block.
+    With both off this is a no-op.
+    cProfile only sees the calling thread: fan-out backends show up as wait time
+    there, while their own cost is in the trace spans.
+    """
+    def __init__(self, cpu: bool = False, memory: bool = False, top: int = 25) -> None:
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+        self._prof: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak = self._current = 0
+
+    def __enter__(self) -> "Profiler":
+        if self.memory:
+            tracemalloc.start(10)
+        if self.cpu:
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._prof is not None:
+            self._prof.disable()
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._current, self._peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return False
+
+    def dump_stats(self, path: Path) -> None:
+        """Raw cProfile stats (open with pstats, snakeviz, ...)."""
+        if self._prof is not None:
+            self._prof.dump_stats(str(path))
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly top functions by cumulative time and top allocation sites."""
+        out: Dict[str, Any] = {}
+        if self._prof is not None:
+            stats = pstats.Stats(self._prof)
+            rows = sorted(stats.stats.items(), key=lambda it: it[1][3], reverse=True)[:self.top]
+            out["cpu"] = {
+                "total_calls": stats.total_calls,
+                "total_s": round(stats.total_tt, 6),
+                "top": [{"function": f"{Path(file).name}:{line}({func})", "ncalls": nc,
+                         "tottime_ms": round(tt * 1000, 3), "cumtime_ms": round(ct * 1000, 3)}
+                        for (file, line, func), (cc, nc, tt, ct, _) in rows],
+            }
+        if self._snapshot is not None:
+            snapshot = self._snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            out["memory"] = {
+                "peak_mb": round(self._peak / 2**20, 3),
+                "current_mb": round(self._current / 2**20, 3),
+                "top": [{"site": f"{Path(s.traceback[0].filename).name}:{s.traceback[0].lineno}",
+                         "size_kb": round(s.size / 1024, 1), "count": s.count}
+                        for s in snapshot.statistics("lineno")[:self.top]],
+            }
+        return out
@@ -0,0 +1,88 @@
+
+from __future__ import annotations
+import contextvars
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_CURRENT: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("qa_span", default=None)
+
+class Span:
+    """
+    One timed stage. Entering it makes it the current span of this context, so spans
+    opened underneath (same thread, asyncio tasks, or propagate()d pool jobs) nest in it.
+    """
+    __slots__ = ("name", "attrs", "children", "ms", "_start", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.children: List[Span] = []
+        self.ms: Optional[float] = None
+
+    def set(self, **attrs: Any) -> "Span":
+        """Attach sizes/counts known only after the work ran."""
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self) -> "Span":
+        parent = _CURRENT.get()
+        if parent is not None:
+            parent.children.append(self)  # list.append is atomic; fan-out threads share the parent
+        self._token = _CURRENT.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.ms = (time.perf_counter() - self._start) * 1000.0
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _CURRENT.reset(self._token)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "ms": None if self.ms is None else round(self.ms, 3)}
+        if self.attrs:
+            out["attrs"] = dict(self.attrs)
+        if self.children:
+            out["children"] = [c.to_dict() for c in list(self.children)]
+        return out
+
+class _NoopSpan:
+    """Stand-in returned by span() when nothing is being traced."""
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> "_NoopSpan":
+        return self
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+NOOP = _NoopSpan()
+
+def trace(name: str, **attrs: Any) -> Span:
+    """Root span: use as `with trace("answer") as t:` and read t.to_dict() afterwards."""
+    return Span(name, attrs)
+
+def span(name: str, **attrs: Any):
+    """Child of the current span, or the shared no-op (one ContextVar lookup) when not tracing."""
+    if _CURRENT.get() is None:
+        return NOOP
+    return Span(name, attrs)
+
+def active() -> bool:
+    return _CURRENT.get() is not None
+
+def propagate(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wrap `fn` to run in a copy of the caller's context, so spans it opens on a pool
+    thread attach to the caller's trace. Returns `fn` unchanged when not tracing.
+    """
+    if _CURRENT.get() is None:
+        return fn
+    return partial(contextvars.copy_context().run, fn)
@@ -0,0 +1,34 @@
+import time
+
+from rag.pipeline import QAPipeline
+from retrievers.fanout import fan_out
+from tracing import NOOP, span, trace
+
+def test_spans_are_noop_without_trace_and_nest_across_fan_out_threads():
+    assert span("idle") is NOOP
+
+    def backend(n):
+        with span("work", n=n) as s:
+            time.sleep(0.01)
+            s.set(hits=n)
+        return n
+
+    with trace("root") as t:
+        results, timed_out = fan_out({"a": lambda: backend(1), "b": lambda: backend(2)}, timeout=5)
+    assert results == {"a": 1, "b": 2} and timed_out == []
+    fan = t.to_dict()["children"][0]
+    assert fan["name"] == "fan_out" and fan["attrs"]["backends"] == 2
+    backends = {c["name"]: c["children"][0] for c in fan["children"]}
+    assert set(backends) == {"backend:a", "backend:b"}
+    assert backends["backend:b"]["attrs"] == {"n": 2, "hits": 2}
+    assert all(b["ms"] >= 10 for b in backends.values())
+
+def test_pipeline_trace_records_stages_and_hit_counts():
+    pipeline = QAPipeline(embed_cache_path=None)
+    result = pipeline.answer("Inception", route="structured", trace=True)
+    stages = {c["name"]: c for c in result["trace"]["children"]}
+    assert {"retrieve", "normalize", "synthesize"} <= set(stages)
+    hits = stages["retrieve"]["attrs"]["hits"]
+    assert hits["db"] > 0 and hits["docs"] == 0
+    assert stages["normalize"]["attrs"]["hits"] == sum(hits.values())
+    assert "trace" not in pipeline.answer("Inception", route="structured")